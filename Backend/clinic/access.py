@@ -0,0 +1,160 @@
+# clinic/access.py
+"""
+Compiled permission sets.
+
+Each employee's effective permissions (direct plus every group's) and role
+names are compiled once into frozensets and kept per process. An entry is
+valid while the employee's version stamp is unchanged; the m2m signals in
+``clinic.signals`` bump it whenever the employee's groups or permissions, or
+the permissions of one of their groups, change. Per-group sets are shared
+between members and keyed by their own stamp, so compiling a new member of
+a known group costs two small queries.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import Group, Permission
+
+from .cache import get_employee_version, get_group_versions
+from .conf import clinic_setting
+from .models import Employee
+
+Access = namedtuple('Access', 'permissions user_permissions group_permissions roles app_labels')
+
+
+def _codenames(rows):
+    return frozenset(f'{app_label}.{codename}' for app_label, codename in rows)
+
+
+class PermissionCache:
+    def __init__(self, max_size=None, ttl=None):
+        # ``None`` reads CLINIC_PERMISSION_CACHE on use.
+        self._max_size = max_size
+        self._ttl = ttl
+        self._employees = OrderedDict()
+        self._groups = {}
+        self._all = None
+        self._lock = threading.Lock()
+
+    @property
+    def max_size(self):
+        return self._max_size if self._max_size is not None else clinic_setting('PERMISSION_CACHE', 'MAX_SIZE')
+
+    @property
+    def ttl(self):
+        return self._ttl if self._ttl is not None else clinic_setting('PERMISSION_CACHE', 'TTL')
+
+    def for_user(self, user):
+        """The compiled ``Access`` for ``user``, memoised on the instance for the request."""
+        access = getattr(user, '_clinic_access', None)
+        if access is None:
+            access = user._clinic_access = self._lookup(user)
+        return access
+
+    def _lookup(self, user):
+        version = get_employee_version(user.pk)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._employees.get(user.pk)
+            if entry is not None and entry[1] == version and entry[2] > now:
+                self._employees.move_to_end(user.pk)
+                return entry[0]
+        access = self._compile(user)
+        with self._lock:
+            self._employees[user.pk] = (access, version, now + self.ttl)
+            self._employees.move_to_end(user.pk)
+            while len(self._employees) > self.max_size:
+                self._employees.popitem(last=False)
+        return access
+
+    def _compile(self, user):
+        direct = _codenames(
+            Employee.user_permissions.through.objects.filter(employee_id=user.pk)
+            .values_list('permission__content_type__app_label', 'permission__codename')
+        )
+        group_ids = list(Employee.groups.through.objects.filter(employee_id=user.pk).values_list('group_id', flat=True))
+        groups = self._group_entries(group_ids)
+        from_groups = frozenset().union(*(permissions for _, permissions in groups))
+        permissions = self._all_permissions() if user.is_superuser else direct | from_groups
+        roles = frozenset(name.lower() for name, _ in groups) | ({user.role.lower()} if user.role else frozenset())
+        return Access(
+            permissions=permissions,
+            user_permissions=direct,
+            group_permissions=from_groups,
+            roles=roles,
+            app_labels=frozenset(permission.partition('.')[0] for permission in permissions),
+        )
+
+    def _group_entries(self, group_ids):
+        """``[(name, permissions)]`` for ``group_ids``, compiling stale groups in one query."""
+        if not group_ids:
+            return []
+        versions = get_group_versions(group_ids)
+        now = time.monotonic()
+        with self._lock:
+            cached = {
+                pk: entry for pk in group_ids
+                if (entry := self._groups.get(pk)) is not None and entry[2] == versions[pk] and entry[3] > now
+            }
+        missing = [pk for pk in group_ids if pk not in cached]
+        if missing:
+            names = dict(Group.objects.filter(pk__in=missing).values_list('pk', 'name'))
+            rows = {pk: [] for pk in missing}
+            for group_id, app_label, codename in Group.permissions.through.objects.filter(
+                group_id__in=missing,
+            ).values_list('group_id', 'permission__content_type__app_label', 'permission__codename'):
+                rows[group_id].append((app_label, codename))
+            with self._lock:
+                for pk in missing:
+                    if pk in names:
+                        cached[pk] = self._groups[pk] = (names[pk], _codenames(rows[pk]), versions[pk], now + self.ttl)
+        return [cached[pk][:2] for pk in group_ids if pk in cached]
+
+    def _all_permissions(self):
+        now = time.monotonic()
+        if self._all is None or self._all[1] <= now:
+            self._all = (
+                _codenames(Permission.objects.values_list('content_type__app_label', 'codename')),
+                now + self.ttl,
+            )
+        return self._all[0]
+
+    def clear(self):
+        with self._lock:
+            self._employees.clear()
+            self._groups.clear()
+            self._all = None
+
+
+permission_cache = PermissionCache()
+
+
+class CachedPermissionBackend(ModelBackend):
+    """``ModelBackend`` whose permission lookups read the compiled sets."""
+
+    def _access(self, user_obj, obj):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return None
+        return permission_cache.for_user(user_obj)
+
+    def get_user_permissions(self, user_obj, obj=None):
+        access = self._access(user_obj, obj)
+        return set(access.user_permissions) if access else set()
+
+    def get_group_permissions(self, user_obj, obj=None):
+        access = self._access(user_obj, obj)
+        return set(access.group_permissions) if access else set()
+
+    def get_all_permissions(self, user_obj, obj=None):
+        access = self._access(user_obj, obj)
+        return set(access.permissions) if access else set()
+
+    def has_perm(self, user_obj, perm, obj=None):
+        access = self._access(user_obj, obj)
+        return access is not None and perm in access.permissions
+
+    def has_module_perms(self, user_obj, app_label):
+        access = self._access(user_obj, None)
+        return access is not None and app_label in access.app_labels
@@ -0,0 +1,141 @@
+# clinic/async_views.py
+"""
+Async variants of the login, registration and password-reset-confirm views.
+
+Served through ``clinic_Management/asgi.py`` the event loop stays free while
+PBKDF2 runs on the bounded hashing pool; a full pool answers 503 rather than
+stacking requests behind it. Pool threads only hash: database and cache work
+(rehash saves, rate limits, lockouts) goes through ``sync_to_async`` so it
+runs on Django's managed connections.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import make_password, verify_password
+from django.contrib.auth.tokens import default_token_generator
+from django.http import JsonResponse
+from django.utils.decorators import classonlymethod
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .audit import audit_log
+from .hashing import HashingPoolSaturated, get_hashing_pool
+from .models import AuditEvent, Employee
+from .ratelimit import check_rate_limits, lockout, request_email
+from .serializers import EmployeeRegistrationSerializer, EmployeeSerializer, LoginSerializer
+
+
+class MalformedRequest(Exception):
+    pass
+
+
+class AsyncAPIView(View):
+    http_method_names = ['post', 'options']
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # Token-authenticated JSON API, like the DRF views: no CSRF cookie.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    def request_data(self, request):
+        if request.content_type == 'application/json':
+            try:
+                return json.loads(request.body or b'{}')
+            except ValueError:
+                raise MalformedRequest('Malformed JSON body')
+        data = request.POST.copy()
+        data.update(request.FILES)
+        return data
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except MalformedRequest as exc:
+            return JsonResponse({'error': str(exc)}, status=400)
+        except HashingPoolSaturated:
+            response = JsonResponse({'error': 'Server busy, please retry'}, status=503)
+            response['Retry-After'] = '1'
+            return response
+
+
+def _token_payload(employee):
+    refresh = RefreshToken.for_user(employee)
+    return {'refresh': str(refresh), 'access': str(refresh.access_token)}
+
+
+def _employee_data(employee):
+    return EmployeeSerializer(employee).data
+
+
+class AsyncLoginView(AsyncAPIView):
+    async def post(self, request):
+        data = self.request_data(request)
+        retry_after = await sync_to_async(check_rate_limits)(request, 'login', request_email(data))
+        if retry_after:
+            response = JsonResponse({'detail': 'Request was throttled.'}, status=429)
+            response['Retry-After'] = str(retry_after)
+            return response
+
+        serializer = LoginSerializer(data=data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=400)
+
+        email = serializer.validated_data['email']
+        password = serializer.validated_data['password']
+        employee = await Employee.objects.filter(email=email).afirst()
+        # An unknown email still costs one hash, as in ModelBackend.
+        encoded = employee.password if employee is not None else None
+        is_correct, must_update = await get_hashing_pool().run(verify_password, password, encoded)
+        if not is_correct:
+            await sync_to_async(lockout.failure)(request, email)
+            audit_log.record(AuditEvent.ACTION_LOGIN_FAILED, employee=employee, request=request, actor=None, email=email)
+            return JsonResponse({'error': 'Invalid credentials'}, status=401)
+        if must_update:
+            # What check_password()'s setter does, without saving on a pool thread.
+            employee.password = await get_hashing_pool().run(make_password, password)
+            await sync_to_async(employee.save)(update_fields=['password'])
+        await sync_to_async(lockout.success)(request, email)
+        audit_log.record(AuditEvent.ACTION_LOGIN, employee=employee, request=request, actor=None)
+
+        payload = await sync_to_async(_token_payload)(employee)
+        payload['employee'] = await sync_to_async(_employee_data)(employee)
+        return JsonResponse(payload)
+
+
+class AsyncEmployeeRegistrationView(AsyncAPIView):
+    async def post(self, request):
+        serializer = EmployeeRegistrationSerializer(data=self.request_data(request))
+        if not await sync_to_async(serializer.is_valid)():
+            return JsonResponse(serializer.errors, status=400)
+
+        encoded = await get_hashing_pool().run(make_password, serializer.validated_data['password'])
+        employee = await sync_to_async(serializer.save)(encoded_password=encoded)
+        audit_log.record(AuditEvent.ACTION_REGISTER, employee=employee, request=request, actor=None)
+
+        payload = await sync_to_async(_token_payload)(employee)
+        payload['employee'] = await sync_to_async(_employee_data)(employee)
+        return JsonResponse(payload, status=201)
+
+
+class AsyncPasswordResetConfirmView(AsyncAPIView):
+    async def post(self, request, uidb64, token):
+        try:
+            uid = force_str(urlsafe_base64_decode(uidb64))
+            employee = await Employee.objects.aget(pk=uid)
+        except (TypeError, ValueError, OverflowError, Employee.DoesNotExist):
+            return JsonResponse({'error': 'Invalid reset link'}, status=400)
+
+        if not default_token_generator.check_token(employee, token):
+            return JsonResponse({'error': 'Invalid or expired token'}, status=400)
+        data = self.request_data(request)
+        new_password = data.get('new_password')
+        if not new_password:
+            return JsonResponse({'error': 'New password is required'}, status=400)
+
+        employee.password = await get_hashing_pool().run(make_password, new_password)
+        await employee.asave()
+        audit_log.record(AuditEvent.ACTION_PASSWORD_RESET, employee=employee, request=request, actor=None)
+        return JsonResponse({'message': 'Password reset successful'})
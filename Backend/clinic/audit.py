@@ -0,0 +1,197 @@
+# clinic/audit.py
+"""
+Account audit trail: registrations, logins, password resets and changes to
+an employee's groups and permissions.
+
+``audit_log.record()`` only appends to an in-process buffer, so recording
+never touches the database on the request path. The buffer is written in
+batches of ``BATCH_SIZE`` once it holds that many events or its oldest event
+is ``FLUSH_SECONDS`` old -- checked after each response has been sent
+(``request_finished``) -- and at exit. Sinks: ``DatabaseSink`` (the
+append-only ``AuditEvent`` table behind /api/audit/, the default) or
+``NDJSONSink`` (one file per day).
+
+Events are per process until flushed: a worker killed outright loses at
+most its unflushed buffer. Code that swaps the database out from under the
+buffer (``ClinicTestRunner``, `manage.py benchmark`) clears it before
+switching back, so the exit-time flush never writes their events to the real
+database.
+"""
+import atexit
+import ipaddress
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .conf import clinic_setting
+from .models import AuditEvent
+from .ratelimit import client_ip
+
+logger = logging.getLogger('clinic.audit')
+
+# The request being served, set by ``clinic.middleware.AuditContextMiddleware``
+# so events raised from signal handlers can name the actor.
+current_request = ContextVar('clinic_audit_request', default=None)
+
+
+# ``record()``'s default actor: the authenticated user of the request.
+REQUEST_USER = object()
+
+
+def _pk(value):
+    return getattr(value, 'pk', value)
+
+
+def _ip_address(value):
+    """``value`` as a normalised IP address, or ``None`` if it isn't one."""
+    try:
+        return str(ipaddress.ip_address(value)) if value else None
+    except ValueError:
+        return None
+
+
+class DatabaseSink:
+    def write(self, events):
+        AuditEvent.objects.bulk_create([AuditEvent(**event) for event in events])
+
+
+class NDJSONSink:
+    """Appends each batch to ``<NDJSON_DIR>/audit-YYYY-MM-DD.ndjson`` (default BASE_DIR/audit)."""
+
+    def __init__(self, directory=None):
+        self.directory = Path(directory or clinic_setting('AUDIT', 'NDJSON_DIR') or Path(settings.BASE_DIR) / 'audit')
+
+    def write(self, events):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for day, group in itertools.groupby(events, key=lambda event: event['created_at'].date()):
+            lines = ''.join(json.dumps(event, cls=DjangoJSONEncoder) + '\n' for event in group)
+            with open(self.directory / f'audit-{day.isoformat()}.ndjson', 'a', encoding='utf-8') as handle:
+                handle.write(lines)
+
+
+_sinks = {}
+
+
+def get_audit_sink():
+    path = clinic_setting('AUDIT', 'SINK')
+    if path not in _sinks:
+        _sinks[path] = import_string(path)()
+    return _sinks[path]
+
+
+class AuditBuffer:
+    def __init__(self, sink=None):
+        self._sink = sink
+        self._events = deque()
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.dropped = 0
+        self.quarantined = 0
+
+    @property
+    def sink(self):
+        return self._sink or get_audit_sink()
+
+    def record(self, action, employee=None, request=None, actor=REQUEST_USER, **detail):
+        """
+        Buffer one event. ``request`` defaults to the request being served
+        and ``actor`` to its authenticated user; async views pass the actor
+        explicitly, as resolving ``request.user`` may query the database.
+        """
+        request = request if request is not None else current_request.get()
+        if actor is REQUEST_USER:
+            user = getattr(request, 'user', None)
+            actor = user if user is not None and user.is_authenticated else None
+        event = {
+            'created_at': timezone.now(),
+            'action': action,
+            'employee_id': _pk(employee),
+            'actor_id': _pk(actor),
+            'ip_address': _ip_address(client_ip(request)) if request is not None else None,
+            'detail': detail,
+        }
+        with self._lock:
+            if len(self._events) >= clinic_setting('AUDIT', 'MAX_BUFFER'):
+                self.dropped += 1
+                logger.error('Audit buffer full; dropped %s event for employee %s', action, event['employee_id'])
+                return
+            if not self._events:
+                self._oldest = time.monotonic()
+            # Buffered with the number of failed writes so far.
+            self._events.append((event, 0))
+
+    def __len__(self):
+        return len(self._events)
+
+    def due(self):
+        with self._lock:
+            return bool(self._events) and (
+                len(self._events) >= clinic_setting('AUDIT', 'BATCH_SIZE')
+                or time.monotonic() - self._oldest >= clinic_setting('AUDIT', 'FLUSH_SECONDS')
+            )
+
+    def flush(self):
+        """
+        Write everything buffered, ``BATCH_SIZE`` events per sink call.
+        A batch the sink rejects is retried one event at a time, so one bad
+        event can't hold up the rest. Events that still fail go back to the
+        front of the buffer for the next flush, and after ``MAX_ATTEMPTS``
+        failed writes are dropped and logged in full. Returns the number of
+        events written.
+        """
+        written = 0
+        batch_size = clinic_setting('AUDIT', 'BATCH_SIZE')
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [self._events.popleft() for _ in range(min(batch_size, len(self._events)))]
+                    self._oldest = time.monotonic() if self._events else None
+                if not batch:
+                    return written
+                try:
+                    self.sink.write([event for event, _ in batch])
+                    written += len(batch)
+                    continue
+                except Exception:
+                    logger.warning('Writing %d audit events failed; retrying them one at a time', len(batch))
+                retry = []
+                for event, attempts in batch:
+                    try:
+                        self.sink.write([event])
+                        written += 1
+                    except Exception:
+                        if attempts + 1 < clinic_setting('AUDIT', 'MAX_ATTEMPTS'):
+                            retry.append((event, attempts + 1))
+                            continue
+                        self.quarantined += 1
+                        logger.exception('Dropping audit event after %d failed writes: %r', attempts + 1, event)
+                if retry:
+                    logger.error('Writing %d audit events failed; keeping them for the next flush', len(retry))
+                    with self._lock:
+                        self._events.extendleft(reversed(retry))
+                        self._oldest = time.monotonic()
+                    return written
+
+    def flush_if_due(self):
+        if self.due():
+            self.flush()
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+            self._oldest = None
+
+
+audit_log = AuditBuffer()
+atexit.register(audit_log.flush)
@@ -0,0 +1,112 @@
+# clinic/authentication.py
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .cache import get_employee_version
+from .conf import clinic_setting
+from .models import Employee
+
+# Columns needed to authenticate and run permission checks; anything else is
+# loaded lazily if a view touches it.
+AUTH_COLUMNS = (
+    'id', 'email', 'password', 'last_login', 'is_superuser',
+    'emp_id', 'first_name', 'father_name', 'role',
+)
+
+
+class UserCache:
+    """
+    Per-process LRU of slim ``Employee`` rows with a TTL.
+
+    Each entry remembers the employee's version stamp from ``clinic.cache``,
+    so a save, password change or group change elsewhere evicts it on the
+    next lookup; the TTL bounds staleness if the stamp itself is lost.
+    """
+
+    def __init__(self, max_size=None, ttl=None):
+        # ``None`` reads CLINIC_AUTH_USER_CACHE on use.
+        self._max_size = max_size
+        self._ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def max_size(self):
+        return self._max_size if self._max_size is not None else clinic_setting('AUTH_USER_CACHE', 'MAX_SIZE')
+
+    @property
+    def ttl(self):
+        return self._ttl if self._ttl is not None else clinic_setting('AUTH_USER_CACHE', 'TTL')
+
+    def get(self, pk):
+        with self._lock:
+            entry = self._entries.get(pk)
+            if entry is None:
+                return None
+            user, version, expires = entry
+            if expires < time.monotonic():
+                del self._entries[pk]
+                return None
+            self._entries.move_to_end(pk)
+        if version != get_employee_version(pk):
+            self.invalidate(pk)
+            return None
+        # Hand out a copy so per-request state (e.g. the permission cache)
+        # never leaks between requests.
+        return copy.copy(user)
+
+    def load(self, pk):
+        user = self.get(pk)
+        if user is not None:
+            return user
+        version = get_employee_version(pk)
+        user = Employee.objects.only(*AUTH_COLUMNS).get(pk=pk)
+        with self._lock:
+            self._entries[pk] = (user, version, time.monotonic() + self.ttl)
+            self._entries.move_to_end(pk)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return copy.copy(user)
+
+    def invalidate(self, pk):
+        with self._lock:
+            self._entries.pop(pk, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` that resolves the token's user through ``user_cache``."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+        try:
+            user = user_cache.load(int(user_id))
+        except (Employee.DoesNotExist, TypeError, ValueError) as e:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found') from e
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if getattr(api_settings, 'CHECK_REVOKE_TOKEN', False):
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        return user
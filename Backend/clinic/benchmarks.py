@@ -0,0 +1,758 @@
+# clinic/benchmarks.py
+"""
+Fixture generation and timing helpers shared by the query-count tests and
+the benchmark suites.
+"""
+import datetime
+import itertools
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, make_password
+from django.contrib.auth.models import Group, Permission
+
+from .audit import audit_log
+from .conf import clinic_setting
+from .models import EMPLOYEE_SIDE_TABLES, Employee, EmployeeProfile
+from .signals import employees_imported
+
+logger = logging.getLogger('clinic.benchmarks')
+
+ROLES = ('Admin', 'Doctor', 'Lab', 'Reception', 'Pharmacy')
+REGIONS = ('Addis Ababa', 'Oromia', 'Amhara', 'Tigray', 'Sidama', 'Somali')
+BENCHMARK_PASSWORD = 'bench-pass-123'
+# Load suites send every request from one address.
+UNLIMITED = {'RATES': {}}
+
+
+def employee_fields(n, **overrides):
+    """Column values for the ``n``-th synthetic employee."""
+    fields = {
+        'first_name': f'First{n}',
+        'father_name': f'Father{n}',
+        'grandfather_name': f'Grand{n}',
+        'emp_id': f'EMP{n:07d}',
+        'gender': 'MF'[n % 2],
+        'body': 'Lorem ipsum dolor sit amet. ' * 8,
+        'region': REGIONS[n % len(REGIONS)],
+        'zone': f'Zone {n % 20}',
+        'woreda': f'Woreda {n % 100}',
+        'kebele': f'{n % 30:02d}',
+        'email': f'employee{n}@clinic.test',
+        'phone_number': f'09{n:08d}',
+        'institution_name': 'Addis Ababa University',
+        'field': 'Medicine',
+        'date_of_graduate': datetime.date(2015, 7, 1),
+        'company_names': 'Clinic',
+        'role': ROLES[n % len(ROLES)],
+        'salary': '12000.00',
+        'licence_type': 'GP',
+        'give_date': datetime.date(2020, 1, 1),
+        'expired_date': datetime.date(2030, 1, 1) + datetime.timedelta(days=n % 365),
+        'bank_name': 'CBE',
+        'bank_account': f'1000{n:08d}',
+    }
+    fields.update(overrides)
+    return fields
+
+
+def seed_employees(count, start=0, batch_size=1000, password=BENCHMARK_PASSWORD):
+    """
+    Insert ``count`` employees with ``bulk_create``, each in one role group
+    with one direct permission. The password is hashed once and shared, so
+    seeding cost does not depend on the hasher.
+    """
+    encoded = make_password(password)
+    groups = [Group.objects.get_or_create(name=role)[0] for role in ROLES]
+    permission = Permission.objects.order_by('pk').first()
+
+    created = []
+    for offset in range(start, start + count, batch_size):
+        batch = Employee.objects.bulk_create_employees(
+            {**employee_fields(n), 'password': encoded}
+            for n in range(offset, min(offset + batch_size, start + count))
+        )
+        employees_imported.send(sender=Employee, employees=batch)
+        created.extend(batch)
+
+    GroupLink = Employee.groups.through
+    GroupLink.objects.bulk_create(
+        [GroupLink(employee_id=e.pk, group_id=groups[i % len(groups)].pk) for i, e in enumerate(created)],
+        batch_size=batch_size,
+    )
+    if permission is not None:
+        PermissionLink = Employee.user_permissions.through
+        PermissionLink.objects.bulk_create(
+            [PermissionLink(employee_id=e.pk, permission_id=permission.pk) for e in created],
+            batch_size=batch_size,
+        )
+    return created
+
+
+@contextmanager
+def timed(name, **extra):
+    """Log the wall-clock time of the block; yields a dict filled in on exit."""
+    result = {'name': name, **extra}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result['seconds'] = time.perf_counter() - start
+        logger.info('%s: %.4fs %s', name, result['seconds'], extra)
+
+
+def benchmark_hashers(rounds=5, **options):
+    """Cost of one PBKDF2 hash per configured profile, and pool throughput."""
+    from .hashing import HashingPool
+
+    hasher = PBKDF2PasswordHasher()
+    salt = hasher.salt()
+    results = []
+    for profile, iterations in clinic_setting('PASSWORD_HASH_PROFILES').items():
+        iterations = iterations or PBKDF2PasswordHasher.iterations
+        with timed('hash', profile=profile, iterations=iterations) as result:
+            for _ in range(rounds):
+                hasher.encode(BENCHMARK_PASSWORD, salt, iterations)
+        result['ms_per_hash'] = result['seconds'] / rounds * 1000
+        results.append(result)
+
+    pool = HashingPool(max_queue=rounds * 8)
+    try:
+        jobs = rounds * pool.workers
+        with timed('hashing_pool', workers=pool.workers, jobs=jobs) as result:
+            wait([pool.submit(make_password, BENCHMARK_PASSWORD) for _ in range(jobs)])
+        result['hashes_per_second'] = jobs / result['seconds']
+        results.append(result)
+    finally:
+        pool.shutdown()
+    return results
+
+
+def benchmark_auth(requests=2000, **options):
+    """Requests/sec through a trivial authenticated view, stock vs cached JWT auth."""
+    from rest_framework.permissions import IsAuthenticated
+    from rest_framework.response import Response
+    from rest_framework.test import APIRequestFactory
+    from rest_framework.views import APIView
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from .authentication import CachedJWTAuthentication, user_cache
+
+    employees = seed_employees(100)
+    tokens = [str(AccessToken.for_user(employee)) for employee in employees]
+    factory = APIRequestFactory()
+    results = []
+    for auth_class in (JWTAuthentication, CachedJWTAuthentication):
+        class BenchmarkView(APIView):
+            authentication_classes = [auth_class]
+            permission_classes = [IsAuthenticated]
+
+            def get(self, request):
+                return Response({'id': request.user.pk})
+
+        view = BenchmarkView.as_view()
+        user_cache.clear()
+        batch = [
+            factory.get('/benchmark/', HTTP_AUTHORIZATION=f'Bearer {tokens[i % len(tokens)]}')
+            for i in range(requests)
+        ]
+        with timed('auth', authentication=auth_class.__name__, requests=requests) as result:
+            for request in batch:
+                view(request)
+        result['requests_per_second'] = requests / result['seconds']
+        results.append(result)
+    return results
+
+
+def benchmark_permissions(requests=2000, size=1000, **options):
+    """
+    Cost of the permission checks in one request (three ``has_perm`` calls on
+    a freshly authenticated user), stock ``ModelBackend`` vs compiled sets.
+    The cached backend is measured twice: ``cold``, one request per user
+    straight after clearing the cache, then ``warm``, ``requests`` requests
+    against the filled cache.
+    """
+    import copy
+
+    from django.contrib.auth.backends import ModelBackend
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from .access import CachedPermissionBackend, permission_cache
+    from .authentication import AUTH_COLUMNS
+
+    seed_employees(size)
+    permissions = list(Permission.objects.filter(content_type__app_label__in=['clinic', 'auth']))
+    for i, group in enumerate(Group.objects.filter(name__in=ROLES)):
+        group.permissions.add(*permissions[i::len(ROLES)])
+    checks = [f'{p.content_type.app_label}.{p.codename}' for p in permissions[:3]]
+    users = list(Employee.objects.only(*AUTH_COLUMNS).order_by('pk')[:size])
+
+    runs = (
+        (ModelBackend(), 'uncached', requests),
+        (CachedPermissionBackend(), 'cold', len(users)),
+        (CachedPermissionBackend(), 'warm', requests),
+    )
+    results = []
+    permission_cache.clear()
+    for backend, cache_state, count in runs:
+        with CaptureQueriesContext(connection) as queries:
+            with timed(
+                'permissions', backend=type(backend).__name__, cache=cache_state, requests=count, checks=len(checks),
+            ) as result:
+                for i in range(count):
+                    user = copy.copy(users[i % len(users)])  # no per-request memo carried over
+                    for check in checks:
+                        backend.has_perm(user, check)
+        result['us_per_request'] = result['seconds'] / count * 1_000_000
+        result['queries_per_request'] = len(queries) / count
+        results.append(result)
+    return results
+
+
+def benchmark_schema(requests=2000, size=1000, **options):
+    """
+    The login lookup (``get(email=...)``, as ``authenticate()`` and the
+    login views do it) on the narrow employee table, vs the same row joined
+    back to its side tables the way the old single wide table was read.
+    ``row_bytes`` is the mean size of the values one lookup fetches.
+    """
+    seed_employees(size)
+    emails = list(Employee.objects.order_by('pk').values_list('email', flat=True))
+    narrow = [field.name for field in Employee._meta.concrete_fields]
+    wide = narrow + [
+        f'{relation}__{field.name}'
+        for relation, model in EMPLOYEE_SIDE_TABLES.items()
+        for field in model._meta.concrete_fields if field.name != 'employee'
+    ]
+
+    results = []
+    for layout, queryset, columns in (
+        ('wide', Employee.objects.select_related(*EMPLOYEE_SIDE_TABLES), wide),
+        ('narrow', Employee.objects.all(), narrow),
+    ):
+        rows = list(Employee.objects.values_list(*columns)[:100])
+        with timed('login_lookup', layout=layout, requests=requests) as result:
+            for i in range(requests):
+                queryset.get(email=emails[i % len(emails)])
+        result['ms_per_query'] = result['seconds'] / requests * 1000
+        result['row_bytes'] = sum(len(str(value)) for row in rows for value in row if value is not None) / len(rows)
+        results.append(result)
+    return results
+
+
+def benchmark_payroll(size=100_000, **options):
+    """
+    Full payroll export in each format over ``size`` seeded employees, with
+    the peak Python allocation of a second, traced pass, and the summary
+    queries.
+    """
+    import tracemalloc
+
+    from .payroll import FORMATS, SUMMARY_GROUPS, export_payroll, payroll_summary
+
+    with timed('seed', size=size):
+        seed_employees(size, batch_size=5000)
+    results = []
+    for file_format in FORMATS:
+        with timed('payroll_export', file_format=file_format, size=size) as result:
+            exported = sum(len(chunk) for chunk in export_payroll(file_format))
+        tracemalloc.start()
+        try:
+            for _ in export_payroll(file_format):
+                pass
+            result['peak_kib'] = tracemalloc.get_traced_memory()[1] / 1024
+        finally:
+            tracemalloc.stop()
+        result['rows_per_second'] = size / result['seconds']
+        result['output_kib'] = exported / 1024
+        results.append(result)
+    for group_by in SUMMARY_GROUPS:
+        with timed('payroll_summary', group_by=group_by, size=size) as result:
+            payroll_summary(group_by)
+        result['ms_per_query'] = result['seconds'] * 1000
+        results.append(result)
+    return results
+
+
+def benchmark_staffing(size=20_000, requests=200, **options):
+    """
+    Staffing drill-down read from the rollup vs the same ``GROUP BY`` over
+    the employee tables, at the top level and within one region.
+    """
+    from django.db.models import Count
+
+    from .rollups import staffing_breakdown
+
+    with timed('seed', size=size):
+        seed_employees(size, batch_size=5000)
+    results = []
+    for filters, level in (({}, 'region'), ({'region': REGIONS[0]}, 'zone')):
+        with timed('staffing', source='rollup', filters=filters, requests=requests) as result:
+            for _ in range(requests):
+                staffing_breakdown(**filters)
+        result['ms_per_query'] = result['seconds'] / requests * 1000
+        results.append(result)
+        with timed('staffing', source='group_by', filters=filters, requests=requests) as result:
+            for _ in range(requests):
+                list(
+                    EmployeeProfile.objects.filter(**filters)
+                    .values(level, 'employee__role', 'employee__gender').annotate(headcount=Count('pk')).order_by()
+                )
+        result['ms_per_query'] = result['seconds'] / requests * 1000
+        results.append(result)
+    return results
+
+
+def benchmark_search(size=100_000, requests=200, **options):
+    """Search and autocomplete latency over ``size`` seeded employees."""
+    from .search import get_search_backend
+
+    with timed('seed', size=size):
+        seed_employees(size, batch_size=5000)
+    backend = get_search_backend()
+    prefixes = ['fi', 'first1', 'first12', 'father9', 'first4 father4']
+    results = []
+    for prefix in prefixes:
+        with timed('autocomplete', backend=type(backend).__name__, prefix=prefix, requests=requests) as result:
+            for _ in range(requests):
+                list(backend.autocomplete(prefix, limit=10).only('id', 'first_name'))
+        result['ms_per_query'] = result['seconds'] / requests * 1000
+        results.append(result)
+    for query, filters in (
+        ('first12', {}), ('oromia', {'role': 'Doctor'}), ('', {'profile__region': 'Amhara', 'profile__zone': 'Zone 3'}),
+    ):
+        with timed('search', backend=type(backend).__name__, query=query, filters=filters, requests=requests) as result:
+            for _ in range(requests):
+                queryset = Employee.objects.filter(**filters).only('id', 'first_name').order_by('id')
+                list(backend.filter_queryset(queryset, query)[:50])
+        result['ms_per_query'] = result['seconds'] / requests * 1000
+        results.append(result)
+    return results
+
+
+@contextmanager
+def temporary_database(profile):
+    """
+    Point the default alias at a freshly migrated SQLite file configured by
+    ``profile`` for the duration of the block. In-memory test databases
+    have no journal or file locking, so they can't show the difference.
+    """
+    from django.core.management import call_command
+    from django.db import connections
+
+    from clinic_Management.databases import database_profile
+
+    saved = connections.settings['default']
+    with tempfile.TemporaryDirectory() as directory:
+        connections['default'].close()
+        connections.settings['default'] = {
+            **saved, 'CONN_MAX_AGE': 0, 'OPTIONS': {},
+            **database_profile(profile, Path(directory) / 'benchmark.sqlite3'),
+        }
+        del connections['default']
+        try:
+            call_command('migrate', verbosity=0)
+            yield
+        finally:
+            # Events buffered by the block belong to the database being dropped.
+            audit_log.clear()
+            connections.close_all()
+            connections.settings['default'] = saved
+            del connections['default']
+
+
+def benchmark_database(requests=2000, concurrency=8, size=1000, **options):
+    """
+    Requests/sec and failures for /api/login/ and /api/register/ under
+    ``concurrency`` threads, per SQLite profile, on a file database. Passwords
+    use MD5 so the numbers measure the database, not PBKDF2.
+    """
+    from django.db import close_old_connections
+    from django.test import override_settings
+    from rest_framework.test import APIRequestFactory
+
+    from .views import EmployeeRegistrationView, LoginView
+
+    factory = APIRequestFactory()
+    login = LoginView.as_view()
+    register = EmployeeRegistrationView.as_view()
+    results = []
+    fast_hashers = ['django.contrib.auth.hashers.MD5PasswordHasher']
+    with override_settings(PASSWORD_HASHERS=fast_hashers, CLINIC_RATE_LIMITS=UNLIMITED):
+        for profile in ('sqlite-basic', 'sqlite'):
+            with temporary_database(profile):
+                seed_employees(size)
+                numbers = itertools.count(size)
+
+                def call(i):
+                    # Mimic one request/response cycle of a threaded server.
+                    if i % 4 == 0:
+                        n = next(numbers)
+                        data = {**employee_fields(n), 'password': BENCHMARK_PASSWORD}
+                        response = register(factory.post('/api/register/', data, format='json'))
+                    else:
+                        data = {'email': employee_fields(i % size)['email'], 'password': BENCHMARK_PASSWORD}
+                        response = login(factory.post('/api/login/', data, format='json'))
+                    close_old_connections()
+                    return response.status_code
+
+                def worker(batch):
+                    codes = []
+                    for i in batch:
+                        try:
+                            codes.append(call(i))
+                        except Exception as exc:
+                            logger.debug('request %s failed: %s', i, exc)
+                            codes.append(type(exc).__name__)
+                    close_old_connections()
+                    return codes
+
+                with timed('database', profile=profile, requests=requests, concurrency=concurrency) as result:
+                    with ThreadPoolExecutor(concurrency) as executor:
+                        batches = [range(t, requests, concurrency) for t in range(concurrency)]
+                        codes = [code for batch in executor.map(worker, batches) for code in batch]
+                result['requests_per_second'] = requests / result['seconds']
+                result['failures'] = sum(code not in (200, 201) for code in codes)
+                results.append(result)
+    return results
+
+
+# Run in a fresh interpreter by ``boot_process``: build the WSGI handler and
+# serve one unauthenticated request, which resolves the URLconf and so
+# imports every view.
+BOOT_SCRIPT = """
+import json, sys, time
+from wsgiref.util import setup_testing_defaults
+start = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+booted = time.perf_counter()
+environ = {'PATH_INFO': sys.argv[1]}
+setup_testing_defaults(environ)
+status = []
+b''.join(application(environ, lambda line, headers, exc_info=None: status.append(line)))
+print(json.dumps({
+    'boot_ms': (booted - start) * 1000,
+    'first_request_ms': (time.perf_counter() - booted) * 1000,
+    'status': int(status[0].split()[0]),
+    'modules': sorted(sys.modules),
+}))
+"""
+
+
+def parse_importtime(output):
+    """
+    ``{module: (self_us, cumulative_us)}`` from ``python -X importtime``
+    output. Modules loaded with ``importlib.import_module`` (installed apps,
+    middleware) aren't reported, only what they import in turn.
+    """
+    timings = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if self_us.strip().isdigit():
+            timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def boot_process(settings_module, path='/api/employees/', importtime=False):
+    """
+    Boot the project under ``settings_module`` in a new interpreter; see
+    ``BOOT_SCRIPT``. With ``importtime``, adds ``import_ms``, the summed
+    import time, and ``imports``, the parsed timings.
+    """
+    env = {
+        **os.environ,
+        'DJANGO_SETTINGS_MODULE': settings_module,
+        'PYTHONPATH': os.pathsep.join(filter(None, (str(settings.BASE_DIR), os.environ.get('PYTHONPATH')))),
+    }
+    command = [sys.executable, *(['-X', 'importtime'] if importtime else []), '-c', BOOT_SCRIPT, path]
+    process = subprocess.run(command, env=env, cwd=settings.BASE_DIR, capture_output=True, text=True, check=True)
+    result = json.loads(process.stdout.splitlines()[-1])
+    if importtime:
+        result['imports'] = parse_importtime(process.stderr)
+        result['import_ms'] = sum(self_us for self_us, _ in result['imports'].values()) / 1000
+    return result
+
+
+def benchmark_startup(rounds=5, **options):
+    """
+    Cold start of the full and the API-only settings profiles: time to build
+    the WSGI handler and to serve the first request (medians of ``rounds``
+    fresh interpreters), modules loaded, and total import time.
+    """
+    results = []
+    for settings_module in ('clinic_Management.settings', 'clinic_Management.settings_api'):
+        with timed('startup', settings=settings_module, rounds=rounds) as result:
+            runs = [boot_process(settings_module) for _ in range(rounds)]
+        traced = boot_process(settings_module, importtime=True)
+        result['boot_ms'] = statistics.median(run['boot_ms'] for run in runs)
+        result['first_request_ms'] = statistics.median(run['first_request_ms'] for run in runs)
+        result['modules'] = len(runs[0]['modules'])
+        result['import_ms'] = traced['import_ms']
+        results.append(result)
+    return results
+
+
+def benchmark_renderers(sizes=(1_000, 10_000), rounds=5, size=None, **options):
+    """
+    Body size and encoding time of an ``EmployeeSerializer`` list of each
+    of ``sizes`` employees per renderer, against the stock ``JSONRenderer``,
+    and of each renderer's body per available content coding.
+    """
+    from rest_framework.renderers import JSONRenderer
+
+    from .compression import available_encodings, compress
+    from .renderers import MessagePackRenderer, ORJSONRenderer, msgpack, orjson
+    from .serializers import EmployeeSerializer
+
+    sizes = (size,) if size else sizes
+    renderers = {'json': JSONRenderer()}
+    if orjson is not None:
+        renderers['orjson'] = ORJSONRenderer()
+    if msgpack is not None:
+        renderers['msgpack'] = MessagePackRenderer()
+    seed_employees(max(sizes))
+    serializer = EmployeeSerializer()
+    results = []
+    for count in sizes:
+        data = EmployeeSerializer(
+            serializer.optimize_queryset(Employee.objects.order_by('pk'))[:count], many=True,
+        ).data
+        for name, renderer in renderers.items():
+            with timed('render', renderer=name, size=count, rounds=rounds) as result:
+                for _ in range(rounds):
+                    body = renderer.render(data)
+            result['ms_per_render'] = result['seconds'] / rounds * 1000
+            result['output_kib'] = len(body) / 1024
+            results.append(result)
+            for encoding in available_encodings():
+                with timed('compress', renderer=name, encoding=encoding, size=count, rounds=rounds) as result:
+                    for _ in range(rounds):
+                        compressed = compress(body, encoding)
+                result['ms_per_render'] = result['seconds'] / rounds * 1000
+                result['output_kib'] = len(compressed) / 1024
+                results.append(result)
+    return results
+
+
+# Direction in which each reported figure gets worse, for baseline checks.
+REGRESSION_DIRECTIONS = {
+    'p50_ms': 'up',
+    'p95_ms': 'up',
+    'p99_ms': 'up',
+    'ms_per_query': 'up',
+    'ms_per_hash': 'up',
+    'us_per_request': 'up',
+    'boot_ms': 'up',
+    'first_request_ms': 'up',
+    'import_ms': 'up',
+    'ms_per_render': 'up',
+    'modules': 'up',
+    'row_bytes': 'up',
+    'peak_kib': 'up',
+    'requests_per_second': 'down',
+    'rows_per_second': 'down',
+    'hashes_per_second': 'down',
+}
+
+
+def latency_summary(latencies, seconds):
+    """p50/p95/p99 in milliseconds and throughput for one scenario."""
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+    return {
+        'p50_ms': cuts[49] * 1000,
+        'p95_ms': cuts[94] * 1000,
+        'p99_ms': cuts[98] * 1000,
+        'requests_per_second': len(latencies) / seconds,
+    }
+
+
+MEASURED = set(REGRESSION_DIRECTIONS) | {'seconds', 'failures', 'output_kib'}
+
+
+def result_key(result):
+    """Identify a result by everything in it that isn't a measurement."""
+    return tuple(sorted((name, str(value)) for name, value in result.items() if name not in MEASURED))
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """
+    Messages for every figure in ``results`` more than ``tolerance`` (a
+    fraction) worse than the matching entry of ``baseline``. Results with no
+    baseline entry are not compared.
+    """
+    previous = {result_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        reference = previous.get(result_key(result))
+        if reference is None:
+            continue
+        for metric, direction in REGRESSION_DIRECTIONS.items():
+            if metric not in result or not reference.get(metric):
+                continue
+            change = (result[metric] - reference[metric]) / reference[metric]
+            if (change if direction == 'up' else -change) > tolerance:
+                label = ' '.join(f'{name}={value}' for name, value in result_key(result))
+                regressions.append(
+                    f'{label}: {metric} {reference[metric]:.2f} -> {result[metric]:.2f} ({change:+.0%})'
+                )
+    return regressions
+
+
+def load_scenarios(employees, requests, numbers):
+    """
+    ``{scenario: [(path, payload, expected_status), ...]}`` for the auth and
+    registration endpoints. Single-use inputs (refresh tokens, which rotate,
+    reset tokens, which die with the password they were issued for, and new
+    registrations) are generated up front so they are not timed.
+    """
+    from django.contrib.auth.tokens import default_token_generator
+    from django.utils.encoding import force_bytes
+    from django.utils.http import urlsafe_base64_encode
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    def credentials(i):
+        return {'email': employees[i % len(employees)].email, 'password': BENCHMARK_PASSWORD}
+
+    def reset_path(employee):
+        uid = urlsafe_base64_encode(force_bytes(employee.pk))
+        return f'/api/reset/{uid}/{default_token_generator.make_token(employee)}/'
+
+    return {
+        'login': [('/api/login/', credentials(i), 200) for i in range(requests)],
+        'token': [('/api/token/', credentials(i), 200) for i in range(requests)],
+        'token_refresh': [
+            ('/api/token/refresh/', {'refresh': str(RefreshToken.for_user(employees[i % len(employees)]))}, 200)
+            for i in range(requests)
+        ],
+        'register': [
+            ('/api/register/', {**employee_fields(n), 'password': BENCHMARK_PASSWORD}, 201)
+            for n in itertools.islice(numbers, requests)
+        ],
+        'password_reset_request': [
+            ('/api/password/reset/', {'email': employees[i % len(employees)].email}, 200) for i in range(requests)
+        ],
+        'password_reset_confirm': [
+            (reset_path(employee), {'new_password': BENCHMARK_PASSWORD}, 200)
+            for employee in employees[:requests]
+        ],
+    }
+
+
+def run_wsgi(calls, concurrency):
+    """
+    Drive ``calls`` through Django's test client (the full WSGI handler and
+    middleware stack), one client per thread. Returns per-request latencies
+    and the number of unexpected statuses.
+    """
+    from django.db import connections
+    from django.test import Client
+
+    def worker(batch):
+        client = Client()
+        latencies, failures = [], 0
+        for path, payload, expected in batch:
+            start = time.perf_counter()
+            response = client.post(path, payload, content_type='application/json')
+            latencies.append(time.perf_counter() - start)
+            failures += response.status_code != expected
+        return latencies, failures
+
+    if concurrency <= 1:
+        return worker(calls)
+
+    def threaded_worker(batch):
+        try:
+            return worker(batch)
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        outcomes = list(executor.map(threaded_worker, [calls[t::concurrency] for t in range(concurrency)]))
+    return [latency for latencies, _ in outcomes for latency in latencies], sum(failures for _, failures in outcomes)
+
+
+def run_asgi(calls, concurrency):
+    """As ``run_wsgi`` but through the ASGI handler, ``concurrency`` requests in flight."""
+    import asyncio
+
+    from asgiref.sync import async_to_sync
+    from django.test import AsyncClient
+
+    async def drive():
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(path, payload, expected):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(path, payload, content_type='application/json')
+                return time.perf_counter() - start, response.status_code != expected
+
+        outcomes = await asyncio.gather(*(one(*call) for call in calls))
+        return [latency for latency, _ in outcomes], sum(failed for _, failed in outcomes)
+
+    # async_to_sync keeps thread-sensitive (ORM) work on this thread's connection.
+    return async_to_sync(drive)()
+
+
+def benchmark_load(requests=200, concurrency=8, size=1000, fast_hashers=False, **options):
+    """
+    p50/p95/p99 latency and requests/sec for the auth, token, registration and
+    password-reset endpoints through the WSGI and ASGI handlers. SQLite runs
+    use a file database with the configured profile, as in production.
+    """
+    from django.db import connection
+    from django.test import override_settings
+
+    from .authentication import user_cache
+
+    hashers = ['django.contrib.auth.hashers.MD5PasswordHasher'] if fast_hashers else settings.PASSWORD_HASHERS
+    if connection.vendor == 'sqlite':
+        database = temporary_database(settings.CLINIC_DB_PROFILE)
+    else:
+        database = nullcontext()
+    results = []
+    with override_settings(PASSWORD_HASHERS=hashers, CLINIC_RATE_LIMITS=UNLIMITED), database:
+        with timed('seed', size=size):
+            seed_employees(size)
+        numbers = itertools.count(size)
+        for runner_name, runner in (('wsgi', run_wsgi), ('asgi', run_asgi)):
+            user_cache.clear()
+            # Reloaded per runner: reset tokens depend on the current password hash.
+            employees = list(Employee.objects.order_by('pk')[:size])
+            for scenario, calls in load_scenarios(employees, requests, numbers).items():
+                with timed('load', runner=runner_name, scenario=scenario, concurrency=concurrency) as result:
+                    latencies, failures = runner(calls, concurrency)
+                result.update(latency_summary(latencies, result['seconds']), failures=failures)
+                results.append(result)
+    return results
+
+
+SUITES = {
+    'auth': benchmark_auth,
+    'database': benchmark_database,
+    'load': benchmark_load,
+    'payroll': benchmark_payroll,
+    'permissions': benchmark_permissions,
+    'renderers': benchmark_renderers,
+    'schema': benchmark_schema,
+    'hashers': benchmark_hashers,
+    'search': benchmark_search,
+    'staffing': benchmark_staffing,
+    'startup': benchmark_startup,
+}
@@ -0,0 +1,102 @@
+# clinic/cache.py
+import time
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+VERSION_TIMEOUT = None  # version stamps never expire on their own
+
+
+def _version_key(pk):
+    return f'clinic:employee:{pk}:version'
+
+
+def get_employee_version(pk):
+    """
+    Return the current cache version for an employee.
+
+    A missing stamp is seeded from the clock rather than 1 so that entries
+    written under an evicted stamp can never be mistaken for current ones.
+    """
+    key = _version_key(pk)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(key, version, VERSION_TIMEOUT):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_employee_version(pk):
+    key = _version_key(pk)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = time.time_ns()
+        cache.set(key, version, VERSION_TIMEOUT)
+        return version
+
+
+def bump_employee_versions(pks):
+    for pk in pks:
+        bump_employee_version(pk)
+
+
+COLLECTION_VERSION_KEY = 'clinic:employees:version'
+
+
+def get_collection_version():
+    """
+    Return the version stamp of the employee collection as a whole: the
+    ``time_ns()`` of the last employee write, seeded from the clock if missing.
+    """
+    version = cache.get(COLLECTION_VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(COLLECTION_VERSION_KEY, version, VERSION_TIMEOUT):
+            version = cache.get(COLLECTION_VERSION_KEY, version)
+    return version
+
+
+def _restamp_collection():
+    cache.set(COLLECTION_VERSION_KEY, time.time_ns(), VERSION_TIMEOUT)
+
+
+def bump_collection_version():
+    """
+    Restamp the employee collection now and again once the current
+    transaction commits, so a page read from the old rows in between is
+    never cached under the final stamp.
+    """
+    _restamp_collection()
+    if connection.in_atomic_block:
+        transaction.on_commit(_restamp_collection)
+
+
+def _group_version_key(pk):
+    return f'clinic:group:{pk}:version'
+
+
+def get_group_versions(pks):
+    """Version stamps for several groups at once, seeding any that are missing."""
+    keys = {pk: _group_version_key(pk) for pk in pks}
+    found = cache.get_many(keys.values())
+    versions = {}
+    for pk, key in keys.items():
+        version = found.get(key)
+        if version is None:
+            version = time.time_ns()
+            if not cache.add(key, version, VERSION_TIMEOUT):
+                version = cache.get(key, version)
+        versions[pk] = version
+    return versions
+
+
+def bump_group_version(pk):
+    key = _group_version_key(pk)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = time.time_ns()
+        cache.set(key, version, VERSION_TIMEOUT)
+        return version
@@ -0,0 +1,50 @@
+# clinic/compression.py
+"""
+Response compression for ``clinic.middleware.CompressionMiddleware``.
+
+The encoding is negotiated from ``Accept-Encoding``: brotli (``br``) when
+the brotli package is installed, else gzip. Only API content types of at
+least ``MIN_BYTES`` are compressed; streamed responses (payroll exports,
+media files) are left alone.
+"""
+import gzip
+
+from .conf import clinic_setting
+
+try:
+    import brotli
+except ImportError:  # optional; only gzip is offered without it
+    brotli = None
+
+
+def available_encodings():
+    """Supported content codings, most preferred first."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(header):
+    """The best supported coding ``Accept-Encoding`` allows, or ``None``."""
+    weights = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                continue
+        weights[coding.strip().lower()] = weight
+    best = None
+    for coding in available_encodings():
+        weight = weights.get(coding, weights.get('*', 0))
+        if weight > 0 and (best is None or weight > best[1]):
+            best = (coding, weight)
+    return best and best[0]
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=clinic_setting('COMPRESSION', 'BROTLI_QUALITY'))
+    # mtime=0 keeps the output identical for identical content.
+    return gzip.compress(content, compresslevel=clinic_setting('COMPRESSION', 'GZIP_LEVEL'), mtime=0)
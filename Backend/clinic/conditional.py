@@ -0,0 +1,93 @@
+# clinic/conditional.py
+"""
+Conditional GET for the employee read endpoints.
+
+A detail response is validated by the employee's ``updated_at``; a list
+response by the collection stamp ``clinic.signals`` bumps in the cache on
+every employee write (see ``clinic.cache.bump_collection_version``), and its
+rendered page data is cached under the resulting ETag, so an unchanged page
+costs no query at all. Matching ``If-None-Match``/``If-Modified-Since``
+headers get a 304 before the queryset runs.
+"""
+import datetime
+import hashlib
+
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from .cache import get_collection_version
+from .conf import clinic_setting
+
+
+def collection_version():
+    """``(stamp, last_modified)`` for the employee table as a whole."""
+    version = get_collection_version()
+    return str(version), datetime.datetime.fromtimestamp(version / 1e9, tz=datetime.timezone.utc)
+
+
+def _digest(*parts):
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+
+class ConditionalGetMixin:
+    """
+    Sets ``ETag``/``Last-Modified`` on GET responses and answers matching
+    conditional requests with 304. Views return ``(etag_digest,
+    last_modified)`` from ``get_validators()``, or ``None`` to skip; it runs
+    after authentication and permission checks. Views with their own
+    ``get()`` call ``conditional_response()`` themselves.
+    """
+
+    def get_validators(self):
+        raise NotImplementedError
+
+    def validator_digest(self, *parts):
+        # The rendered representation depends on the URL and the negotiated format.
+        return _digest(type(self).__name__, self.request.get_full_path(), self.request.accepted_media_type, *parts)
+
+    def get(self, request, *args, **kwargs):
+        return self.conditional_response(request, lambda: super(ConditionalGetMixin, self).get(request, *args, **kwargs))
+
+    def conditional_response(self, request, respond):
+        """A 304 if the client's copy is current, otherwise ``respond()`` with validators attached."""
+        validators = self.get_validators() if clinic_setting('HTTP_CACHE', 'ENABLED') else None
+        if validators is None:
+            return respond()
+        digest, last_modified = validators
+        etag = f'"{digest}"'
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = respond()
+        if response.status_code in (200, 304):
+            response.headers['ETag'] = etag
+            if timestamp is not None:
+                response.headers['Last-Modified'] = http_date(timestamp)
+            # Clients may keep the body but must revalidate; shared caches must not.
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ('Authorization',))
+        return response
+
+
+class CachedListMixin(ConditionalGetMixin):
+    """List views validated by ``collection_version()``, with page data cached per ETag."""
+    response_cache_key = None
+
+    def get_validators(self):
+        stamp, last_modified = collection_version()
+        digest = self.validator_digest(stamp)
+        self.response_cache_key = f'clinic:http:{digest}'
+        return digest, last_modified
+
+    def list(self, request, *args, **kwargs):
+        if self.response_cache_key is None:
+            return super().list(request, *args, **kwargs)
+        cache = caches[clinic_setting('HTTP_CACHE', 'CACHE')]
+        data = cache.get(self.response_cache_key)
+        if data is not None:
+            return Response(data)
+        response = super().list(request, *args, **kwargs)
+        cache.set(self.response_cache_key, response.data, clinic_setting('HTTP_CACHE', 'TIMEOUT'))
+        return response
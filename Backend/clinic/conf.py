@@ -0,0 +1,163 @@
+# clinic/conf.py
+"""
+Defaults for the app's ``CLINIC_*`` settings.
+
+Groups (``CLINIC_AUDIT = {...}``) are read key by key, so a project sets
+only the keys it changes; flat settings (``CLINIC_SEARCH_BACKEND``) are read
+whole. Either way ``clinic_setting()`` reads them when they're needed, so
+``override_settings`` applies everywhere.
+"""
+from django.conf import settings
+
+DEFAULTS = {
+    # Outbound mail queue drained by `manage.py run_mail_worker`.
+    'MAIL_QUEUE': {
+        'BATCH_SIZE': 50,
+        'MAX_ATTEMPTS': 5,
+        'BACKOFF_SECONDS': 30,
+        'MAX_BACKOFF_SECONDS': 60 * 60,
+        'LEASE_SECONDS': 5 * 60,
+    },
+    # PBKDF2 iteration counts per cost profile (None = Django's default,
+    # 870_000 in Django 5.1). 'reduced' is OWASP's 600_000 floor for
+    # PBKDF2-SHA256: cheaper logins on small hosts at weaker storage than the
+    # default, so only pick it deliberately. Compare them with
+    # `manage.py benchmark hashers` before switching. Hashes are upgraded on
+    # each user's next login when the profile raises the count; lowering it
+    # only affects new hashes.
+    'PASSWORD_HASH_PROFILES': {
+        'standard': None,
+        'reduced': 600_000,
+    },
+    'PASSWORD_HASH_PROFILE': 'standard',
+    # Thread pool used by the async auth views for PBKDF2 work. Requests
+    # beyond WORKERS + MAX_QUEUE outstanding hashes get a 503 (None = one
+    # per CPU).
+    'HASHING_POOL': {
+        'WORKERS': None,
+        'MAX_QUEUE': 64,
+    },
+    # In-process cache of the slim Employee rows behind access tokens.
+    'AUTH_USER_CACHE': {
+        'MAX_SIZE': 1024,
+        'TTL': 60,
+    },
+    # Revoked refresh tokens remembered in-process, and expired rows deleted
+    # per revocation.
+    'TOKEN_REVOCATION': {
+        'LOCAL_CACHE_SIZE': 100_000,
+        'PURGE_BATCH': 500,
+    },
+    # Compiled permission sets kept per process (clinic.access).
+    'PERMISSION_CACHE': {
+        'MAX_SIZE': 4096,
+        'TTL': 300,
+    },
+    # Sliding-window limits for the unauthenticated auth endpoints plus
+    # progressive lockout after failed logins. Use
+    # 'clinic.ratelimit.CacheCounterStore' with a shared CACHES backend when
+    # running several worker processes.
+    'RATE_LIMITS': {
+        'STORE': 'clinic.ratelimit.MemoryCounterStore',
+        # Keyed by '<view throttle_scope>_<ip|email>'; missing scopes are unlimited.
+        'RATES': {
+            'login_ip': '30/min',
+            'login_email': '10/min',
+            'password_reset_ip': '10/hour',
+            'password_reset_email': '3/hour',
+        },
+        # Merged key by key with the configured LOCKOUT.
+        'LOCKOUT': {
+            'FAILURES': 5,
+            'IP_FAILURES': 20,
+            'WINDOW': 15 * 60,
+            'BASE_SECONDS': 60,
+            'MAX_SECONDS': 60 * 60,
+            'RESET_AFTER': 24 * 60 * 60,
+        },
+    },
+    # Request telemetry (clinic.middleware.PerformanceMiddleware), scraped
+    # from /metrics by ALLOWED_IPS (None = anyone). SAMPLE_RATE is the
+    # fraction of requests measured; ENABLED=False drops the middleware.
+    'METRICS': {
+        'ENABLED': True,
+        'SAMPLE_RATE': 1.0,
+        'SERVER_TIMING': True,
+        'ALLOWED_IPS': ('127.0.0.1', '::1'),
+    },
+    # Bulk employee import: rows per bulk_create chunk and password-hashing
+    # processes (None = one per CPU, 1 = hash in the request process).
+    # Upload requests share one such pool per worker process, started on
+    # first use.
+    'IMPORT_CHUNK_SIZE': 500,
+    'IMPORT_WORKERS': None,
+    # Employee search backend; the FTS5 backend falls back to the portable
+    # database backend automatically on non-SQLite databases.
+    'SEARCH_BACKEND': 'clinic.search.SQLiteFTSSearchBackend',
+    # Resumable uploads (/api/uploads/). Partial uploads are spooled under
+    # SPOOL_DIR (default MEDIA_ROOT/.uploads); the same per-kind MAX_BYTES
+    # caps apply to files sent inline with registration.
+    'UPLOADS': {
+        'SPOOL_DIR': None,
+        'MAX_BYTES': {'image': 10 * 1024 * 1024, 'pdf': 25 * 1024 * 1024},
+        'MAX_CHUNK_BYTES': 4 * 1024 * 1024,
+        'THUMBNAIL_SIZE': (160, 160),
+    },
+    # Authenticated media serving (/api/employees/<pk>/media/<kind>/). Set
+    # ACCEL_REDIRECT to an nginx `internal` location aliasing MEDIA_ROOT to
+    # let nginx send the bytes; resized copies live in RESIZE_CACHE_DIR
+    # (default MEDIA_ROOT/.resized), evicted LRU beyond
+    # RESIZE_CACHE_MAX_BYTES.
+    'MEDIA': {
+        'ACCEL_REDIRECT': None,
+        'RESIZE_SIZES': (32, 64, 128, 256),
+        'RESIZE_CACHE_DIR': None,
+        'RESIZE_CACHE_MAX_BYTES': 256 * 1024 * 1024,
+    },
+    # Payroll exports (/api/payroll/export/, manage.py export_payroll):
+    # CHUNK_SIZE rows are fetched per database round trip and written per
+    # streamed chunk.
+    'PAYROLL': {
+        'CHUNK_SIZE': 2000,
+    },
+    # Account audit trail (clinic.audit). Events are buffered in-process and
+    # written BATCH_SIZE at a time once the batch fills or the oldest event
+    # is FLUSH_SECONDS old; use 'clinic.audit.NDJSONSink' to append to daily
+    # files under NDJSON_DIR instead of the AuditEvent table.
+    'AUDIT': {
+        'SINK': 'clinic.audit.DatabaseSink',
+        'BATCH_SIZE': 200,
+        'FLUSH_SECONDS': 5.0,
+        'MAX_BUFFER': 50_000,
+        'MAX_ATTEMPTS': 5,
+        'NDJSON_DIR': None,
+    },
+    # Response compression (clinic.middleware.CompressionMiddleware): brotli,
+    # when the brotli package is installed, or gzip, for API responses of at
+    # least MIN_BYTES whose client sends Accept-Encoding.
+    'COMPRESSION': {
+        'ENABLED': True,
+        'MIN_BYTES': 1024,
+        'CONTENT_TYPES': ('application/json', 'application/msgpack'),
+        'GZIP_LEVEL': 6,
+        'BROTLI_QUALITY': 5,
+    },
+    # Conditional GET on the employee read endpoints (clinic.conditional):
+    # ETag/Last-Modified validators and 304s, with list page data kept in
+    # CACHE for TIMEOUT seconds under each collection ETag.
+    'HTTP_CACHE': {
+        'ENABLED': True,
+        'CACHE': 'default',
+        'TIMEOUT': 300,
+    },
+}
+
+
+def clinic_setting(group, name=None):
+    """
+    ``settings.CLINIC_<group>[name]``, or the whole flat
+    ``settings.CLINIC_<group>`` without a ``name``; defaults from ``DEFAULTS``.
+    """
+    if name is None:
+        return getattr(settings, f'CLINIC_{group}', DEFAULTS[group])
+    return getattr(settings, f'CLINIC_{group}', {}).get(name, DEFAULTS[group][name])
@@ -0,0 +1,21 @@
+# clinic/counters.py
+"""Counter tables kept up to date with single-row ``F()`` increments."""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+
+def upsert_increment(model, lookup, deltas):
+    """
+    Add each ``{column: delta}`` in ``deltas`` to the ``model`` row matching
+    ``lookup``, creating the row when there is none. A missing row is not
+    created for a negative delta, as there is nothing to take it from.
+    """
+    increments = {column: F(column) + delta for column, delta in deltas.items()}
+    if model.objects.filter(**lookup).update(**increments) or any(delta < 0 for delta in deltas.values()):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # A concurrent writer created the row first.
+        model.objects.filter(**lookup).update(**increments)
@@ -0,0 +1,34 @@
+# clinic/hashers.py
+import time
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, must_update_salt
+
+from .conf import clinic_setting
+from .metrics import record_hash
+
+
+class ProfiledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with its work factor taken from the active entry of
+    ``CLINIC_PASSWORD_HASH_PROFILES``. It shares Django's algorithm name, so
+    existing hashes keep verifying. A hash is re-encoded on the next login
+    when the profile asks for more iterations than it was made with, never
+    to lower them.
+    """
+
+    @property
+    def iterations(self):
+        profiles = clinic_setting('PASSWORD_HASH_PROFILES')
+        return profiles.get(clinic_setting('PASSWORD_HASH_PROFILE')) or PBKDF2PasswordHasher.iterations
+
+    def must_update(self, encoded):
+        decoded = self.decode(encoded)
+        return decoded['iterations'] < self.iterations or must_update_salt(decoded['salt'], self.salt_entropy)
+
+    def encode(self, password, salt, iterations=None):
+        # verify() and harden_runtime() both go through encode().
+        start = time.perf_counter()
+        try:
+            return super().encode(password, salt, iterations)
+        finally:
+            record_hash(time.perf_counter() - start)
@@ -0,0 +1,121 @@
+# clinic/hashing.py
+"""
+Bounded worker pool for password hashing.
+
+``hashlib.pbkdf2_hmac`` releases the GIL, so a thread pool hashes in parallel
+without having to pickle model instances across processes. Work beyond
+``WORKERS + MAX_QUEUE`` outstanding jobs is refused with
+``HashingPoolSaturated`` instead of queueing without limit. The pool's
+occupancy and rejections are exported at /metrics (``clinic.metrics``).
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .conf import clinic_setting
+from .metrics import registry
+
+
+class HashingPoolSaturated(Exception):
+    pass
+
+
+class HashingPool:
+    def __init__(self, workers=None, max_queue=64):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='clinic-hash')
+        self._slots = threading.BoundedSemaphore(self.workers + max_queue)
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._busy_seconds = 0.0
+
+    def submit(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise HashingPoolSaturated('Password hashing queue is full')
+        with self._lock:
+            self._submitted += 1
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        try:
+            # Run in the caller's context so per-request telemetry sees the work.
+            return self._executor.submit(contextvars.copy_context().run, self._call, fn, args, kwargs)
+        except BaseException:
+            self._release(0.0)
+            raise
+
+    def _call(self, fn, args, kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._release(time.perf_counter() - start)
+
+    def _release(self, seconds):
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+            self._busy_seconds += seconds
+        self._slots.release()
+
+    async def run(self, fn, *args, **kwargs):
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'rejected': self._rejected,
+                'in_flight': self._in_flight,
+                'queued': max(0, self._in_flight - self.workers),
+                'peak_in_flight': self._peak_in_flight,
+                'busy_seconds': self._busy_seconds,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hashing_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashingPool(
+                    workers=clinic_setting('HASHING_POOL', 'WORKERS'),
+                    max_queue=clinic_setting('HASHING_POOL', 'MAX_QUEUE'),
+                )
+    return _pool
+
+
+def collect_metrics():
+    """The shared pool's ``stats()`` as /metrics samples, once the pool exists."""
+    if _pool is None:
+        return []
+    stats = _pool.stats()
+    return [
+        (f'clinic_hashing_pool_{name}', {}, stats[key])
+        for name, key in (
+            ('workers', 'workers'), ('in_flight', 'in_flight'), ('queued', 'queued'),
+            ('completed_total', 'completed'), ('rejected_total', 'rejected'), ('busy_seconds_total', 'busy_seconds'),
+        )
+    ]
+
+
+registry.add_collector(collect_metrics)
@@ -0,0 +1,257 @@
+# clinic/importers.py
+"""
+Streaming bulk import of employees from CSV or NDJSON.
+
+Rows are read one at a time, validated with the ``EmployeeSerializer`` field
+rules, and written with ``bulk_create`` in chunks. Password hashing for each
+chunk is spread across a process pool since PBKDF2 dominates the cost; the
+upload view shares one pool per process (``get_import_pool``) rather than
+starting one per request.
+"""
+import csv
+import io
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, Permission
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+from .conf import clinic_setting
+from .models import Employee
+from .serializers import EmployeeSerializer
+from .signals import employees_imported
+
+FORMATS = ('csv', 'ndjson')
+LIST_SEPARATOR = ';'
+MAX_REPORTED_ERRORS = 1000
+
+
+class EmployeeImportSerializer(EmployeeSerializer):
+    """
+    ``EmployeeSerializer`` rules minus the per-row database work: uniqueness
+    and group/permission lookups are checked once per chunk by the importer.
+    """
+    groups = serializers.ListField(child=serializers.CharField(), required=False)
+    user_permissions = serializers.ListField(child=serializers.CharField(), required=False)
+
+    class Meta(EmployeeSerializer.Meta):
+        fields = [
+            name for name in EmployeeSerializer.Meta.fields
+            if name not in ('id', 'image', 'pdf', 'is_active')
+        ]
+        extra_kwargs = {
+            'password': {'write_only': True},
+            'email': {'validators': []},
+            'emp_id': {'validators': []},
+        }
+
+
+def detect_format(filename='', content_type=''):
+    if content_type.startswith('text/csv') or filename.endswith('.csv'):
+        return 'csv'
+    if 'ndjson' in content_type or filename.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return None
+
+
+def iter_rows(stream, file_format):
+    """Yield ``(line_number, row_dict)`` pairs from a binary stream."""
+    if file_format not in FORMATS:
+        raise ValueError(f'Unsupported import format: {file_format!r}')
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        yield from _iter_text_rows(text, file_format)
+    finally:
+        # Hand the underlying stream back to its owner instead of closing it.
+        text.detach()
+
+
+def _iter_text_rows(text, file_format):
+    if file_format == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            for name in ('groups', 'user_permissions'):
+                value = row.get(name)
+                if isinstance(value, str):
+                    row[name] = [item.strip() for item in value.split(LIST_SEPARATOR) if item.strip()]
+            yield reader.line_num, row
+    elif file_format == 'ndjson':
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                row = exc
+            yield line_number, row
+
+
+def _setup_worker(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def _hashing_processes(workers):
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_setup_worker,
+        initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'clinic_Management.settings'),),
+    )
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_import_pool():
+    """
+    The process pool shared by imports in this process, started on first use
+    with ``CLINIC_IMPORT_WORKERS`` processes; ``None`` when that is 1.
+    Concurrent imports queue their chunks on it.
+    """
+    workers = clinic_setting('IMPORT_WORKERS')
+    if workers is not None and workers <= 1:
+        return None
+    if workers not in _pools:
+        with _pools_lock:
+            if workers not in _pools:
+                _pools[workers] = _hashing_processes(workers)
+    return _pools[workers]
+
+
+class EmployeeImporter:
+    """
+    Imports rows in chunks. ``pool`` is an executor to hash passwords on,
+    left running afterwards; without one, ``workers`` processes are started
+    for the run and stopped at the end.
+    """
+
+    def __init__(self, chunk_size=None, workers=None, pool=None):
+        self.chunk_size = chunk_size or clinic_setting('IMPORT_CHUNK_SIZE')
+        self.workers = workers if workers is not None else clinic_setting('IMPORT_WORKERS')
+        self.pool = pool
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+        self._groups = {group.name: group.pk for group in Group.objects.only('pk', 'name')}
+        self._permissions = {perm.codename: perm.pk for perm in Permission.objects.only('pk', 'codename')}
+
+    def report(self):
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+    def run(self, rows):
+        """Import ``(line_number, row)`` pairs and return the report."""
+        pool = owned = None
+        if self.pool is not None:
+            pool = self.pool
+        elif self.workers is None or self.workers > 1:
+            pool = owned = _hashing_processes(self.workers)
+        try:
+            chunk = []
+            for line_number, row in rows:
+                chunk.append((line_number, row))
+                if len(chunk) >= self.chunk_size:
+                    self._import_chunk(chunk, pool)
+                    chunk = []
+            if chunk:
+                self._import_chunk(chunk, pool)
+        finally:
+            if owned is not None:
+                owned.shutdown()
+        return self.report()
+
+    def _error(self, line_number, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': line_number, 'errors': errors})
+
+    def _validate(self, chunk):
+        valid = []
+        seen_emails, seen_ids = set(), set()
+        for line_number, row in chunk:
+            if not isinstance(row, dict):
+                self._error(line_number, {'non_field_errors': [f'Malformed row: {row}']})
+                continue
+            serializer = EmployeeImportSerializer(data=row)
+            if not serializer.is_valid():
+                self._error(line_number, serializer.errors)
+                continue
+            data = serializer.validated_data
+            data['email'] = Employee.objects.normalize_email(data['email'])
+            errors = {}
+            for name, lookup in (('groups', self._groups), ('user_permissions', self._permissions)):
+                unknown = [slug for slug in data.get(name, []) if slug not in lookup]
+                if unknown:
+                    errors[name] = [f'Unknown value(s): {", ".join(unknown)}']
+            if data['email'] in seen_emails:
+                errors['email'] = ['Duplicate email in this file.']
+            if data['emp_id'] in seen_ids:
+                errors['emp_id'] = ['Duplicate emp_id in this file.']
+            if errors:
+                self._error(line_number, errors)
+                continue
+            seen_emails.add(data['email'])
+            seen_ids.add(data['emp_id'])
+            valid.append((line_number, data))
+
+        existing = Employee.objects.filter(email__in=seen_emails).values_list('email', flat=True)
+        existing_emails = set(existing)
+        existing_ids = set(Employee.objects.filter(emp_id__in=seen_ids).values_list('emp_id', flat=True))
+        accepted = []
+        for line_number, data in valid:
+            errors = {}
+            if data['email'] in existing_emails:
+                errors['email'] = ['employee with this email already exists.']
+            if data['emp_id'] in existing_ids:
+                errors['emp_id'] = ['employee with this emp id already exists.']
+            if errors:
+                self._error(line_number, errors)
+            else:
+                accepted.append((line_number, data))
+        return accepted
+
+    def _import_chunk(self, chunk, pool):
+        accepted = self._validate(chunk)
+        if not accepted:
+            return
+        line_numbers = [line_number for line_number, _ in accepted]
+        accepted = [data for _, data in accepted]
+        passwords = [data.pop('password') for data in accepted]
+        if pool is not None:
+            hashed = list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // 8)))
+        else:
+            hashed = [make_password(password) for password in passwords]
+
+        relations = [(data.pop('groups', []), data.pop('user_permissions', [])) for data in accepted]
+        GroupLink = Employee.groups.through
+        PermissionLink = Employee.user_permissions.through
+        try:
+            with transaction.atomic():
+                employees = Employee.objects.bulk_create_employees(
+                    {**data, 'password': encoded} for encoded, data in zip(hashed, accepted)
+                )
+                GroupLink.objects.bulk_create([
+                    GroupLink(employee_id=employee.pk, group_id=self._groups[name])
+                    for employee, (groups, _) in zip(employees, relations) for name in groups
+                ])
+                PermissionLink.objects.bulk_create([
+                    PermissionLink(employee_id=employee.pk, permission_id=self._permissions[codename])
+                    for employee, (_, permissions) in zip(employees, relations) for codename in permissions
+                ])
+        except IntegrityError as exc:
+            # A concurrent writer claimed an email or emp_id after validation.
+            for line_number in line_numbers:
+                self._error(line_number, {'non_field_errors': [f'Chunk rolled back: {exc}']})
+            return
+        self.created += len(employees)
+        employees_imported.send(sender=Employee, employees=employees)
@@ -0,0 +1,185 @@
+# clinic/licences.py
+"""
+Licence-expiry buckets.
+
+Every employee profile carries a ``licence_bucket`` that save() sets from
+``expired_date``. As days pass, rows only cross a bucket boundary at the
+edges of the 7/30/90-day windows, so ``refresh_licence_buckets`` only looks
+at the ``expired_date`` ranges that slid past a boundary since its last run
+(see ``crossed_ranges``). ``LicenceBucketCount`` keeps the per-bucket totals
+in step with saves, deletes, imports and refreshes, so reports read five
+rows instead of grouping the profile table.
+
+Rows written with queryset ``update()`` bypass save(); a ``full`` refresh
+rescans every bucket and recounts the totals.
+"""
+import datetime
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .counters import upsert_increment
+from .models import Employee, EmployeeProfile, LicenceBucketCount
+
+# Buckets that trigger a reminder email when an employee first enters them.
+NOTIFY_BUCKETS = (EmployeeProfile.LICENCE_30_DAYS, EmployeeProfile.LICENCE_7_DAYS, EmployeeProfile.LICENCE_EXPIRED)
+
+
+def bucket_ranges(today):
+    """``(bucket, expired_date range lookups)`` covering every date exactly once."""
+    ranges = [(EmployeeProfile.LICENCE_EXPIRED, {'expired_date__lt': today})]
+    lower = today
+    for bucket, window in EmployeeProfile.LICENCE_WINDOWS:
+        upper = today + datetime.timedelta(days=window)
+        ranges.append((bucket, {'expired_date__gte': lower, 'expired_date__lt': upper}))
+        lower = upper
+    ranges.append((EmployeeProfile.LICENCE_VALID, {'expired_date__gte': lower}))
+    return ranges
+
+
+def reminder(profile, bucket):
+    name = f"{profile['employee__first_name']} {profile['employee__father_name']}"
+    if bucket == EmployeeProfile.LICENCE_EXPIRED:
+        subject = 'Your licence has expired'
+        body = f"Dear {name}, your {profile['licence_type']} licence expired on {profile['expired_date']}."
+    else:
+        subject = 'Your licence expires soon'
+        body = (
+            f"Dear {name}, your {profile['licence_type']} licence expires on "
+            f"{profile['expired_date']}. Please renew it before then."
+        )
+    return subject, body, [profile['employee__email']]
+
+
+def crossed_ranges(since, today):
+    """
+    ``expired_date`` ranges whose rows can have changed bucket between
+    ``since`` and ``today``: the dates each boundary slid over.
+    """
+    offsets = [0] + [window for _, window in EmployeeProfile.LICENCE_WINDOWS]
+    return [
+        (since + datetime.timedelta(days=offset), today + datetime.timedelta(days=offset))
+        for offset in offsets
+    ]
+
+
+def last_refreshed_on():
+    """The day every bucket was last brought up to date, or ``None``."""
+    dates = list(LicenceBucketCount.objects.values_list('refreshed_on', flat=True))
+    if len(dates) < len(EmployeeProfile.LICENCE_BUCKET_CHOICES) or None in dates:
+        return None
+    return min(dates)
+
+
+def refresh_licence_buckets(today=None, batch_size=1000, full=False):
+    """
+    Move employees whose bucket changed since the last run; returns the count
+    moved per bucket. The first run, a run for an earlier day than the last
+    one, and ``full`` runs rescan every bucket.
+    """
+    today = today or timezone.localdate()
+    since = None if full else last_refreshed_on()
+    if since is not None and since > today:
+        since = None
+    crossed = Q()
+    if since is not None:
+        for lower, upper in crossed_ranges(since, today):
+            crossed |= Q(expired_date__gte=lower, expired_date__lt=upper)
+    moved = {}
+    for bucket, lookups in bucket_ranges(today):
+        moved[bucket] = 0
+        if since == today:
+            continue
+        stale = EmployeeProfile.objects.filter(crossed, **lookups).exclude(licence_bucket=bucket)
+        while True:
+            pks = list(stale.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+            with transaction.atomic():
+                rows = EmployeeProfile.objects.filter(pk__in=pks)
+                changes = Counter()
+                for old_bucket, count in rows.order_by().values_list('licence_bucket').annotate(total=Count('pk')):
+                    changes[old_bucket] -= count
+                changes[bucket] += rows.update(licence_bucket=bucket)
+                adjust_licence_counts(changes)
+            moved[bucket] += changes[bucket]
+            Employee.objects.touch(pks)
+    with transaction.atomic():
+        if since is None:
+            recount_licence_buckets()
+        LicenceBucketCount.objects.update(refreshed_on=today)
+    return moved
+
+
+def adjust_licence_counts(changes):
+    """Add each ``{bucket: delta}`` to the bucket totals."""
+    for bucket, delta in changes.items():
+        if delta:
+            upsert_increment(LicenceBucketCount, {'bucket': bucket}, {'headcount': delta})
+
+
+def move_licence_count(old_bucket, new_bucket):
+    """Move one employee between bucket totals; either bucket may be ``None``."""
+    if old_bucket != new_bucket:
+        adjust_licence_counts({bucket: delta for bucket, delta in ((old_bucket, -1), (new_bucket, 1)) if bucket})
+
+
+def count_imported_licences(pks):
+    """Add newly created employees to the bucket totals with one grouped query."""
+    adjust_licence_counts(dict(
+        EmployeeProfile.objects.filter(pk__in=pks).order_by().values_list('licence_bucket').annotate(total=Count('pk'))
+    ))
+
+
+def recount_licence_buckets():
+    """Recompute every bucket total from the profile table."""
+    counts = dict(
+        EmployeeProfile.objects.order_by().values_list('licence_bucket').annotate(total=Count('pk'))
+    )
+    for bucket, _ in EmployeeProfile.LICENCE_BUCKET_CHOICES:
+        LicenceBucketCount.objects.update_or_create(bucket=bucket, defaults={'headcount': counts.get(bucket, 0)})
+
+
+def notify_licence_holders(batch_size=1000):
+    """
+    Queue one reminder per employee for each of ``NOTIFY_BUCKETS`` they have
+    entered, whether by the daily refresh or by saving a new expiry date.
+    """
+    from .mail import enqueue_mails
+
+    notified = {}
+    for bucket in NOTIFY_BUCKETS:
+        pending = EmployeeProfile.objects.filter(licence_bucket=bucket).exclude(licence_notified_bucket=bucket)
+        notified[bucket] = 0
+        while True:
+            batch = list(pending.values(
+                'pk', 'employee__email', 'employee__first_name', 'employee__father_name',
+                'licence_type', 'expired_date',
+            )[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                EmployeeProfile.objects.filter(
+                    pk__in=[row['pk'] for row in batch],
+                ).update(licence_notified_bucket=bucket)
+                enqueue_mails(reminder(row, bucket) for row in batch)
+            notified[bucket] += len(batch)
+    return notified
+
+
+def licence_report():
+    counts = dict(LicenceBucketCount.objects.values_list('bucket', 'headcount'))
+    report = {'expired': counts.get(EmployeeProfile.LICENCE_EXPIRED, 0)}
+    running = 0
+    for bucket, window in EmployeeProfile.LICENCE_WINDOWS:
+        running += counts.get(bucket, 0)
+        report[f'within_{window}_days'] = running
+    report['valid'] = counts.get(EmployeeProfile.LICENCE_VALID, 0)
+    return report
+
+
+def buckets_within(days):
+    """Buckets whose licences expire within ``days`` (one of the window sizes)."""
+    return [bucket for bucket, window in EmployeeProfile.LICENCE_WINDOWS if window <= days]
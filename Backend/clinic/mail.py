@@ -0,0 +1,108 @@
+# clinic/mail.py
+"""
+Database-backed outbound mail queue.
+
+Views call ``enqueue_mail`` and return immediately; ``manage.py
+run_mail_worker`` drains the queue in batches over one reused backend
+connection, retrying failures with exponential backoff. A message's body is
+cleared once it has been sent or given up on, since password reset mails
+carry live tokens; subject, recipients and status stay for the record.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection as db_connection, transaction
+from django.utils import timezone
+
+from .conf import clinic_setting
+from .models import OutboundEmail
+
+logger = logging.getLogger('clinic.mail')
+
+
+def enqueue_mail(subject, body, recipients, from_email=None):
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipients),
+    )
+
+
+def enqueue_mails(messages, from_email=None):
+    """Queue many ``(subject, body, recipients)`` messages with one insert."""
+    from_email = from_email or settings.DEFAULT_FROM_EMAIL
+    return OutboundEmail.objects.bulk_create([
+        OutboundEmail(subject=subject, body=body, from_email=from_email, recipients=list(recipients))
+        for subject, body, recipients in messages
+    ])
+
+
+def backoff(attempts):
+    delay = clinic_setting('MAIL_QUEUE', 'BACKOFF_SECONDS') * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(delay, clinic_setting('MAIL_QUEUE', 'MAX_BACKOFF_SECONDS')))
+
+
+def claim_batch(batch_size):
+    """
+    Lease up to ``batch_size`` due messages by pushing their next attempt past
+    the lease window, so a crashed worker's batch becomes due again later.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        due = OutboundEmail.objects.filter(
+            status=OutboundEmail.STATUS_PENDING, next_attempt_at__lte=now,
+        ).order_by('next_attempt_at')
+        if db_connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        batch = list(due[:batch_size])
+        OutboundEmail.objects.filter(pk__in=[m.pk for m in batch]).update(
+            next_attempt_at=now + timedelta(seconds=clinic_setting('MAIL_QUEUE', 'LEASE_SECONDS')),
+        )
+    return batch
+
+
+def process_mail_queue(batch_size=None, max_attempts=None):
+    """Send one batch of due messages and return counts of what happened."""
+    batch_size = batch_size or clinic_setting('MAIL_QUEUE', 'BATCH_SIZE')
+    max_attempts = max_attempts or clinic_setting('MAIL_QUEUE', 'MAX_ATTEMPTS')
+    batch = claim_batch(batch_size)
+    counts = {'sent': 0, 'retried': 0, 'failed': 0}
+    if not batch:
+        return counts
+
+    connection = get_connection(fail_silently=False)
+    try:
+        for message in batch:
+            message.attempts += 1
+            try:
+                connection.open()  # no-op while the connection is still open
+                connection.send_messages([
+                    EmailMessage(message.subject, message.body, message.from_email, message.recipients),
+                ])
+            except Exception as exc:
+                logger.warning('Sending outbound email %s failed: %s', message.pk, exc)
+                message.last_error = str(exc)
+                if message.attempts >= max_attempts:
+                    message.status = OutboundEmail.STATUS_FAILED
+                    message.body = ''
+                    counts['failed'] += 1
+                else:
+                    message.next_attempt_at = timezone.now() + backoff(message.attempts)
+                    counts['retried'] += 1
+                # The connection may be broken; start the next message on a fresh one.
+                connection.close()
+            else:
+                message.status = OutboundEmail.STATUS_SENT
+                message.sent_at = timezone.now()
+                message.last_error = ''
+                message.body = ''
+                counts['sent'] += 1
+    finally:
+        connection.close()
+        OutboundEmail.objects.bulk_update(
+            batch, ['status', 'body', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'],
+        )
+    return counts
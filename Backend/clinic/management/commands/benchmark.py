@@ -0,0 +1,53 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from clinic.audit import audit_log
+from clinic.benchmarks import SUITES, compare_to_baseline
+
+
+class Command(BaseCommand):
+    help = (
+        'Run one of the clinic benchmark suites against a throwaway test '
+        'database and print the results as JSON. With --baseline, fail if any '
+        'figure is more than --tolerance worse than the stored run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('suite', choices=sorted(SUITES))
+        parser.add_argument('--rounds', type=int)
+        parser.add_argument('--requests', type=int)
+        parser.add_argument('--concurrency', type=int, help='Client threads, for suites that simulate load.')
+        parser.add_argument('--size', type=int, help='Seeded employees, for suites that seed their own data.')
+        parser.add_argument(
+            '--fast-hashers', action='store_true', default=None,
+            help='Hash passwords with MD5 so load suites measure the request path rather than PBKDF2.',
+        )
+        parser.add_argument('--baseline', help='JSON results of an earlier run to compare against.')
+        parser.add_argument('--save-baseline', help='Write the results to this file.')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown, as a fraction.')
+
+    def handle(self, *args, suite, baseline, save_baseline, tolerance, **options):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            suite_options = {
+                name: options[name] for name in ('rounds', 'requests', 'concurrency', 'size', 'fast_hashers')
+                if options[name] is not None
+            }
+            results = SUITES[suite](**suite_options)
+        finally:
+            # The suites' synthetic logins and registrations are not real account events.
+            audit_log.clear()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+        output = json.dumps(results, indent=2, default=str)
+        self.stdout.write(output)
+        if save_baseline:
+            with open(save_baseline, 'w') as handle:
+                handle.write(output + '\n')
+        if baseline:
+            with open(baseline) as handle:
+                regressions = compare_to_baseline(results, json.load(handle), tolerance)
+            if regressions:
+                raise CommandError('Regressed against baseline:\n' + '\n'.join(regressions))
@@ -0,0 +1,36 @@
+import datetime
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from clinic.payroll import FORMATS, SUMMARY_GROUPS, export_payroll, payroll_summary
+
+
+class Command(BaseCommand):
+    help = 'Write the bank payroll file (or, with --summary, salary totals) to --output or stdout.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=FORMATS, default='csv', dest='file_format')
+        parser.add_argument('--bank', help='Only employees paid through this bank.')
+        parser.add_argument('--pay-date', help='YYYY-MM-DD for the fixed-width headers (default today).')
+        parser.add_argument('--chunk-size', type=int)
+        parser.add_argument('--output', help='File to write instead of stdout.')
+        parser.add_argument('--summary', choices=sorted(SUMMARY_GROUPS), help='Print totals grouped by this column.')
+
+    def handle(self, *args, file_format, bank, pay_date, chunk_size, output, summary, **options):
+        if summary:
+            self.stdout.write(json.dumps(payroll_summary(summary), indent=2, default=str))
+            return
+        if pay_date:
+            try:
+                pay_date = datetime.date.fromisoformat(pay_date)
+            except ValueError:
+                raise CommandError('--pay-date must be YYYY-MM-DD.')
+        chunks = export_payroll(file_format, bank=bank, pay_date=pay_date, chunk_size=chunk_size)
+        if output is None:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(output, 'w', newline='', encoding='utf-8') as handle:
+            for chunk in chunks:
+                handle.write(chunk)
@@ -0,0 +1,26 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from clinic.importers import FORMATS, EmployeeImporter, detect_format, iter_rows
+
+
+class Command(BaseCommand):
+    help = 'Bulk import employees from a CSV or NDJSON file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS, dest='file_format')
+        parser.add_argument('--chunk-size', type=int)
+        parser.add_argument('--workers', type=int, help='Password hashing processes (1 hashes inline).')
+
+    def handle(self, *args, path, file_format, chunk_size, workers, **options):
+        file_format = file_format or detect_format(path)
+        if file_format is None:
+            raise CommandError('Cannot detect the file format; pass --format.')
+        importer = EmployeeImporter(chunk_size=chunk_size, workers=workers)
+        with open(path, 'rb') as stream:
+            report = importer.run(iter_rows(stream, file_format))
+        for error in report['errors']:
+            self.stderr.write(json.dumps(error))
+        self.stdout.write(f"Created {report['created']} employees, {report['failed']} rows failed.")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from clinic.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the staffing head-count rollup from the employee tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Employees grouped per query.')
+
+    def handle(self, *args, chunk_size, **options):
+        keys = rebuild_rollups(chunk_size=chunk_size)
+        self.stdout.write(f'Rebuilt {keys} staffing rollup rows.')
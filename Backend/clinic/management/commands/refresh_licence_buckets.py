@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from clinic.licences import notify_licence_holders, refresh_licence_buckets
+
+
+class Command(BaseCommand):
+    help = 'Move employees into their current licence-expiry bucket and queue reminder emails. Run daily.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--no-notify', action='store_true', help='Update buckets without queueing reminders.')
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Rescan every bucket and recount the totals, e.g. after expiry dates were changed with raw updates.',
+        )
+
+    def handle(self, *args, batch_size, no_notify, full, **options):
+        moved = refresh_licence_buckets(batch_size=batch_size, full=full)
+        self.stdout.write('moved ' + ' '.join(f'{bucket}={count}' for bucket, count in moved.items()))
+        if not no_notify:
+            notified = notify_licence_holders(batch_size=batch_size)
+            self.stdout.write('notified ' + ' '.join(f'{bucket}={count}' for bucket, count in notified.items()))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from clinic.mail import process_mail_queue
+
+
+class Command(BaseCommand):
+    help = 'Send queued outbound email, retrying failures with backoff.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the due messages and exit.')
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--max-attempts', type=int)
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when the queue is idle.')
+
+    def handle(self, *args, once, batch_size, max_attempts, interval, **options):
+        while True:
+            counts = process_mail_queue(batch_size=batch_size, max_attempts=max_attempts)
+            if any(counts.values()):
+                self.stdout.write(
+                    f"sent={counts['sent']} retried={counts['retried']} failed={counts['failed']}"
+                )
+                continue
+            if once:
+                return
+            time.sleep(interval)
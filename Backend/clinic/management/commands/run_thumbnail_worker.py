@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from clinic.media import process_thumbnail_queue
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnails for newly uploaded employee images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process the pending images and exit.')
+        parser.add_argument('--batch-size', type=int, default=20)
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when nothing is pending.')
+
+    def handle(self, *args, once, batch_size, interval, **options):
+        while True:
+            done, failed = process_thumbnail_queue(batch_size=batch_size)
+            if done or failed:
+                self.stdout.write(f'done={done} failed={failed}')
+                continue
+            if once:
+                return
+            time.sleep(interval)
@@ -0,0 +1,198 @@
+# clinic/media.py
+"""
+Chunked, resumable uploads of employee images and PDFs.
+
+Chunks are appended to a spool file on disk in fixed-size reads, so memory
+use does not depend on the file size. A finished upload is hashed and stored
+once under its SHA-256 (``MediaBlob``); re-uploads of the same file reuse the
+stored copy. Image thumbnails are generated later by
+``manage.py run_thumbnail_worker``.
+"""
+import hashlib
+import io
+import logging
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .conf import clinic_setting
+from .models import Employee, EmployeeProfile, MediaBlob, UploadSession
+
+logger = logging.getLogger('clinic.media')
+
+READ_SIZE = 64 * 1024
+STORAGE_DIRS = {MediaBlob.KIND_IMAGE: 'employee_images', MediaBlob.KIND_PDF: 'employee_docs'}
+EMPLOYEE_FIELDS = {MediaBlob.KIND_IMAGE: 'image', MediaBlob.KIND_PDF: 'pdf'}
+
+
+class UploadError(Exception):
+    pass
+
+
+def max_bytes(kind):
+    return clinic_setting('UPLOADS', 'MAX_BYTES')[kind]
+
+
+def spool_path(session):
+    directory = Path(clinic_setting('UPLOADS', 'SPOOL_DIR') or Path(settings.MEDIA_ROOT) / '.uploads')
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / f'{session.pk}.part'
+
+
+def write_chunk(session, offset, stream, length):
+    """
+    Append ``length`` bytes read from ``stream`` at ``offset``. The offset must
+    equal the bytes already received, which makes retries of a chunk safe.
+    """
+    if session.completed_at is not None:
+        raise UploadError('Upload is already complete')
+    if offset != session.received:
+        raise UploadError(f'Expected offset {session.received}')
+    if length <= 0 or length > clinic_setting('UPLOADS', 'MAX_CHUNK_BYTES'):
+        raise UploadError('Invalid chunk size')
+    if offset + length > session.total_size:
+        raise UploadError('Chunk runs past the declared size')
+
+    path = spool_path(session)
+    written = 0
+    with open(path, 'r+b' if path.exists() else 'wb') as spool:
+        spool.seek(offset)
+        spool.truncate()
+        while written < length:
+            data = stream.read(min(READ_SIZE, length - written))
+            if not data:
+                break
+            spool.write(data)
+            written += len(data)
+    if written != length:
+        raise UploadError('Chunk was shorter than its Content-Range')
+    UploadSession.objects.filter(pk=session.pk).update(received=offset + written)
+    session.received = offset + written
+    if session.received == session.total_size:
+        complete_upload(session)
+    return session
+
+
+def sniff(kind, path):
+    with open(path, 'rb') as handle:
+        header = handle.read(8)
+    if kind == MediaBlob.KIND_PDF:
+        if not header.startswith(b'%PDF-'):
+            raise UploadError('File is not a PDF')
+        return 'application/pdf'
+    from PIL import Image, UnidentifiedImageError
+    try:
+        with Image.open(path) as image:
+            image.verify()
+            return Image.MIME.get(image.format, 'application/octet-stream')
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        raise UploadError('File is not a valid image')
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(READ_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def store_blob(kind, path, filename):
+    """Return the ``MediaBlob`` for the file at ``path``, storing it only if new."""
+    content_type = sniff(kind, path)
+    sha256 = file_digest(path)
+    blob = MediaBlob.objects.filter(sha256=sha256).first()
+    if blob is not None:
+        return blob
+    extension = Path(filename).suffix.lower()[:10]
+    with open(path, 'rb') as handle:
+        name = default_storage.save(f'{STORAGE_DIRS[kind]}/{sha256[:2]}/{sha256}{extension}', File(handle))
+    try:
+        return MediaBlob.objects.create(
+            sha256=sha256, kind=kind, file=name, size=os.path.getsize(path), content_type=content_type,
+            thumbnail_status=MediaBlob.THUMBNAIL_PENDING if kind == MediaBlob.KIND_IMAGE else MediaBlob.THUMBNAIL_NONE,
+        )
+    except IntegrityError:
+        # Another upload of the same content won the race.
+        default_storage.delete(name)
+        return MediaBlob.objects.get(sha256=sha256)
+
+
+def attach_blob(employee, blob):
+    profile = employee.profile
+    field = EMPLOYEE_FIELDS[blob.kind]
+    setattr(profile, field, blob.file.name)
+    update_fields = [field]
+    if blob.kind == MediaBlob.KIND_IMAGE:
+        profile.image_thumbnail = blob.thumbnail.name if blob.thumbnail else None
+        update_fields.append('image_thumbnail')
+    profile.save(update_fields=update_fields)
+
+
+def complete_upload(session):
+    path = spool_path(session)
+    try:
+        blob = store_blob(session.kind, path, session.filename)
+    except UploadError:
+        # The content itself is unusable, so resuming cannot help.
+        discard_upload(session)
+        raise
+    try:
+        with transaction.atomic():
+            session.blob = blob
+            session.completed_at = timezone.now()
+            session.save(update_fields=['blob', 'completed_at'])
+            attach_blob(session.employee, blob)
+    except EmployeeProfile.DoesNotExist:
+        # The profile was deleted after the upload started; nothing can hold the file.
+        discard_upload(session)
+        raise UploadError('Employee has no profile to attach the file to')
+    # Kept until the session is saved as complete, so a failed save can't
+    # leave a fully received upload without its bytes.
+    transaction.on_commit(lambda: path.unlink(missing_ok=True))
+    return blob
+
+
+def discard_upload(session):
+    spool_path(session).unlink(missing_ok=True)
+    session.delete()
+
+
+def make_thumbnail(blob):
+    from PIL import Image, ImageOps
+
+    with blob.file.open('rb') as source, Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(clinic_setting('UPLOADS', 'THUMBNAIL_SIZE'))
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        output = io.BytesIO()
+        image.save(output, format='JPEG', quality=85, optimize=True)
+    blob.thumbnail.save(f'{blob.sha256}.jpg', ContentFile(output.getvalue()), save=False)
+
+
+def process_thumbnail_queue(batch_size=20):
+    """Generate thumbnails for pending image blobs; returns ``(done, failed)``."""
+    done = failed = 0
+    for blob in MediaBlob.objects.filter(thumbnail_status=MediaBlob.THUMBNAIL_PENDING).order_by('pk')[:batch_size]:
+        try:
+            make_thumbnail(blob)
+        except Exception as exc:
+            logger.warning('Thumbnail for %s failed: %s', blob.file.name, exc)
+            blob.thumbnail_status = MediaBlob.THUMBNAIL_FAILED
+            blob.save(update_fields=['thumbnail_status'])
+            failed += 1
+            continue
+        blob.thumbnail_status = MediaBlob.THUMBNAIL_DONE
+        blob.save(update_fields=['thumbnail', 'thumbnail_status'])
+        profiles = EmployeeProfile.objects.filter(image=blob.file.name)
+        Employee.objects.touch(profiles.values('pk'))
+        profiles.update(image_thumbnail=blob.thumbnail.name)
+        done += 1
+    return done, failed
@@ -0,0 +1,177 @@
+# clinic/metrics.py
+"""
+In-process request telemetry, filled in by ``clinic.middleware.PerformanceMiddleware``
+and exported in the Prometheus text format at ``/metrics``.
+
+Values are per process: scrape every worker (or run a single one) when
+serving with several processes.
+"""
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+METRICS = {
+    'clinic_request_duration_seconds': ('histogram', 'Wall-clock time spent in the view and inner middleware.'),
+    'clinic_request_db_queries': ('histogram', 'SQL statements executed per request.'),
+    'clinic_request_db_seconds_total': ('counter', 'Time spent executing SQL.'),
+    'clinic_request_hash_seconds_total': ('counter', 'Time spent hashing or verifying passwords.'),
+    'clinic_response_size_bytes': ('histogram', 'Response body size.'),
+    'clinic_responses_total': ('counter', 'Responses by status code.'),
+    'clinic_hashing_pool_workers': ('gauge', 'Password hashing worker threads.'),
+    'clinic_hashing_pool_in_flight': ('gauge', 'Hashing jobs running or queued.'),
+    'clinic_hashing_pool_queued': ('gauge', 'Hashing jobs waiting for a worker.'),
+    'clinic_hashing_pool_completed_total': ('counter', 'Hashing jobs finished.'),
+    'clinic_hashing_pool_rejected_total': ('counter', 'Hashing jobs refused because the queue was full.'),
+    'clinic_hashing_pool_busy_seconds_total': ('counter', 'Time workers spent hashing.'),
+}
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._collectors = []
+
+    def add_collector(self, collect):
+        """
+        Register ``collect()``, called on each ``render()`` to return
+        ``(name, labels, value)`` samples read from state kept elsewhere.
+        Collectors survive ``clear()``.
+        """
+        with self._lock:
+            if collect not in self._collectors:
+                self._collectors.append(collect)
+
+    def observe(self, name, labels, value, buckets):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def histogram(self, name, **labels):
+        return self._histograms.get((name, tuple(sorted(labels.items()))))
+
+    def counter(self, name, **labels):
+        return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self):
+        """The registry in the Prometheus text exposition format (0.0.4)."""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+            collectors = list(self._collectors)
+        for collect in collectors:
+            counters.extend(((name, tuple(sorted(labels.items()))), value) for name, labels, value in collect())
+        series = {}
+        for (name, labels), histogram in histograms:
+            lines = series.setdefault(name, [])
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', _number(bound)),))} {cumulative}")
+            lines.append(f'{name}_sum{format_labels(labels)} {_number(histogram.sum)}')
+            lines.append(f'{name}_count{format_labels(labels)} {histogram.count}')
+        for (name, labels), value in counters:
+            series.setdefault(name, []).append(f'{name}{format_labels(labels)} {_number(value)}')
+
+        output = []
+        for name, lines in series.items():
+            kind, help_text = METRICS.get(name, ('untyped', ''))
+            output.append(f'# HELP {name} {help_text}')
+            output.append(f'# TYPE {name} {kind}')
+            output.extend(lines)
+        return '\n'.join(output) + '\n'
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def _number(value):
+    if isinstance(value, str):
+        return value
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = Registry()
+
+
+class RequestTimings:
+    """Accumulators for the request being served on this context."""
+    __slots__ = ('db_queries', 'db_seconds', 'hash_seconds')
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.hash_seconds = 0.0
+
+
+current_timings = ContextVar('clinic_request_timings', default=None)
+
+
+def record_hash(seconds):
+    timings = current_timings.get()
+    if timings is not None:
+        timings.hash_seconds += seconds
+
+
+def time_query(execute, sql, params, many, context):
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db_queries += 1
+        timings.db_seconds += time.perf_counter() - start
+
+
+def install_query_timer(connection):
+    """
+    Time every query on ``connection`` made while a request is measured.
+    Installed once per connection (see ``clinic.signals``) rather than per
+    request, so queries that async views run in sync_to_async threads are
+    counted too. Inserted first, as ``execute_wrapper()`` pops the last one.
+    """
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, time_query)
@@ -0,0 +1,181 @@
+# clinic/middleware.py
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+
+from .conf import clinic_setting
+from .audit import current_request
+from .compression import compress, negotiate_encoding
+from .metrics import (
+    LATENCY_BUCKETS, QUERY_BUCKETS, SIZE_BUCKETS, RequestTimings, current_timings, registry,
+)
+
+
+class PerformanceMiddleware:
+    """
+    Per-view latency, SQL count/time, password-hash time and response size.
+
+    Sampled requests are recorded in ``clinic.metrics.registry`` and, with
+    ``SERVER_TIMING``, summarised in a ``Server-Timing`` header. With
+    ``CLINIC_METRICS['ENABLED']`` off the middleware removes itself from the
+    stack at startup; unsampled requests pass straight through.
+    """
+
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        if not clinic_setting('METRICS', 'ENABLED'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = clinic_setting('METRICS', 'SAMPLE_RATE')
+        self.server_timing = clinic_setting('METRICS', 'SERVER_TIMING')
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self._finish(request, response, timings, start)
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self._finish(request, response, timings, start)
+
+    def _sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def _finish(self, request, response, timings, start):
+        elapsed = time.perf_counter() - start
+        self._record(request, response, timings, elapsed)
+        if self.server_timing:
+            response['Server-Timing'] = self._server_timing(timings, elapsed)
+        return response
+
+    @staticmethod
+    def _record(request, response, timings, elapsed):
+        labels = {'view': view_name(request), 'method': request.method}
+        registry.observe('clinic_request_duration_seconds', labels, elapsed, LATENCY_BUCKETS)
+        registry.observe('clinic_request_db_queries', labels, timings.db_queries, QUERY_BUCKETS)
+        registry.inc('clinic_request_db_seconds_total', labels, timings.db_seconds)
+        registry.inc('clinic_request_hash_seconds_total', labels, timings.hash_seconds)
+        registry.observe('clinic_response_size_bytes', labels, response_size(response), SIZE_BUCKETS)
+        registry.inc('clinic_responses_total', {**labels, 'status': response.status_code})
+
+    @staticmethod
+    def _server_timing(timings, elapsed):
+        parts = [f'db;dur={timings.db_seconds * 1000:.2f};desc="{timings.db_queries} queries"']
+        if timings.hash_seconds:
+            parts.append(f'hash;dur={timings.hash_seconds * 1000:.2f}')
+        parts.append(f'total;dur={elapsed * 1000:.2f}')
+        return ', '.join(parts)
+
+
+class AuditContextMiddleware:
+    """Exposes the request to ``clinic.audit`` so signal handlers can record who acted."""
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = current_request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            current_request.reset(token)
+
+    async def __acall__(self, request):
+        token = current_request.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            current_request.reset(token)
+
+
+class CompressionMiddleware:
+    """
+    Compresses API responses for clients that send ``Accept-Encoding``; see
+    ``clinic.compression``. Listed just inside ``PerformanceMiddleware`` so
+    the recorded response size is the size sent.
+    """
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        if not clinic_setting('COMPRESSION', 'ENABLED'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.content_types = tuple(clinic_setting('COMPRESSION', 'CONTENT_TYPES'))
+        self.min_bytes = clinic_setting('COMPRESSION', 'MIN_BYTES')
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if (
+            response.streaming
+            or response.status_code != 200
+            or response.has_header('Content-Encoding')
+            or not response.get('Content-Type', '').startswith(self.content_types)
+        ):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None or len(response.content) < self.min_bytes:
+            return response
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # The encoded body is a different byte sequence, so a strong ETag
+        # would be wrong; If-None-Match still matches weakly.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    view = getattr(match.func, 'view_class', match.func)
+    return getattr(view, '__name__', match.view_name)
+
+
+def response_size(response):
+    if response.streaming:
+        return int(response.get('Content-Length') or 0)
+    return len(response.content)
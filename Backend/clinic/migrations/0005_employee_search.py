@@ -0,0 +1,87 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:10
+
+from django.db import migrations, models
+
+FTS_TABLE = 'clinic_employee_fts'
+BATCH_SIZE = 2000
+NAME_FIELDS = ('first_name', 'father_name', 'grandfather_name')
+INDEXED_FIELDS = NAME_FIELDS + ('region', 'zone', 'woreda', 'kebele', 'role', 'field')
+
+
+def normalize(*parts):
+    return ' '.join(' '.join(parts).lower().split())
+
+
+def create_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        "name, location, role, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def backfill_search(apps, schema_editor):
+    Employee = apps.get_model('clinic', 'Employee')
+    using = schema_editor.connection.alias
+    use_fts = schema_editor.connection.vendor == 'sqlite'
+    columns = INDEXED_FIELDS if use_fts else NAME_FIELDS
+    last_pk = 0
+    while True:
+        batch = list(
+            Employee.objects.using(using).filter(pk__gt=last_pk).order_by('pk').only('pk', *columns)[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for employee in batch:
+            employee.search_name = normalize(employee.first_name, employee.father_name, employee.grandfather_name)
+        Employee.objects.using(using).bulk_update(batch, ['search_name'])
+        if use_fts:
+            with schema_editor.connection.cursor() as cursor:
+                cursor.executemany(
+                    f'INSERT INTO {FTS_TABLE} (rowid, name, location, role) VALUES (%s, %s, %s, %s)',
+                    [
+                        (
+                            e.pk, e.search_name,
+                            ' '.join((e.region, e.zone, e.woreda, e.kebele)),
+                            ' '.join((e.role, e.field)),
+                        )
+                        for e in batch
+                    ],
+                )
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('clinic', '0004_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='search_name',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=310),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['first_name', 'father_name', 'grandfather_name'], name='employee_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['region', 'zone', 'woreda', 'kebele'], name='employee_location_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['role', 'field'], name='employee_role_field_idx'),
+        ),
+        migrations.RunPython(create_fts_index, drop_fts_index),
+        migrations.RunPython(backfill_search, migrations.RunPython.noop),
+    ]
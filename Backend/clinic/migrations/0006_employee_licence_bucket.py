@@ -0,0 +1,43 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:13
+
+import datetime
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_licence_buckets(apps, schema_editor):
+    Employee = apps.get_model('clinic', 'Employee')
+    today = timezone.localdate()
+    Employee.objects.filter(expired_date__lt=today).update(licence_bucket='expired')
+    lower = today
+    for bucket, window in (('7_days', 7), ('30_days', 30), ('90_days', 90)):
+        upper = today + datetime.timedelta(days=window)
+        Employee.objects.filter(expired_date__gte=lower, expired_date__lt=upper).update(licence_bucket=bucket)
+        lower = upper
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0005_employee_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='licence_bucket',
+            field=models.CharField(choices=[('expired', 'Expired'), ('7_days', 'Expires within 7 days'), ('30_days', 'Expires within 30 days'), ('90_days', 'Expires within 90 days'), ('valid', 'Valid')], db_index=True, default='valid', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='licence_notified_bucket',
+            field=models.CharField(blank=True, editable=False, max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='employee',
+            name='expired_date',
+            field=models.DateField(db_index=True),
+        ),
+        migrations.RunPython(backfill_licence_buckets, migrations.RunPython.noop),
+    ]
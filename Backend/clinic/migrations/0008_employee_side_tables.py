@@ -0,0 +1,139 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    First step of moving the HR/profile columns off ``clinic_employee``:
+    create the side tables. The old required columns are made nullable here, so
+    that reversing 0010 can add them back to a populated table before 0009
+    copies the values back.
+    """
+
+    dependencies = [
+        ('clinic', '0007_media_uploads'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeePayroll',
+            fields=[
+                ('employee', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='payroll', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('salary', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('bank_name', models.CharField(max_length=100)),
+                ('bank_account', models.CharField(max_length=50)),
+            ],
+            options={
+                'default_permissions': (),
+            },
+        ),
+        migrations.CreateModel(
+            name='EmployeeProfile',
+            fields=[
+                ('employee', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='profile', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('body', models.TextField(blank=True)),
+                ('image', models.ImageField(blank=True, null=True, upload_to='employee_images/')),
+                ('image_thumbnail', models.ImageField(blank=True, editable=False, null=True, upload_to='employee_thumbnails/')),
+                ('region', models.CharField(max_length=100)),
+                ('zone', models.CharField(max_length=100)),
+                ('woreda', models.CharField(max_length=100)),
+                ('kebele', models.CharField(max_length=100)),
+                ('phone_number', models.CharField(max_length=20)),
+                ('institution_name', models.CharField(max_length=200)),
+                ('field', models.CharField(max_length=100)),
+                ('date_of_graduate', models.DateField()),
+                ('company_names', models.CharField(max_length=200)),
+                ('pdf', models.FileField(blank=True, null=True, upload_to='employee_docs/')),
+                ('licence_type', models.CharField(max_length=100)),
+                ('give_date', models.DateField()),
+                ('expired_date', models.DateField(db_index=True)),
+                ('licence_bucket', models.CharField(choices=[('expired', 'Expired'), ('7_days', 'Expires within 7 days'), ('30_days', 'Expires within 30 days'), ('90_days', 'Expires within 90 days'), ('valid', 'Valid')], db_index=True, default='valid', editable=False, max_length=10)),
+                ('licence_notified_bucket', models.CharField(blank=True, editable=False, max_length=10)),
+            ],
+            options={
+                'default_permissions': (),
+                'indexes': [
+                    models.Index(fields=['region', 'zone', 'woreda', 'kebele'], name='profile_location_idx'),
+                    models.Index(fields=['field'], name='profile_field_idx'),
+                ],
+            },
+        ),
+        migrations.AlterField(
+            model_name='employee',
+            name='region',
+            field=models.CharField(max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='employee',
+            name='zone',
+            field=models.CharField(max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='employee',
+            name='woreda',
+            field=models.CharField(max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='employee',
+            name='kebele',
+            field=models.CharField(max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='employee',
+            name='phone_number',
+            field=models.CharField(max_length=20, null=True),
+        ),
+        migrations.AlterField(
+            model_name='employee',
+            name='institution_name',
+            field=models.CharField(max_length=200, null=True),
+        ),
+        migrations.AlterField(
+            model_name='employee',
+            name='field',
+            field=models.CharField(max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='employee',
+            name='date_of_graduate',
+            field=models.DateField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='employee',
+            name='company_names',
+            field=models.CharField(max_length=200, null=True),
+        ),
+        migrations.AlterField(
+            model_name='employee',
+            name='salary',
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AlterField(
+            model_name='employee',
+            name='licence_type',
+            field=models.CharField(max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='employee',
+            name='give_date',
+            field=models.DateField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='employee',
+            name='expired_date',
+            field=models.DateField(db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='employee',
+            name='bank_name',
+            field=models.CharField(max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='employee',
+            name='bank_account',
+            field=models.CharField(max_length=50, null=True),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:33
+
+from django.db import migrations, transaction
+
+BATCH_SIZE = 2000
+PROFILE_FIELDS = (
+    'body', 'image', 'image_thumbnail', 'region', 'zone', 'woreda', 'kebele', 'phone_number',
+    'institution_name', 'field', 'date_of_graduate', 'company_names', 'pdf', 'licence_type',
+    'give_date', 'expired_date', 'licence_bucket', 'licence_notified_bucket',
+)
+PAYROLL_FIELDS = ('salary', 'bank_name', 'bank_account')
+
+
+def employee_batches(Employee, using, fields):
+    """Keyset-paginated ``values()`` batches, so memory stays flat on large tables."""
+    last_pk = 0
+    while True:
+        batch = list(
+            Employee.objects.using(using).filter(pk__gt=last_pk).order_by('pk').values('pk', *fields)[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1]['pk']
+
+
+def copy_to_side_tables(apps, schema_editor):
+    Employee = apps.get_model('clinic', 'Employee')
+    EmployeeProfile = apps.get_model('clinic', 'EmployeeProfile')
+    EmployeePayroll = apps.get_model('clinic', 'EmployeePayroll')
+    using = schema_editor.connection.alias
+    # Each batch commits on its own; ignore_conflicts makes a rerun after an
+    # interruption skip the rows that were already copied.
+    for batch in employee_batches(Employee, using, PROFILE_FIELDS + PAYROLL_FIELDS):
+        with transaction.atomic(using=using):
+            EmployeeProfile.objects.using(using).bulk_create(
+                [EmployeeProfile(employee_id=row['pk'], **{name: row[name] for name in PROFILE_FIELDS}) for row in batch],
+                ignore_conflicts=True,
+            )
+            EmployeePayroll.objects.using(using).bulk_create(
+                [EmployeePayroll(employee_id=row['pk'], **{name: row[name] for name in PAYROLL_FIELDS}) for row in batch],
+                ignore_conflicts=True,
+            )
+
+
+def copy_from_side_tables(apps, schema_editor):
+    Employee = apps.get_model('clinic', 'Employee')
+    EmployeeProfile = apps.get_model('clinic', 'EmployeeProfile')
+    EmployeePayroll = apps.get_model('clinic', 'EmployeePayroll')
+    using = schema_editor.connection.alias
+    for batch in employee_batches(Employee, using, ()):
+        pks = [row['pk'] for row in batch]
+        profiles = EmployeeProfile.objects.using(using).in_bulk(pks)
+        payrolls = EmployeePayroll.objects.using(using).in_bulk(pks)
+        employees = []
+        for pk in pks:
+            employee = Employee(pk=pk)
+            for side, fields in ((profiles.get(pk), PROFILE_FIELDS), (payrolls.get(pk), PAYROLL_FIELDS)):
+                for name in fields if side is not None else ():
+                    setattr(employee, name, getattr(side, name))
+            employees.append(employee)
+        with transaction.atomic(using=using):
+            Employee.objects.using(using).bulk_update(employees, PROFILE_FIELDS + PAYROLL_FIELDS)
+
+
+class Migration(migrations.Migration):
+    # Batches commit independently instead of holding one long write
+    # transaction over the whole table.
+    atomic = False
+
+    dependencies = [
+        ('clinic', '0008_employee_side_tables'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_to_side_tables, copy_from_side_tables),
+    ]
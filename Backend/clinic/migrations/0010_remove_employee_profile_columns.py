@@ -0,0 +1,110 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('clinic', '0009_copy_employee_side_tables'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='employee',
+            name='employee_location_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='employee',
+            name='employee_role_field_idx',
+        ),
+        migrations.RemoveField(
+            model_name='employee',
+            name='bank_account',
+        ),
+        migrations.RemoveField(
+            model_name='employee',
+            name='bank_name',
+        ),
+        migrations.RemoveField(
+            model_name='employee',
+            name='body',
+        ),
+        migrations.RemoveField(
+            model_name='employee',
+            name='company_names',
+        ),
+        migrations.RemoveField(
+            model_name='employee',
+            name='date_of_graduate',
+        ),
+        migrations.RemoveField(
+            model_name='employee',
+            name='expired_date',
+        ),
+        migrations.RemoveField(
+            model_name='employee',
+            name='field',
+        ),
+        migrations.RemoveField(
+            model_name='employee',
+            name='give_date',
+        ),
+        migrations.RemoveField(
+            model_name='employee',
+            name='image',
+        ),
+        migrations.RemoveField(
+            model_name='employee',
+            name='image_thumbnail',
+        ),
+        migrations.RemoveField(
+            model_name='employee',
+            name='institution_name',
+        ),
+        migrations.RemoveField(
+            model_name='employee',
+            name='kebele',
+        ),
+        migrations.RemoveField(
+            model_name='employee',
+            name='licence_bucket',
+        ),
+        migrations.RemoveField(
+            model_name='employee',
+            name='licence_notified_bucket',
+        ),
+        migrations.RemoveField(
+            model_name='employee',
+            name='licence_type',
+        ),
+        migrations.RemoveField(
+            model_name='employee',
+            name='pdf',
+        ),
+        migrations.RemoveField(
+            model_name='employee',
+            name='phone_number',
+        ),
+        migrations.RemoveField(
+            model_name='employee',
+            name='region',
+        ),
+        migrations.RemoveField(
+            model_name='employee',
+            name='salary',
+        ),
+        migrations.RemoveField(
+            model_name='employee',
+            name='woreda',
+        ),
+        migrations.RemoveField(
+            model_name='employee',
+            name='zone',
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['role'], name='employee_role_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0010_remove_employee_profile_columns'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='employeepayroll',
+            options={'default_permissions': (), 'permissions': [('export_payroll', 'Can export bank payroll files'), ('view_payroll_summary', 'Can view payroll totals')]},
+        ),
+        migrations.AddIndex(
+            model_name='employeepayroll',
+            index=models.Index(fields=['bank_name', 'employee'], name='payroll_bank_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:38
+
+from django.db import migrations, models
+from django.db.models import Count
+
+KEY_LOOKUPS = ('region', 'zone', 'woreda', 'kebele', 'employee__role', 'employee__gender')
+KEY_FIELDS = ('region', 'zone', 'woreda', 'kebele', 'role', 'gender')
+
+
+def populate_rollups(apps, schema_editor):
+    EmployeeProfile = apps.get_model('clinic', 'EmployeeProfile')
+    StaffingRollup = apps.get_model('clinic', 'StaffingRollup')
+    using = schema_editor.connection.alias
+    grouped = (
+        EmployeeProfile.objects.using(using).values_list(*KEY_LOOKUPS).annotate(count=Count('pk')).order_by()
+    )
+    StaffingRollup.objects.using(using).bulk_create(
+        [StaffingRollup(headcount=count, **dict(zip(KEY_FIELDS, key))) for *key, count in grouped],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0011_payroll_exports'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaffingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(max_length=100)),
+                ('zone', models.CharField(max_length=100)),
+                ('woreda', models.CharField(max_length=100)),
+                ('kebele', models.CharField(max_length=100)),
+                ('role', models.CharField(max_length=100)),
+                ('gender', models.CharField(choices=[('M', 'Male'), ('F', 'Female'), ('O', 'Other')], max_length=1)),
+                ('headcount', models.IntegerField(default=0)),
+            ],
+            options={
+                'permissions': [('view_staffing', 'Can view staffing analytics')],
+                'default_permissions': (),
+                'constraints': [models.UniqueConstraint(fields=('region', 'zone', 'woreda', 'kebele', 'role', 'gender'), name='staffing_rollup_key')],
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0012_staffing_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('action', models.CharField(choices=[('register', 'Registered'), ('import', 'Bulk import'), ('login', 'Logged in'), ('login_failed', 'Failed login'), ('password_reset', 'Password reset'), ('groups_changed', 'Groups changed'), ('permissions_changed', 'Permissions changed')], max_length=32)),
+                ('employee_id', models.BigIntegerField(blank=True, null=True)),
+                ('actor_id', models.BigIntegerField(blank=True, null=True)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('detail', models.JSONField(blank=True, default=dict)),
+            ],
+            options={
+                'permissions': [('view_audit_log', 'Can view the account audit log')],
+                'default_permissions': (),
+                'indexes': [models.Index(fields=['employee_id', 'created_at'], name='audit_employee_time_idx'), models.Index(fields=['created_at'], name='audit_time_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.6 on 2026-10-18 21:05
+
+from django.db import migrations, models
+from django.db.models import Count
+
+BUCKETS = ('expired', '7_days', '30_days', '90_days', 'valid')
+
+
+def populate_counts(apps, schema_editor):
+    EmployeeProfile = apps.get_model('clinic', 'EmployeeProfile')
+    LicenceBucketCount = apps.get_model('clinic', 'LicenceBucketCount')
+    using = schema_editor.connection.alias
+    counts = dict(
+        EmployeeProfile.objects.using(using).order_by().values_list('licence_bucket').annotate(total=Count('pk'))
+    )
+    LicenceBucketCount.objects.using(using).bulk_create(
+        [LicenceBucketCount(bucket=bucket, headcount=counts.get(bucket, 0)) for bucket in BUCKETS]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0014_employee_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LicenceBucketCount',
+            fields=[
+                ('bucket', models.CharField(choices=[('expired', 'Expired'), ('7_days', 'Expires within 7 days'), ('30_days', 'Expires within 30 days'), ('90_days', 'Expires within 90 days'), ('valid', 'Valid')], max_length=10, primary_key=True, serialize=False)),
+                ('headcount', models.IntegerField(default=0)),
+                ('refreshed_on', models.DateField(blank=True, null=True)),
+            ],
+            options={
+                'default_permissions': (),
+            },
+        ),
+        migrations.RunPython(populate_counts, migrations.RunPython.noop),
+    ]
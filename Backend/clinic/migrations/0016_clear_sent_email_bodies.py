@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-18 21:40
+
+from django.db import migrations
+
+
+def clear_bodies(apps, schema_editor):
+    # Sent and abandoned messages no longer need their body, which may hold a
+    # password reset token; the mail worker clears it from now on.
+    OutboundEmail = apps.get_model('clinic', 'OutboundEmail')
+    OutboundEmail.objects.using(schema_editor.connection.alias).filter(
+        status__in=['sent', 'failed'],
+    ).exclude(body='').update(body='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0015_licence_bucket_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_bodies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-18 20:19
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0016_clear_sent_email_bodies'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='employeeprofile',
+            options={'default_permissions': (), 'permissions': [('view_employee_documents', "Can view other employees' documents and original photos")]},
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.6 on 2026-10-18 20:22
+
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+def normalize(part):
+    return ' '.join(part.lower().split())
+
+
+def backfill_name_parts(apps, schema_editor):
+    Employee = apps.get_model('clinic', 'Employee')
+    using = schema_editor.connection.alias
+    last_pk = 0
+    while True:
+        batch = list(
+            Employee.objects.using(using).filter(pk__gt=last_pk).order_by('pk')
+            .only('pk', 'father_name', 'grandfather_name')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for employee in batch:
+            employee.search_father_name = normalize(employee.father_name)
+            employee.search_grandfather_name = normalize(employee.grandfather_name)
+        Employee.objects.using(using).bulk_update(batch, ['search_father_name', 'search_grandfather_name'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0017_employee_document_permission'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='search_father_name',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='search_grandfather_name',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=100),
+        ),
+        migrations.RunPython(backfill_name_parts, migrations.RunPython.noop),
+    ]
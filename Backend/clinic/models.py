@@ -1,15 +1,24 @@
 # clinic/models.py
-from django.db import models
+import datetime
+import uuid
+
+from django.db import models, transaction
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin, Group
 
+from .cache import bump_collection_version
+
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
         if not email:
             raise ValueError('The Email field must be set')
         email = self.normalize_email(email)
-        user = self.model(email=email, **extra_fields)
+        fields, side_fields = self.model.split_fields(extra_fields)
+        user = self.model(email=email, **fields)
         user.set_password(password)
-        user.save(using=self._db)
+        with transaction.atomic(using=self._db):
+            user.save(using=self._db)
+            user.save_side_tables(side_fields, using=self._db)
         return user
 
     def create_superuser(self, email, password=None, **extra_fields):
@@ -18,7 +27,43 @@ class UserManager(BaseUserManager):
         extra_fields.setdefault('is_active', True)
         return self.create_user(email, password, **extra_fields)
 
+    def bulk_create_employees(self, rows, batch_size=None):
+        """
+        ``bulk_create`` employee values (with encoded ``password``; see
+        ``Employee.split_fields``) into the employee table and then each side
+        table. Derived fields are filled in; no signals are sent.
+        """
+        employees, side_fields = [], []
+        for row in rows:
+            fields, side = self.model.split_fields(row)
+            employee = self.model(**fields)
+            employee.refresh_derived_fields()
+            employees.append(employee)
+            side_fields.append(side)
+        employees = self.bulk_create(employees, batch_size=batch_size)
+        for relation, model in EMPLOYEE_SIDE_TABLES.items():
+            records = [
+                model(employee=employee, **side[relation])
+                for employee, side in zip(employees, side_fields) if side[relation]
+            ]
+            for record in records:
+                record.refresh_derived_fields()
+            model.objects.bulk_create(records, batch_size=batch_size)
+        return employees
+
+    def touch(self, pks):
+        """Bump ``updated_at`` for writes that bypass save(), such as queryset updates."""
+        touched = self.filter(pk__in=pks).update(updated_at=timezone.now())
+        bump_collection_version()
+        return touched
+
 class Employee(AbstractBaseUser, PermissionsMixin):
+    """
+    Identity and authentication columns only, so logins and token checks read
+    a narrow row. HR data lives in the one-to-one ``profile`` and ``payroll``
+    side tables; ``split_fields``/``save_side_tables`` and the serializers
+    keep the flat field API of the original single table.
+    """
     GENDER_CHOICES = (
         ('M', 'Male'),
         ('F', 'Female'),
@@ -31,36 +76,420 @@ class Employee(AbstractBaseUser, PermissionsMixin):
     grandfather_name = models.CharField(max_length=100)
     emp_id = models.CharField(max_length=50, unique=True)
     gender = models.CharField(max_length=1, choices=GENDER_CHOICES)
+    email = models.EmailField(unique=True)
+    role = models.CharField(max_length=100)
+    # Lower-cased "first father grandfather", kept in sync by save(); backs
+    # indexed prefix lookups for name autocomplete.
+    search_name = models.CharField(max_length=310, blank=True, db_index=True, editable=False)
+    # The other two name parts, normalized the same way, so a term can be
+    # matched as a prefix of any part with index range scans; ``search_name``
+    # already covers the first name.
+    search_father_name = models.CharField(max_length=100, blank=True, db_index=True, editable=False)
+    search_grandfather_name = models.CharField(max_length=100, blank=True, db_index=True, editable=False)
+    # Last change to the employee or its side tables, groups and permissions
+    # (see ``clinic.signals``); the HTTP validators in ``clinic.conditional``.
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+
+    objects = UserManager()
+
+    USERNAME_FIELD = 'email'
+    REQUIRED_FIELDS = ['first_name', 'emp_id', 'password']  # Added 'password' as required
+
+    class Meta:
+        permissions = []
+        default_permissions = ()
+        indexes = [
+            models.Index(fields=['first_name', 'father_name', 'grandfather_name'], name='employee_name_idx'),
+            models.Index(fields=['role'], name='employee_role_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.first_name} ({self.emp_id})"
+
+    @staticmethod
+    def normalize_search_name(first_name, father_name, grandfather_name):
+        return ' '.join(' '.join((first_name, father_name, grandfather_name)).lower().split())
+
+    # Columns derived in save(), keyed by the fields they are computed from.
+    DERIVED_FIELDS = {
+        'search_name': {'first_name', 'father_name', 'grandfather_name'},
+        'search_father_name': {'father_name'},
+        'search_grandfather_name': {'grandfather_name'},
+    }
+
+    def refresh_derived_fields(self):
+        """Recompute the ``DERIVED_FIELDS``; bulk_create callers must call this themselves."""
+        self.search_name = self.normalize_search_name(self.first_name, self.father_name, self.grandfather_name)
+        self.search_father_name = self.normalize_search_name(self.father_name, '', '')
+        self.search_grandfather_name = self.normalize_search_name(self.grandfather_name, '', '')
+
+    # Columns no endpoint renders; saving only these leaves ``updated_at`` alone.
+    UNVERSIONED_FIELDS = frozenset(('last_login', 'password'))
+
+    def save(self, *args, **kwargs):
+        self.refresh_derived_fields()
+        update_fields = with_derived_fields(self, kwargs.get('update_fields'))
+        if update_fields is not None and update_fields - self.UNVERSIONED_FIELDS:
+            update_fields.add('updated_at')
+        kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def split_fields(cls, fields):
+        """
+        Split employee values into own fields and ``{relation: fields}`` for
+        the side tables. Side-table values may be flat or already nested under
+        their relation name, as serializers validate them.
+        """
+        own = {}
+        side = {relation: {} for relation in EMPLOYEE_SIDE_TABLES}
+        for name, value in fields.items():
+            relation = SIDE_TABLE_FIELDS.get(name)
+            if name in EMPLOYEE_SIDE_TABLES:
+                side[name].update(value)
+            elif relation is None:
+                own[name] = value
+            else:
+                side[relation][name] = value
+        return own, side
+
+    def save_side_tables(self, side_fields, using=None):
+        """Create or update the side-table rows from ``split_fields`` output."""
+        for relation, values in side_fields.items():
+            if not values:
+                continue
+            model = EMPLOYEE_SIDE_TABLES[relation]
+            try:
+                record = getattr(self, relation)
+            except model.DoesNotExist:
+                record = model(employee=self)
+            for name, value in values.items():
+                setattr(record, name, value)
+            record.save(using=using)
+
+
+def with_derived_fields(instance, update_fields):
+    """Extend a save()'s ``update_fields`` with the derived columns of any source it names."""
+    if update_fields is None:
+        return None
+    update_fields = set(update_fields)
+    for derived, sources in instance.DERIVED_FIELDS.items():
+        if sources & update_fields:
+            update_fields.add(derived)
+    return update_fields
+
+
+class EmployeeProfile(models.Model):
+    """Address, education, licence and document data of an employee."""
+    LICENCE_EXPIRED = 'expired'
+    LICENCE_7_DAYS = '7_days'
+    LICENCE_30_DAYS = '30_days'
+    LICENCE_90_DAYS = '90_days'
+    LICENCE_VALID = 'valid'
+    LICENCE_BUCKET_CHOICES = (
+        (LICENCE_EXPIRED, 'Expired'),
+        (LICENCE_7_DAYS, 'Expires within 7 days'),
+        (LICENCE_30_DAYS, 'Expires within 30 days'),
+        (LICENCE_90_DAYS, 'Expires within 90 days'),
+        (LICENCE_VALID, 'Valid'),
+    )
+    # Upper bound (days from today, exclusive) of each expiring bucket.
+    LICENCE_WINDOWS = ((LICENCE_7_DAYS, 7), (LICENCE_30_DAYS, 30), (LICENCE_90_DAYS, 90))
+
+    employee = models.OneToOneField(Employee, on_delete=models.CASCADE, primary_key=True, related_name='profile')
     body = models.TextField(blank=True)
     image = models.ImageField(upload_to='employee_images/', blank=True, null=True)
+    # Small derivative of ``image`` written by `manage.py run_thumbnail_worker`.
+    image_thumbnail = models.ImageField(upload_to='employee_thumbnails/', blank=True, null=True, editable=False)
     region = models.CharField(max_length=100)
     zone = models.CharField(max_length=100)
     woreda = models.CharField(max_length=100)
     kebele = models.CharField(max_length=100)
-    email = models.EmailField(unique=True)
     phone_number = models.CharField(max_length=20)
     institution_name = models.CharField(max_length=200)
     field = models.CharField(max_length=100)
     date_of_graduate = models.DateField()
     company_names = models.CharField(max_length=200)
-    role = models.CharField(max_length=100)
-    salary = models.DecimalField(max_digits=10, decimal_places=2)
     pdf = models.FileField(upload_to='employee_docs/', blank=True, null=True)
     licence_type = models.CharField(max_length=100)
     give_date = models.DateField()
-    expired_date = models.DateField()
+    expired_date = models.DateField(db_index=True)
+    # Expiry bucket of the licence as of the last save or
+    # `manage.py refresh_licence_buckets` run, and the last bucket the
+    # employee was notified about.
+    licence_bucket = models.CharField(
+        max_length=10, choices=LICENCE_BUCKET_CHOICES, default=LICENCE_VALID, db_index=True, editable=False,
+    )
+    licence_notified_bucket = models.CharField(max_length=10, blank=True, editable=False)
+
+    class Meta:
+        default_permissions = ()
+        permissions = [
+            ('view_employee_documents', "Can view other employees' documents and original photos"),
+        ]
+        indexes = [
+            models.Index(fields=['region', 'zone', 'woreda', 'kebele'], name='profile_location_idx'),
+            models.Index(fields=['field'], name='profile_field_idx'),
+        ]
+
+    def __str__(self):
+        return f"Profile of employee {self.employee_id}"
+
+    @classmethod
+    def licence_bucket_for(cls, expired_date, today=None):
+        if isinstance(expired_date, str):
+            expired_date = datetime.date.fromisoformat(expired_date)
+        days_left = (expired_date - (today or timezone.localdate())).days
+        if days_left < 0:
+            return cls.LICENCE_EXPIRED
+        for bucket, window in cls.LICENCE_WINDOWS:
+            if days_left < window:
+                return bucket
+        return cls.LICENCE_VALID
+
+    DERIVED_FIELDS = {
+        'licence_bucket': {'expired_date'},
+        'licence_notified_bucket': {'expired_date'},
+    }
+
+    def refresh_derived_fields(self):
+        """Recompute the ``DERIVED_FIELDS``; bulk_create callers must call this themselves."""
+        if self.expired_date:
+            self.licence_bucket = self.licence_bucket_for(self.expired_date)
+            if self.licence_bucket in (self.LICENCE_VALID, self.LICENCE_90_DAYS):
+                # Renewed: reminders start over when the new date comes due.
+                self.licence_notified_bucket = ''
+
+    def save(self, *args, **kwargs):
+        self.refresh_derived_fields()
+        kwargs['update_fields'] = with_derived_fields(self, kwargs.get('update_fields'))
+        super().save(*args, **kwargs)
+
+
+class EmployeePayroll(models.Model):
+    """Salary and bank details, read only by payroll work."""
+    employee = models.OneToOneField(Employee, on_delete=models.CASCADE, primary_key=True, related_name='payroll')
+    salary = models.DecimalField(max_digits=10, decimal_places=2)
     bank_name = models.CharField(max_length=100)
     bank_account = models.CharField(max_length=50)
 
+    class Meta:
+        default_permissions = ()
+        permissions = [
+            ('export_payroll', 'Can export bank payroll files'),
+            ('view_payroll_summary', 'Can view payroll totals'),
+        ]
+        indexes = [
+            # Payroll exports walk this index in order, one bank after another.
+            models.Index(fields=['bank_name', 'employee'], name='payroll_bank_idx'),
+        ]
 
-    objects = UserManager()
+    def __str__(self):
+        return f"Payroll of employee {self.employee_id}"
 
-    USERNAME_FIELD = 'email'
-    REQUIRED_FIELDS = ['first_name', 'emp_id', 'password']  # Added 'password' as required
+    DERIVED_FIELDS = {}
+
+    def refresh_derived_fields(self):
+        pass
+
+
+# One-to-one side tables of Employee by accessor, and the flat field names
+# each one holds.
+EMPLOYEE_SIDE_TABLES = {'profile': EmployeeProfile, 'payroll': EmployeePayroll}
+SIDE_TABLE_FIELDS = {
+    field.name: relation
+    for relation, model in EMPLOYEE_SIDE_TABLES.items()
+    for field in model._meta.concrete_fields
+    if field.name != 'employee'
+}
+
+
+class OutboundEmail(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_email_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.status})"
+
+
+class MediaBlob(models.Model):
+    """An uploaded file stored once under its SHA-256, however many employees use it."""
+    KIND_IMAGE = 'image'
+    KIND_PDF = 'pdf'
+    KIND_CHOICES = (
+        (KIND_IMAGE, 'Image'),
+        (KIND_PDF, 'PDF document'),
+    )
+    THUMBNAIL_NONE = 'none'
+    THUMBNAIL_PENDING = 'pending'
+    THUMBNAIL_DONE = 'done'
+    THUMBNAIL_FAILED = 'failed'
+    THUMBNAIL_STATUS_CHOICES = (
+        (THUMBNAIL_NONE, 'Not applicable'),
+        (THUMBNAIL_PENDING, 'Pending'),
+        (THUMBNAIL_DONE, 'Done'),
+        (THUMBNAIL_FAILED, 'Failed'),
+    )
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    kind = models.CharField(max_length=5, choices=KIND_CHOICES)
+    file = models.FileField(max_length=255)
+    size = models.BigIntegerField()
+    content_type = models.CharField(max_length=100)
+    thumbnail = models.ImageField(upload_to='employee_thumbnails/', blank=True, null=True)
+    thumbnail_status = models.CharField(
+        max_length=7, choices=THUMBNAIL_STATUS_CHOICES, default=THUMBNAIL_NONE, db_index=True,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.file.name
+
+
+class UploadSession(models.Model):
+    """A resumable, chunked upload of an employee image or PDF."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='upload_sessions')
+    kind = models.CharField(max_length=5, choices=MediaBlob.KIND_CHOICES)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    total_size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    blob = models.ForeignKey(MediaBlob, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.total_size})"
+
+
+class RevokedToken(models.Model):
+    """Refresh tokens revoked before they expire; rows are purged once ``expires_at`` passes."""
+    jti = models.CharField(max_length=255, primary_key=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.jti
+
+
+class StaffingRollup(models.Model):
+    """
+    Head count per location, role and gender, kept current by the signals
+    in ``clinic.signals`` and recomputed by `manage.py rebuild_rollups`.
+    """
+    KEY_FIELDS = ('region', 'zone', 'woreda', 'kebele', 'role', 'gender')
+
+    region = models.CharField(max_length=100)
+    zone = models.CharField(max_length=100)
+    woreda = models.CharField(max_length=100)
+    kebele = models.CharField(max_length=100)
+    role = models.CharField(max_length=100)
+    gender = models.CharField(max_length=1, choices=Employee.GENDER_CHOICES)
+    headcount = models.IntegerField(default=0)
+
+    class Meta:
+        default_permissions = ()
+        permissions = [
+            ('view_staffing', 'Can view staffing analytics'),
+        ]
+        constraints = [
+            # Leading columns follow the drill-down order.
+            models.UniqueConstraint(
+                fields=['region', 'zone', 'woreda', 'kebele', 'role', 'gender'], name='staffing_rollup_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{'/'.join((self.region, self.zone, self.woreda, self.kebele))} {self.role} {self.gender}: {self.headcount}"
+
+
+class LicenceBucketCount(models.Model):
+    """
+    Employees per licence-expiry bucket, kept current by the signals in
+    ``clinic.signals`` and by `manage.py refresh_licence_buckets`, which
+    also records the day it last brought the buckets up to date.
+    """
+    bucket = models.CharField(max_length=10, choices=EmployeeProfile.LICENCE_BUCKET_CHOICES, primary_key=True)
+    headcount = models.IntegerField(default=0)
+    refreshed_on = models.DateField(null=True, blank=True)
 
     class Meta:
-        permissions = []
         default_permissions = ()
 
     def __str__(self):
-        return f"{self.first_name} ({self.emp_id})"
\ No newline at end of file
+        return f"{self.bucket}: {self.headcount}"
+
+
+class AuditEvent(models.Model):
+    """
+    One entry in the append-only account audit trail, written in batches by
+    ``clinic.audit``. Employees and actors are kept as plain ids so entries
+    outlive the accounts they describe.
+    """
+    ACTION_REGISTER = 'register'
+    ACTION_IMPORT = 'import'
+    ACTION_LOGIN = 'login'
+    ACTION_LOGIN_FAILED = 'login_failed'
+    ACTION_PASSWORD_RESET = 'password_reset'
+    ACTION_GROUPS_CHANGED = 'groups_changed'
+    ACTION_PERMISSIONS_CHANGED = 'permissions_changed'
+    ACTION_CHOICES = (
+        (ACTION_REGISTER, 'Registered'),
+        (ACTION_IMPORT, 'Bulk import'),
+        (ACTION_LOGIN, 'Logged in'),
+        (ACTION_LOGIN_FAILED, 'Failed login'),
+        (ACTION_PASSWORD_RESET, 'Password reset'),
+        (ACTION_GROUPS_CHANGED, 'Groups changed'),
+        (ACTION_PERMISSIONS_CHANGED, 'Permissions changed'),
+    )
+
+    created_at = models.DateTimeField()
+    action = models.CharField(max_length=32, choices=ACTION_CHOICES)
+    employee_id = models.BigIntegerField(null=True, blank=True)
+    actor_id = models.BigIntegerField(null=True, blank=True)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    detail = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        default_permissions = ()
+        permissions = [
+            ('view_audit_log', 'Can view the account audit log'),
+        ]
+        indexes = [
+            models.Index(fields=['employee_id', 'created_at'], name='audit_employee_time_idx'),
+            models.Index(fields=['created_at'], name='audit_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.created_at:%Y-%m-%d %H:%M:%S} {self.action} employee={self.employee_id} actor={self.actor_id}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Audit events are append-only.')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Audit events are append-only.')
@@ -0,0 +1,18 @@
+# clinic/pagination.py
+from rest_framework.pagination import CursorPagination
+
+
+class EmployeeCursorPagination(CursorPagination):
+    """Keyset pagination on the primary key so every page costs the same."""
+    ordering = 'id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class AuditCursorPagination(CursorPagination):
+    """Newest first, seeking on the ``created_at`` indexes."""
+    ordering = ('-created_at', '-id')
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
@@ -0,0 +1,180 @@
+# clinic/payroll.py
+"""
+Payroll runs: bank transfer files and salary totals.
+
+Exports stream ``EmployeePayroll`` rows ordered by ``(bank_name, employee)``
+straight off the ``payroll_bank_idx`` index with ``.iterator()``, so memory
+stays flat however many employees are paid; each bank's count and total are
+summed as its rows go past. Totals by role, region or institution are
+``GROUP BY`` queries.
+"""
+import csv
+import datetime
+import io
+import itertools
+from decimal import Decimal
+
+from django.db.models import Avg, Count, Max, Min, Q, Sum
+from django.db.models.functions import Length
+
+from .conf import clinic_setting
+from .models import EmployeePayroll
+
+FORMATS = ('csv', 'fixed')
+CONTENT_TYPES = {'csv': 'text/csv; charset=utf-8', 'fixed': 'text/plain; charset=utf-8'}
+EXPORT_COLUMNS = (
+    'bank_name', 'bank_account', 'employee__emp_id',
+    'employee__first_name', 'employee__father_name', 'employee__grandfather_name', 'salary',
+)
+CSV_HEADER = ('bank_name', 'bank_account', 'emp_id', 'name', 'amount')
+# Fixed-width records: ``(name, width)``. Amounts are a ``+``/``-`` sign then
+# zero-padded absolute cents, counts are zero-padded; only the free-text
+# columns in ``TRUNCATED_FIELDS`` may be cut to fit, anything else too wide
+# raises ``PayrollFormatError``. ``fixed_width_overflows`` finds such rows
+# before a response starts streaming.
+FIXED_LAYOUT = {
+    'H': (('bank_name', 40), ('pay_date', 8)),
+    'D': (('bank_account', 20), ('emp_id', 12), ('name', 40), ('amount', 15)),
+    'T': (('bank_name', 40), ('count', 8), ('amount', 18)),
+}
+FIXED_RECORD_WIDTH = 88
+TRUNCATED_FIELDS = ('bank_name', 'name')
+# Leading characters a spreadsheet reads as a formula.
+FORMULA_PREFIXES = ('=', '+', '-', '@')
+SUMMARY_GROUPS = {
+    'role': 'employee__role',
+    'region': 'employee__profile__region',
+    'institution': 'employee__profile__institution_name',
+}
+
+
+class PayrollFormatError(ValueError):
+    pass
+
+
+def payroll_queryset(bank=None):
+    queryset = EmployeePayroll.objects.order_by('bank_name', 'employee_id')
+    if bank:
+        queryset = queryset.filter(bank_name=bank)
+    return queryset
+
+
+def fixed_width_overflows(bank=None):
+    """
+    ``emp_id`` of every exported employee whose account number or ``emp_id``
+    is wider than its fixed-width column, found with one ``LENGTH()`` query.
+    """
+    widths = dict(FIXED_LAYOUT['D'])
+    return list(
+        payroll_queryset(bank)
+        .annotate(account_length=Length('bank_account'), emp_id_length=Length('employee__emp_id'))
+        .filter(Q(account_length__gt=widths['bank_account']) | Q(emp_id_length__gt=widths['emp_id']))
+        .values_list('employee__emp_id', flat=True)
+    )
+
+
+def payroll_rows(bank=None, chunk_size=None):
+    """
+    ``(bank_name, bank_account, emp_id, name, salary)`` for every employee on
+    the payroll, ordered by bank, fetched ``chunk_size`` rows at a time.
+    """
+    chunk_size = chunk_size or clinic_setting('PAYROLL', 'CHUNK_SIZE')
+    rows = payroll_queryset(bank).values_list(*EXPORT_COLUMNS).iterator(chunk_size=chunk_size)
+    for bank_name, account, emp_id, first_name, father_name, grandfather_name, salary in rows:
+        yield bank_name, account, emp_id, f'{first_name} {father_name} {grandfather_name}', salary
+
+
+def cents(amount):
+    return int((amount * 100).to_integral_value())
+
+
+def fixed_field(name, value, width):
+    if name == 'amount':
+        text = ('-' if value < 0 else '+') + str(abs(value)).rjust(width - 1, '0')
+    elif name == 'count':
+        text = str(value).rjust(width, '0')
+    elif name in TRUNCATED_FIELDS:
+        return str(value).ljust(width)[:width]
+    else:
+        text = str(value).ljust(width)
+    if len(text) > width:
+        raise PayrollFormatError(f'{name} {value!r} does not fit in {width} characters')
+    return text
+
+
+def fixed_record(kind, **values):
+    record = kind + ''.join(fixed_field(name, values[name], width) for name, width in FIXED_LAYOUT[kind])
+    return record.ljust(FIXED_RECORD_WIDTH) + '\r\n'
+
+
+def _batched(lines, size):
+    """Join ``lines`` into strings of ``size`` lines, so a response isn't written line by line."""
+    while batch := list(itertools.islice(lines, size)):
+        yield ''.join(batch)
+
+
+def csv_cell(value):
+    """Quote text a spreadsheet would otherwise evaluate as a formula."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def line(values):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow([csv_cell(value) for value in values])
+        return buffer.getvalue()
+
+    yield line(CSV_HEADER)
+    for bank_name, account, emp_id, name, salary in rows:
+        yield line((bank_name, account, emp_id, name, salary))
+
+
+def fixed_lines(rows, pay_date):
+    """One ``H`` header, the ``D`` detail records and a ``T`` trailer with count and total per bank."""
+    for bank_name, group in itertools.groupby(rows, key=lambda row: row[0]):
+        yield fixed_record('H', bank_name=bank_name, pay_date=pay_date.strftime('%Y%m%d'))
+        count, total = 0, Decimal(0)
+        for _, account, emp_id, name, salary in group:
+            count += 1
+            total += salary
+            yield fixed_record('D', bank_account=account, emp_id=emp_id, name=name, amount=cents(salary))
+        yield fixed_record('T', bank_name=bank_name, count=count, amount=cents(total))
+
+
+def export_payroll(file_format='csv', bank=None, pay_date=None, chunk_size=None):
+    """Yield the export as text chunks of ``chunk_size`` lines; see ``FORMATS``."""
+    if file_format not in FORMATS:
+        raise ValueError(f'Unsupported payroll format: {file_format!r}')
+    chunk_size = chunk_size or clinic_setting('PAYROLL', 'CHUNK_SIZE')
+    rows = payroll_rows(bank=bank, chunk_size=chunk_size)
+    if file_format == 'csv':
+        lines = csv_lines(rows)
+    else:
+        lines = fixed_lines(rows, pay_date or datetime.date.today())
+    return _batched(lines, chunk_size)
+
+
+def payroll_summary(group_by):
+    """Head count and salary statistics per ``group_by`` value, plus overall totals."""
+    column = SUMMARY_GROUPS[group_by]
+    statistics = {
+        'employees': Count('pk'),
+        'total': Sum('salary'),
+        'average': Avg('salary'),
+        'minimum': Min('salary'),
+        'maximum': Max('salary'),
+    }
+    groups = (
+        EmployeePayroll.objects.values(column).annotate(**statistics).order_by(column)
+    )
+    return {
+        'group_by': group_by,
+        'groups': [{group_by: row.pop(column), **row} for row in groups],
+        'totals': EmployeePayroll.objects.aggregate(**statistics),
+    }
@@ -0,0 +1,46 @@
+# clinic/permissions.py
+from rest_framework.permissions import BasePermission
+
+from .access import permission_cache
+
+
+class IsSuperuser(BasePermission):
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated and request.user.is_superuser)
+
+
+def has_permissions(user, required):
+    """Whether ``user`` holds every ``'app_label.codename'`` in ``required``."""
+    if not (user and user.is_authenticated):
+        return False
+    if user.is_superuser:
+        return True
+    permissions = permission_cache.for_user(user).permissions
+    return all(permission in permissions for permission in required)
+
+
+class HasPermissions(BasePermission):
+    """
+    Requires every ``'app_label.codename'`` in ``view.required_permissions``,
+    checked against the employee's compiled permission set.
+    """
+
+    def has_permission(self, request, view):
+        return has_permissions(request.user, getattr(view, 'required_permissions', ()))
+
+
+class HasRole(BasePermission):
+    """
+    Requires one of ``view.allowed_roles`` (the dashboard names: admin, doctor,
+    lab, reception, pharmacy), matched case-insensitively against the
+    employee's ``role`` and group names.
+    """
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not (user and user.is_authenticated):
+            return False
+        if user.is_superuser:
+            return True
+        roles = permission_cache.for_user(user).roles
+        return any(role.lower() in roles for role in getattr(view, 'allowed_roles', ()))
@@ -0,0 +1,75 @@
+# clinic/profiles.py
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from .cache import get_employee_version
+from .models import Employee
+
+PROFILE_TIMEOUT = 60 * 60
+PROFILE_COLUMNS = ('id', 'email', 'emp_id', 'first_name', 'father_name', 'grandfather_name', 'role', 'updated_at')
+
+
+def _profile_key(email):
+    return f'clinic:profile:2:{email.lower()}'
+
+
+def build_employee_profile(employee):
+    """Render the login profile in the ``serializers.serialize('json')`` shape the frontend reads."""
+    groups = list(employee.groups.all())
+    codenames = {p.codename for p in employee.user_permissions.all()}
+    for group in groups:
+        codenames.update(p.codename for p in group.permissions.all())
+    return {
+        'model': 'clinic.employee',
+        'pk': employee.pk,
+        'fields': {
+            'email': employee.email,
+            'emp_id': employee.emp_id,
+            'name': f'{employee.first_name} {employee.father_name}',
+            'first_name': employee.first_name,
+            'father_name': employee.father_name,
+            'grandfather_name': employee.grandfather_name,
+            'role': employee.role,
+            'groups': sorted(group.name for group in groups),
+            'permissions': sorted(codenames),
+        },
+    }
+
+
+def load_employee(email):
+    return (
+        Employee.objects.only(*PROFILE_COLUMNS)
+        .prefetch_related(
+            Prefetch(
+                'groups',
+                queryset=Group.objects.only('id', 'name').prefetch_related(
+                    Prefetch('permissions', queryset=Permission.objects.only('id', 'codename'))
+                ),
+            ),
+            Prefetch('user_permissions', queryset=Permission.objects.only('id', 'codename')),
+        )
+        .get(email__iexact=email)
+    )
+
+
+def get_profile_entry(email):
+    """
+    Return the cached ``(pk, version, updated_at, profile)`` for ``email``,
+    rebuilding it when the employee's version stamp has moved on. Raises
+    ``Employee.DoesNotExist``.
+    """
+    key = _profile_key(email)
+    cached = cache.get(key)
+    if cached is not None and get_employee_version(cached[0]) == cached[1]:
+        return cached
+
+    employee = load_employee(email)
+    entry = (employee.pk, get_employee_version(employee.pk), employee.updated_at, build_employee_profile(employee))
+    cache.set(key, entry, PROFILE_TIMEOUT)
+    return entry
+
+
+def get_employee_profile(email):
+    """The login profile for ``email``; see ``get_profile_entry``."""
+    return get_profile_entry(email)[3]
@@ -0,0 +1,297 @@
+# clinic/ratelimit.py
+"""
+Sliding-window rate limits and progressive lockout for the unauthenticated
+auth endpoints.
+
+Each limit keeps one counter per fixed window and estimates the sliding
+count as ``previous * (1 - elapsed) + current``, so a check is one
+increment and one read regardless of traffic. Counters live in a pluggable
+store: ``MemoryCounterStore`` (per process, the default) or
+``CacheCounterStore`` (any Django cache, shared between workers).
+
+The throttles run in DRF's ``initial()``, before the view parses credentials,
+touches the database or hashes a password.
+"""
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .conf import DEFAULTS, clinic_setting
+
+RATE = re.compile(r'^(\d+)/(\d*)(s|sec|m|min|h|hour|d|day)$')
+PERIODS = {'s': 1, 'sec': 1, 'm': 60, 'min': 60, 'h': 3600, 'hour': 3600, 'd': 86400, 'day': 86400}
+
+
+def parse_rate(rate):
+    """``'10/min'`` -> ``(10, 60)``, ``'100/5m'`` -> ``(100, 300)``; ``None`` disables."""
+    if rate is None:
+        return None
+    match = RATE.match(rate)
+    if match is None:
+        raise ValueError(f'Invalid rate {rate!r}')
+    count, multiple, unit = match.groups()
+    return int(count), int(multiple or 1) * PERIODS[unit]
+
+
+class MemoryCounterStore:
+    """Expiring counters in a bounded, least-recently-written dict."""
+
+    def __init__(self, max_keys=100_000):
+        self.max_keys = max_keys
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live(self, key, now):
+        entry = self._data.get(key)
+        if entry is None or entry[1] <= now:
+            return None
+        return entry[0]
+
+    def incr(self, key, ttl):
+        now = time.monotonic()
+        with self._lock:
+            value = (self._live(key, now) or 0) + 1
+            expires = self._data[key][1] if value > 1 else now + ttl
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_keys:
+                self._data.popitem(last=False)
+            return value
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        with self._lock:
+            return {key: value for key in keys if (value := self._live(key, now)) is not None}
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class CacheCounterStore:
+    """Counters in a Django cache, e.g. Redis, shared by every worker."""
+
+    def __init__(self, alias='default', prefix='clinic-rl'):
+        self.cache = caches[alias]
+        self.prefix = prefix
+
+    def _key(self, key):
+        return f'{self.prefix}:{key}'
+
+    def incr(self, key, ttl):
+        key = self._key(key)
+        if self.cache.add(key, 1, ttl):
+            return 1
+        try:
+            return self.cache.incr(key)
+        except ValueError:  # expired between add() and incr()
+            self.cache.set(key, 1, ttl)
+            return 1
+
+    def get_many(self, keys):
+        found = self.cache.get_many([self._key(key) for key in keys])
+        return {key: found[self._key(key)] for key in keys if self._key(key) in found}
+
+    def get(self, key):
+        return self.cache.get(self._key(key))
+
+    def set(self, key, value, ttl):
+        self.cache.set(self._key(key), value, ttl)
+
+    def delete(self, *keys):
+        self.cache.delete_many([self._key(key) for key in keys])
+
+
+_stores = {}
+
+
+def get_counter_store():
+    path = clinic_setting('RATE_LIMITS', 'STORE')
+    if path not in _stores:
+        _stores[path] = import_string(path)()
+    return _stores[path]
+
+
+def hit(key, limit, window, store=None, now=None):
+    """
+    Count one request against ``key``. Returns ``(allowed, retry_after)``,
+    where ``retry_after`` is the seconds until the estimate drops back under
+    ``limit``. Rejected requests are counted too, so a flood stays blocked.
+    """
+    store = store or get_counter_store()
+    now = time.time() if now is None else now
+    bucket, offset = divmod(now, window)
+    current_key, previous_key = f'{key}:{int(bucket)}', f'{key}:{int(bucket) - 1}'
+    current = store.incr(current_key, ttl=2 * window)
+    previous = store.get_many([previous_key]).get(previous_key, 0)
+    weight = 1 - offset / window
+    if previous * weight + current <= limit:
+        return True, 0
+    if current >= limit or not previous:
+        retry_after = window - offset
+    else:
+        retry_after = window * (weight - (limit - current) / previous)
+    return False, max(1, math.ceil(retry_after))
+
+
+def normalize_email(email):
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
+def request_email(data):
+    return normalize_email(data.get('email')) if hasattr(data, 'get') else None
+
+
+def client_ip(request):
+    """
+    ``REMOTE_ADDR``, or with ``REST_FRAMEWORK['NUM_PROXIES']`` trusted proxies
+    in front of the app, the address the outermost of them appended to
+    ``X-Forwarded-For``. Otherwise the header is client-supplied and ignored.
+    """
+    num_proxies = api_settings.NUM_PROXIES
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if num_proxies and forwarded:
+        addresses = [address.strip() for address in forwarded.split(',')]
+        return addresses[-min(num_proxies, len(addresses))]
+    return request.META.get('REMOTE_ADDR')
+
+
+class Lockout:
+    """
+    Progressive lockout after repeated failed logins, per account and per
+    client address. ``FAILURES`` (``IP_FAILURES`` for an address) failures
+    within ``WINDOW`` seconds lock it for ``BASE_SECONDS``, doubling with each
+    further lockout up to ``MAX_SECONDS`` until ``RESET_AFTER`` seconds pass
+    without one. A successful login clears the account's failure count.
+    """
+
+    def __init__(self, store=None):
+        self._store = store
+
+    @property
+    def store(self):
+        return self._store or get_counter_store()
+
+    @property
+    def config(self):
+        return {**DEFAULTS['RATE_LIMITS']['LOCKOUT'], **clinic_setting('RATE_LIMITS', 'LOCKOUT')}
+
+    def identities(self, request, email):
+        config = self.config
+        identities = [(f'ip:{client_ip(request)}', config['IP_FAILURES'])]
+        if normalize_email(email):
+            identities.insert(0, (f'email:{normalize_email(email)}', config['FAILURES']))
+        return identities
+
+    def retry_after(self, request, email):
+        """Seconds until the attempt is unlocked, 0 if it isn't locked."""
+        now = time.time()
+        locks = self.store.get_many([f'lock:{identity}' for identity, _ in self.identities(request, email)])
+        return max((math.ceil(until - now) for until in locks.values() if until > now), default=0)
+
+    def failure(self, request, email):
+        config = self.config
+        for identity, failures in self.identities(request, email):
+            allowed, _ = hit(f'fail:{identity}', failures - 1, config['WINDOW'], store=self.store)
+            if allowed:
+                continue
+            lockouts = self.store.incr(f'lockouts:{identity}', ttl=config['RESET_AFTER'])
+            duration = min(config['BASE_SECONDS'] * 2 ** (lockouts - 1), config['MAX_SECONDS'])
+            self.store.set(f'lock:{identity}', time.time() + duration, ttl=duration)
+            self._clear_failures(identity)
+
+    def _clear_failures(self, identity):
+        bucket = int(time.time() // self.config['WINDOW'])
+        self.store.delete(f'fail:{identity}:{bucket}', f'fail:{identity}:{bucket - 1}')
+
+    def success(self, request, email):
+        if normalize_email(email):
+            self._clear_failures(f'email:{normalize_email(email)}')
+
+
+lockout = Lockout()
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Limits keyed by ``view.throttle_scope``; the rate comes from
+    ``CLINIC_RATE_LIMITS['RATES']['<scope>_<kind>']``.
+    """
+    kind = None
+
+    def get_ident_key(self, request, view):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        rate = parse_rate(clinic_setting('RATE_LIMITS', 'RATES').get(f'{scope}_{self.kind}'))
+        ident = self.get_ident_key(request, view)
+        if rate is None or ident is None:
+            return True
+        allowed, self.retry_after = hit(f'rl:{scope}:{self.kind}:{ident}', *rate)
+        return allowed
+
+    def wait(self):
+        return self.retry_after
+
+
+class IPRateThrottle(SlidingWindowThrottle):
+    kind = 'ip'
+
+    def get_ident_key(self, request, view):
+        return client_ip(request)
+
+
+class EmailRateThrottle(SlidingWindowThrottle):
+    kind = 'email'
+
+    def get_ident_key(self, request, view):
+        return request_email(request.data)
+
+
+class LockoutThrottle(BaseThrottle):
+    """Rejects logins for an email or address that is currently locked out."""
+
+    def allow_request(self, request, view):
+        self.retry_after = lockout.retry_after(request, request_email(request.data))
+        return not self.retry_after
+
+    def wait(self):
+        return self.retry_after
+
+
+def check_rate_limits(request, scope, email):
+    """
+    The throttles above for views outside DRF (the async auth views).
+    Returns the seconds to wait, or 0 when the request may proceed.
+    """
+    waits = []
+    for kind, ident in (('ip', client_ip(request)), ('email', normalize_email(email))):
+        rate = parse_rate(clinic_setting('RATE_LIMITS', 'RATES').get(f'{scope}_{kind}'))
+        if rate is not None and ident is not None:
+            allowed, retry_after = hit(f'rl:{scope}:{kind}:{ident}', *rate)
+            if not allowed:
+                waits.append(retry_after)
+    if scope == 'login':
+        waits.append(lockout.retry_after(request, email))
+    return max(waits, default=0)
@@ -0,0 +1,63 @@
+# clinic/renderers.py
+"""
+Response renderers.
+
+``ORJSONRenderer`` is the default JSON renderer, encoded by orjson when it
+is installed. Its compact output decodes to the same values as the stock
+``JSONRenderer``'s for what serializers produce (strings, numbers,
+Decimals, dates and times), but it is not byte-for-byte identical: floats
+may be spelled differently (``1e16`` for ``1e+16``), and NaN and infinity
+render as ``null`` where the stock renderer raises.
+``MessagePackRenderer`` answers ``Accept: application/msgpack`` and is only
+enabled in settings when the msgpack package is installed. Compression is
+separate; see ``clinic.compression``.
+"""
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional; the stock encoder is used instead
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional; see DEFAULT_RENDERER_CLASSES in settings
+    msgpack = None
+
+# Values neither encoder handles natively (Decimal, lazy strings, querysets,
+# and datetimes, passed through so they keep DRF's millisecond format).
+_encode_default = JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` backed by orjson. Indented output, and values orjson
+    rejects such as integers beyond 64 bits, go through the stock encoder.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            body = orjson.dumps(
+                data, default=_encode_default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # As JSONRenderer does, so the output is also valid JavaScript.
+        return body.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class MessagePackRenderer(BaseRenderer):
+    """``application/msgpack``, also selectable with ``?format=msgpack``."""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_encode_default)
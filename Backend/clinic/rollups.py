@@ -0,0 +1,120 @@
+# clinic/rollups.py
+"""
+Staffing head counts by location, role and gender.
+
+``StaffingRollup`` holds one counter per (region, zone, woreda, kebele,
+role, gender). Saves and deletes move an employee between counters with
+single-row ``F()`` updates (see the receivers in ``clinic.signals``), and
+bulk imports add one grouped increment per key, so dashboards read a table
+sized by the number of distinct locations rather than the workforce.
+An employee is counted once both the employee and profile rows exist.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .counters import upsert_increment
+from .models import EmployeeProfile, StaffingRollup
+
+LEVELS = ('region', 'zone', 'woreda', 'kebele')
+BREAKDOWNS = ('role', 'gender')
+# ``EmployeeProfile`` lookups for each ``StaffingRollup.KEY_FIELDS`` entry.
+KEY_LOOKUPS = ('region', 'zone', 'woreda', 'kebele', 'employee__role', 'employee__gender')
+# Columns whose change can move an employee between rollup keys.
+EMPLOYEE_KEY_FIELDS = frozenset(('role', 'gender'))
+PROFILE_KEY_FIELDS = frozenset(LEVELS)
+
+
+def rollup_key(employee_id):
+    """The employee's current key, or ``None`` while it has no profile."""
+    return EmployeeProfile.objects.filter(pk=employee_id).values_list(*KEY_LOOKUPS).first()
+
+
+def increment(key, amount):
+    upsert_increment(StaffingRollup, dict(zip(StaffingRollup.KEY_FIELDS, key)), {'headcount': amount})
+
+
+def move(old_key, new_key):
+    """Move one employee from ``old_key`` to ``new_key``; either may be ``None``."""
+    if old_key == new_key:
+        return
+    if old_key is not None:
+        increment(old_key, -1)
+    if new_key is not None:
+        increment(new_key, 1)
+
+
+def add_employees(pks):
+    """Count newly created employees with one grouped query."""
+    grouped = (
+        EmployeeProfile.objects.filter(pk__in=pks)
+        .values_list(*KEY_LOOKUPS).annotate(count=Count('pk')).order_by()
+    )
+    for *key, count in grouped:
+        increment(tuple(key), count)
+
+
+def rebuild_rollups(chunk_size=5000):
+    """
+    Recompute every counter from scratch, grouping ``chunk_size`` employees
+    per query, and swap the result in with one transaction. Returns the
+    number of keys.
+    """
+    counts = Counter()
+    last_pk = 0
+    while True:
+        pks = list(
+            EmployeeProfile.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', flat=True)[:chunk_size]
+        )
+        if not pks:
+            break
+        grouped = (
+            EmployeeProfile.objects.filter(pk__gte=pks[0], pk__lte=pks[-1])
+            .values_list(*KEY_LOOKUPS).annotate(count=Count('pk')).order_by()
+        )
+        for *key, count in grouped:
+            counts[tuple(key)] += count
+        last_pk = pks[-1]
+    with transaction.atomic():
+        StaffingRollup.objects.all().delete()
+        StaffingRollup.objects.bulk_create(
+            [StaffingRollup(headcount=count, **dict(zip(StaffingRollup.KEY_FIELDS, key))) for key, count in counts.items()],
+            batch_size=1000,
+        )
+    return len(counts)
+
+
+def staffing_breakdown(**filters):
+    """
+    Head count under the location given by ``filters`` (a prefix of
+    ``LEVELS``, optionally with ``role``/``gender``), split by the next
+    location level and by role and gender.
+    """
+    depth = 0
+    while depth < len(LEVELS) and LEVELS[depth] in filters:
+        depth += 1
+    level = LEVELS[depth] if depth < len(LEVELS) else None
+    rows = (
+        StaffingRollup.objects.filter(headcount__gt=0, **filters)
+        .values(*filter(None, (level,)), *BREAKDOWNS).annotate(headcount=Sum('headcount')).order_by()
+    )
+    total = {'headcount': 0, **{name: Counter() for name in BREAKDOWNS}}
+    children = {}
+    for row in rows:
+        targets = [total]
+        if level:
+            targets.append(children.setdefault(
+                row[level], {level: row[level], 'headcount': 0, **{name: Counter() for name in BREAKDOWNS}},
+            ))
+        for target in targets:
+            target['headcount'] += row['headcount']
+            for name in BREAKDOWNS:
+                target[name][row[name]] += row['headcount']
+    return {
+        'filters': filters,
+        'level': level,
+        **total,
+        'children': [children[name] for name in sorted(children)],
+    }
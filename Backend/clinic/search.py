@@ -0,0 +1,152 @@
+# clinic/search.py
+"""
+Pluggable employee search.
+
+``CLINIC_SEARCH_BACKEND`` names the backend class. ``DatabaseSearchBackend``
+works on any database, matching each term as a prefix of one of the
+normalized name columns (``search_name``, ``search_father_name``,
+``search_grandfather_name``) with index range scans;
+``SQLiteFTSSearchBackend`` adds an FTS5 index (created in migration 0005)
+for token and prefix matching over names, location and role. Backends are
+kept in sync from the post_save/post_delete/employees_imported signals.
+"""
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .conf import clinic_setting
+from .models import Employee
+
+FTS_TABLE = 'clinic_employee_fts'
+DOCUMENT_COLUMNS = ('id', 'first_name', 'father_name', 'grandfather_name', 'role')
+# Indexed columns of the ``profile`` side table; ``None`` when an employee has no profile row.
+PROFILE_COLUMNS = {name: F(f'profile__{name}') for name in ('region', 'zone', 'woreda', 'kebele', 'field')}
+# Saves whose ``update_fields`` miss these leave the index as it is.
+EMPLOYEE_INDEXED_FIELDS = frozenset(DOCUMENT_COLUMNS) - {'id'}
+PROFILE_INDEXED_FIELDS = frozenset(PROFILE_COLUMNS)
+
+
+def document_rows(queryset):
+    return queryset.values(*DOCUMENT_COLUMNS, **PROFILE_COLUMNS)
+
+
+def split_terms(query):
+    return Employee.normalize_search_name(query, '', '').split()
+
+
+def prefix_q(column, prefix):
+    # A range rather than ``__startswith``: SQLite's LIKE can't use the index.
+    return Q(**{f'{column}__gte': prefix, f'{column}__lt': prefix + '\uffff'})
+
+
+class DatabaseSearchBackend:
+    def index(self, employees):
+        pass
+
+    def remove(self, pks):
+        pass
+
+    def rebuild(self, batch_size=2000):
+        pass
+
+    def filter_queryset(self, queryset, query):
+        """Restrict ``queryset`` to employees matching every term of ``query``."""
+        for term in split_terms(query):
+            queryset = queryset.filter(
+                prefix_q('search_name', term) | prefix_q('search_father_name', term)
+                | prefix_q('search_grandfather_name', term) | Q(role__iexact=term) | Q(profile__field__iexact=term)
+                | Q(profile__region__iexact=term) | Q(profile__zone__iexact=term)
+                | Q(profile__woreda__iexact=term)
+            )
+        return queryset
+
+    def autocomplete(self, prefix, limit=10):
+        """Employees whose full name starts with ``prefix``, via an index range scan."""
+        prefix = ' '.join(split_terms(prefix))
+        if not prefix:
+            return Employee.objects.none()
+        return (
+            Employee.objects.filter(prefix_q('search_name', prefix)).order_by('search_name')[:limit]
+        )
+
+
+class SQLiteFTSSearchBackend(DatabaseSearchBackend):
+    @staticmethod
+    def match_expression(query, column=None):
+        terms = ['"%s"*' % term.replace('"', '""') for term in split_terms(query)]
+        if column and terms:
+            return '%s: (%s)' % (column, ' '.join(terms))
+        return ' '.join(terms)
+
+    @staticmethod
+    def document(employee):
+        return (
+            employee['id'],
+            Employee.normalize_search_name(employee['first_name'], employee['father_name'], employee['grandfather_name']),
+            ' '.join(employee[name] or '' for name in ('region', 'zone', 'woreda', 'kebele')),
+            ' '.join((employee['role'], employee['field'] or '')),
+        )
+
+    def _write(self, rows):
+        rows = list(rows)
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, location, role) VALUES (%s, %s, %s, %s)', rows,
+            )
+
+    def index(self, employees):
+        pks = [employee.pk for employee in employees]
+        for start in range(0, len(pks), 2000):
+            batch = document_rows(Employee.objects.filter(pk__in=pks[start:start + 2000]))
+            self._write(self.document(row) for row in batch)
+
+    def remove(self, pks):
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk in pks])
+
+    def rebuild(self, batch_size=2000):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        last_pk = 0
+        while True:
+            batch = list(document_rows(Employee.objects.filter(pk__gt=last_pk).order_by('pk'))[:batch_size])
+            if not batch:
+                break
+            self._write(self.document(row) for row in batch)
+            last_pk = batch[-1]['id']
+
+    def filter_queryset(self, queryset, query):
+        expression = self.match_expression(query)
+        if not expression:
+            return queryset
+        return queryset.filter(pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', (expression,)))
+
+    def autocomplete(self, prefix, limit=10):
+        expression = self.match_expression(prefix, column='name')
+        if not expression:
+            return Employee.objects.none()
+        # No ORDER BY rank: ranking every match of a short prefix costs far more
+        # than the lookup, and FTS5 can stop after ``limit`` hits without it.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s LIMIT %s',
+                (expression, limit),
+            )
+            pks = [row[0] for row in cursor.fetchall()]
+        return Employee.objects.filter(pk__in=pks).order_by('search_name')
+
+
+_backends = {}
+
+
+def get_search_backend():
+    path = clinic_setting('SEARCH_BACKEND')
+    if path.endswith('SQLiteFTSSearchBackend') and connection.vendor != 'sqlite':
+        path = 'clinic.search.DatabaseSearchBackend'
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
@@ -1,16 +1,134 @@
 # clinic/serializers.py
 from rest_framework import serializers
-from .models import Employee
+from rest_framework.relations import MANY_RELATION_KWARGS
+from rest_framework.utils.model_meta import get_field_info
+from .models import EMPLOYEE_SIDE_TABLES, SIDE_TABLE_FIELDS, AuditEvent, Employee, EmployeeProfile, UploadSession
 from django.contrib.auth.models import Group, Permission
+from django.db import transaction
+from django.db.models import Prefetch
 
-class EmployeeSerializer(serializers.ModelSerializer):
-    groups = serializers.SlugRelatedField(
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """Resolve every slug in the input list with a single ``__in`` query."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        slugs = [str(item) for item in data]
+        found = {
+            getattr(obj, child.slug_field): obj
+            for obj in child.get_queryset().filter(**{f'{child.slug_field}__in': slugs})
+        }
+        for slug in slugs:
+            if slug not in found:
+                child.fail('does_not_exist', slug_name=child.slug_field, value=slug)
+        return [found[slug] for slug in slugs]
+
+
+class BulkSlugRelatedField(serializers.SlugRelatedField):
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+
+class SideTableFieldsMixin:
+    """
+    Serialize the ``profile``/``payroll`` side-table columns of ``Employee``
+    as flat fields (``source='profile.region'`` etc.), so the API keeps the
+    shape of the original single table. Validated side-table values arrive
+    nested under their relation name.
+    """
+
+    def build_field(self, field_name, info, model_class, nested_depth):
+        relation = SIDE_TABLE_FIELDS.get(field_name) if issubclass(model_class, Employee) else None
+        if relation is None:
+            return super().build_field(field_name, info, model_class, nested_depth)
+        model_field = get_field_info(EMPLOYEE_SIDE_TABLES[relation]).fields[field_name]
+        field_class, field_kwargs = self.build_standard_field(field_name, model_field)
+        field_kwargs['source'] = f'{relation}.{field_name}'
+        return field_class, field_kwargs
+
+
+class DynamicFieldsMixin:
+    """Limit the serialized fields to the ``fields`` keyword argument, if given."""
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            unknown = set(fields) - set(self.fields)
+            if unknown:
+                raise serializers.ValidationError(
+                    {'fields': [f"Unknown field(s): {', '.join(sorted(unknown))}"]}
+                )
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @property
+    def readable_columns(self):
+        """Concrete model columns needed to render the selected fields, side-table ones as ``profile__x``."""
+        model = self.Meta.model
+        concrete = {f.name for f in model._meta.concrete_fields}
+        names = {model._meta.pk.name}
+        for field in self.fields.values():
+            if field.write_only:
+                continue
+            if field.source in concrete:
+                names.add(field.source)
+            elif field.source_attrs[0] in EMPLOYEE_SIDE_TABLES and issubclass(model, Employee):
+                names.add('__'.join(field.source_attrs))
+        return sorted(names)
+
+    @property
+    def readable_side_tables(self):
+        """Side tables that must be joined for the selected fields."""
+        return sorted({column.partition('__')[0] for column in self.readable_columns if '__' in column})
+
+    @property
+    def readable_relations(self):
+        """Many-to-many relations that need to be prefetched for the selected fields."""
+        model = self.Meta.model
+        m2m = {f.name for f in model._meta.many_to_many}
+        return sorted(
+            field.source for field in self.fields.values()
+            if not field.write_only and field.source in m2m
+        )
+
+    def optimize_queryset(self, queryset):
+        """
+        Load only the selected columns and prefetch each selected relation, so
+        rendering any number of rows costs one query plus one per relation.
+        """
+        queryset = queryset.only(*self.readable_columns)
+        if self.readable_side_tables:
+            queryset = queryset.select_related(*self.readable_side_tables)
+        for name in self.readable_relations:
+            field = self.fields[name]
+            related = field.child_relation if isinstance(field, serializers.ManyRelatedField) else field
+            slug_field = getattr(related, 'slug_field', None)
+            lookups = queryset.model._meta.get_field(name).related_model.objects.all()
+            if slug_field:
+                lookups = lookups.only('pk', slug_field)
+            queryset = queryset.prefetch_related(Prefetch(name, queryset=lookups))
+        return queryset
+
+
+class EmployeeSerializer(SideTableFieldsMixin, DynamicFieldsMixin, serializers.ModelSerializer):
+    groups = BulkSlugRelatedField(
         many=True,
         slug_field='name',
         queryset=Group.objects.all(),
         required=False
     )
-    user_permissions = serializers.SlugRelatedField(
+    user_permissions = BulkSlugRelatedField(
         many=True,
         slug_field='codename',
         queryset=Permission.objects.all(),
@@ -24,20 +142,42 @@ class EmployeeSerializer(serializers.ModelSerializer):
             'body', 'image', 'region', 'zone', 'woreda', 'kebele', 'email', 'phone_number',
             'institution_name', 'field', 'date_of_graduate', 'company_names', 'role',
             'salary', 'pdf', 'licence_type', 'give_date', 'expired_date', 'bank_name',
-            'bank_account', 'groups', 'user_permissions', 'is_active', 'is_staff', 'password'
+            'bank_account', 'groups', 'user_permissions', 'is_active', 'password'
         ]
         extra_kwargs = {
             'password': {'write_only': True}
         }
 
+    def _check_size(self, value, kind):
+        from .media import max_bytes
+        if value is not None and value.size > max_bytes(kind):
+            raise serializers.ValidationError(
+                f'File is too large; use /api/uploads/ for files over {max_bytes(kind)} bytes.'
+            )
+        return value
+
+    def validate_image(self, value):
+        return self._check_size(value, 'image')
+
+    def validate_pdf(self, value):
+        return self._check_size(value, 'pdf')
+
     def create(self, validated_data):
         groups_data = validated_data.pop('groups', [])
         user_permissions_data = validated_data.pop('user_permissions', [])
         password = validated_data.pop('password')
+        # Callers that hashed off the request thread pass save(encoded_password=...).
+        encoded_password = validated_data.pop('encoded_password', None)
+        validated_data, side_fields = Employee.split_fields(validated_data)
         
         employee = Employee(**validated_data)
-        employee.set_password(password)
-        employee.save()
+        if encoded_password:
+            employee.password = encoded_password
+        else:
+            employee.set_password(password)
+        with transaction.atomic():
+            employee.save()
+            employee.save_side_tables(side_fields)
         
         if groups_data:
             employee.groups.set(groups_data)
@@ -46,16 +186,99 @@ class EmployeeSerializer(serializers.ModelSerializer):
         
         return employee
 
+class EmployeeRegistrationSerializer(EmployeeSerializer):
+    """
+    Public self-registration: groups, permissions and the active flag are
+    returned but never taken from the request, since the permission checks
+    trust them. ``EmployeeSerializer`` sets them for admin-only callers.
+    """
+    groups = serializers.SlugRelatedField(many=True, slug_field='name', read_only=True)
+    user_permissions = serializers.SlugRelatedField(many=True, slug_field='codename', read_only=True)
+
+    class Meta(EmployeeSerializer.Meta):
+        extra_kwargs = {
+            **EmployeeSerializer.Meta.extra_kwargs,
+            'is_active': {'read_only': True},
+        }
+
+class EmployeeSummarySerializer(SideTableFieldsMixin, DynamicFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Employee
+        fields = [
+            'id', 'emp_id', 'first_name', 'father_name', 'grandfather_name', 'gender',
+            'role', 'field', 'email', 'phone_number', 'image', 'image_thumbnail',
+        ]
+        read_only_fields = fields
+
+class EmployeeLicenceSerializer(SideTableFieldsMixin, DynamicFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Employee
+        fields = [
+            'id', 'emp_id', 'first_name', 'father_name', 'role', 'email',
+            'licence_type', 'give_date', 'expired_date', 'licence_bucket',
+        ]
+        read_only_fields = fields
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'employee', 'kind', 'filename', 'content_type', 'total_size', 'received', 'completed_at']
+        read_only_fields = ['id', 'received', 'completed_at']
+
+    def validate(self, attrs):
+        from .media import max_bytes
+        limit = max_bytes(attrs['kind'])
+        if not 0 < attrs['total_size'] <= limit:
+            raise serializers.ValidationError({'total_size': [f'Must be between 1 and {limit} bytes.']})
+        if not EmployeeProfile.objects.filter(pk=attrs['employee'].pk).exists():
+            raise serializers.ValidationError({'employee': ['Employee has no profile to attach files to.']})
+        return attrs
+
+class AuditEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AuditEvent
+        fields = ['id', 'created_at', 'action', 'employee_id', 'actor_id', 'ip_address', 'detail']
+        read_only_fields = fields
+
 class LoginSerializer(serializers.Serializer):
     email = serializers.EmailField()
     password = serializers.CharField()
 
 class TokenRefreshSerializer(serializers.Serializer):
     refresh = serializers.CharField()
+
     def validate(self, attrs):
+        from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+        from rest_framework_simplejwt.settings import api_settings
         from rest_framework_simplejwt.tokens import RefreshToken
-        refresh = RefreshToken(attrs['refresh'])
+        from .tokens import revocation_store
+
+        try:
+            refresh = RefreshToken(attrs['refresh'])
+        except TokenError as exc:
+            raise InvalidToken(exc.args[0])
+        if revocation_store.is_revoked(refresh[api_settings.JTI_CLAIM]):
+            raise InvalidToken('Token is revoked')
+
         data = {'access': str(refresh.access_token)}
-        if refresh.payload.get('rotating_refresh_token', False):
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION and not revocation_store.revoke(refresh):
+                raise InvalidToken('Token is revoked')
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
             data['refresh'] = str(refresh)
-        return data
\ No newline at end of file
+        return data
+
+class TokenRevokeSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+
+    def validate(self, attrs):
+        from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        try:
+            attrs['token'] = RefreshToken(attrs['refresh'])
+        except TokenError as exc:
+            raise InvalidToken(exc.args[0])
+        return attrs
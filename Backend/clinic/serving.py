@@ -0,0 +1,222 @@
+# clinic/serving.py
+"""
+Conditional, range-aware serving of stored employee files.
+
+Whole-file responses hand the open file to ``FileResponse`` so WSGI servers
+with ``wsgi.file_wrapper`` can use ``sendfile``; ``CLINIC_MEDIA['ACCEL_REDIRECT']``
+delegates the transfer to nginx instead. Resized images are kept in an
+on-disk cache keyed by source ETag and size, evicted least-recently-used.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+
+from .conf import clinic_setting
+
+CONTENT_ADDRESSED = re.compile(r'^[0-9a-f]{64}$')
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def file_etag(name, path):
+    """
+    Strong validator for a stored file: its SHA-256 when the name is content
+    addressed (see ``clinic.media``), otherwise its mtime and size.
+    """
+    stem = Path(name).stem
+    if CONTENT_ADDRESSED.match(stem):
+        return f'"{stem}"'
+    stat = os.stat(path)
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def is_immutable(etag):
+    return CONTENT_ADDRESSED.match(etag.strip('"')) is not None
+
+
+def parse_range(header, size):
+    """
+    Return ``(start, end)`` for a single satisfiable byte range, ``None`` to
+    serve the whole file, or ``False`` if the range cannot be satisfied.
+    """
+    match = RANGE.match(header.replace(' ', ''))
+    if not match:
+        return None  # malformed or multi-range: ignore and send everything
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+class RangeFile:
+    """File-like view of ``length`` bytes of ``handle`` starting at ``start``."""
+    block_size = 64 * 1024
+
+    def __init__(self, handle, start, length):
+        handle.seek(start)
+        self.handle = handle
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.handle.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.handle.close()
+
+
+def serve_file(request, path, etag, content_type=None, filename=None):
+    """
+    Serve ``path`` honouring ``If-None-Match``, ``Range`` and ``If-Range``.
+    ``path`` may be a callable, which is only invoked when the body is needed.
+    """
+    cache_control = 'private, max-age=31536000, immutable' if is_immutable(etag) else 'private, no-cache'
+
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        response['Cache-Control'] = cache_control
+        return response
+
+    if callable(path):
+        path = path()
+    content_type = content_type or mimetypes.guess_type(str(path))[0] or 'application/octet-stream'
+    size = os.path.getsize(path)
+    byte_range = None
+    if 'Range' in request.headers:
+        if_range = request.headers.get('If-Range')
+        if if_range is None or if_range == etag:
+            byte_range = parse_range(request.headers['Range'], size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    accel_prefix = clinic_setting('MEDIA', 'ACCEL_REDIRECT')
+    if accel_prefix and byte_range is None:
+        # nginx serves the bytes (and any Range) from an internal location.
+        relative = Path(path).relative_to(settings.MEDIA_ROOT).as_posix()
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{relative}"
+    elif byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(RangeFile(open(path, 'rb'), start, end - start + 1), content_type=content_type)
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+
+    response['ETag'] = etag
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = cache_control
+    if filename:
+        response['Content-Disposition'] = f'inline; filename="{filename}"'
+    return response
+
+
+class ResizedImageCache:
+    """
+    Resized copies of images on disk, ``<dir>/<size>/<key>.jpg``. Hits touch
+    the file's mtime. The total size is counted once and then kept up to date
+    as files are written; only when a write pushes it past ``max_bytes`` is
+    the directory walked, the stalest files removed first and the count
+    corrected for whatever other processes wrote meanwhile.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total = None
+
+    def path_for(self, etag, size):
+        key = hashlib.sha256(etag.encode()).hexdigest()
+        return self.directory / str(size) / f'{key}.jpg'
+
+    def get(self, source_path, etag, size):
+        path = self.path_for(etag, size)
+        if path.exists():
+            os.utime(path)
+            return path
+        self._render(source_path, path, size)
+        self._added(path.stat().st_size)
+        return path
+
+    def _render(self, source_path, path, size):
+        from PIL import Image, ImageOps
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with Image.open(source_path) as image:
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((size, size))
+            if image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            partial = path.with_suffix(f'.{threading.get_ident()}.tmp')
+            image.save(partial, format='JPEG', quality=85, optimize=True)
+        os.replace(partial, path)
+
+    def _entries(self):
+        for path in self.directory.glob('*/*.jpg'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:  # evicted by another process
+                continue
+            yield stat.st_mtime_ns, stat.st_size, path
+
+    def _added(self, size):
+        with self._lock:
+            if self._total is None:
+                self._total = sum(entry[1] for entry in self._entries())
+            else:
+                self._total += size
+            over_budget = self._total > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def evict(self):
+        with self._lock:
+            entries = list(self._entries())
+            total = sum(entry[1] for entry in entries)
+            if total > self.max_bytes:
+                for _, size, path in sorted(entries):
+                    path.unlink(missing_ok=True)
+                    total -= size
+                    if total <= self.max_bytes:
+                        break
+            self._total = total
+
+
+_resized_image_caches = {}
+
+
+def resized_image_cache():
+    directory = clinic_setting('MEDIA', 'RESIZE_CACHE_DIR') or Path(settings.MEDIA_ROOT) / '.resized'
+    key = (str(directory), clinic_setting('MEDIA', 'RESIZE_CACHE_MAX_BYTES'))
+    if key not in _resized_image_caches:
+        _resized_image_caches[key] = ResizedImageCache(*key)
+    return _resized_image_caches[key]
+
+
+def storage_path(name):
+    return default_storage.path(name)
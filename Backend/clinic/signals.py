@@ -0,0 +1,208 @@
+# clinic/signals.py
+from django.contrib.auth.models import Group
+from django.core.signals import request_finished
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from .audit import audit_log
+from .cache import bump_collection_version, bump_employee_version, bump_employee_versions, bump_group_version
+from .licences import count_imported_licences, move_licence_count
+from .metrics import install_query_timer
+from .models import AuditEvent, Employee, EmployeePayroll, EmployeeProfile
+from .rollups import EMPLOYEE_KEY_FIELDS, PROFILE_KEY_FIELDS, add_employees, move, rollup_key
+from .search import EMPLOYEE_INDEXED_FIELDS, PROFILE_INDEXED_FIELDS, get_search_backend
+
+# Sent after each bulk-imported chunk is committed; bulk_create skips
+# post_save, so derived data hooks in here. Provides ``employees``.
+employees_imported = Signal()
+
+
+def _group_member_ids(group_ids):
+    return list(Employee.objects.filter(groups__in=group_ids).values_list('pk', flat=True).distinct())
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def employee_changed(sender, instance, **kwargs):
+    bump_employee_version(instance.pk)
+    bump_collection_version()
+
+
+@receiver(post_save, sender=EmployeeProfile)
+@receiver(post_delete, sender=EmployeeProfile)
+@receiver(post_save, sender=EmployeePayroll)
+@receiver(post_delete, sender=EmployeePayroll)
+def employee_side_table_changed(sender, instance, **kwargs):
+    bump_employee_version(instance.employee_id)
+    Employee.objects.touch([instance.employee_id])
+
+
+ACCESS_FIELDS = {
+    Employee.groups.through: ('groups', AuditEvent.ACTION_GROUPS_CHANGED),
+    Employee.user_permissions.through: ('user_permissions', AuditEvent.ACTION_PERMISSIONS_CHANGED),
+}
+
+
+@receiver(m2m_changed, sender=Employee.groups.through)
+@receiver(m2m_changed, sender=Employee.user_permissions.through)
+def employee_access_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    field, audit_action = ACCESS_FIELDS[sender]
+    # clear() doesn't say what it removed, so note it first. On the reverse
+    # side ``instance`` is a Group or Permission and ``pk_set`` holds
+    # employee ids.
+    if action == 'pre_clear':
+        related = instance.user_set if reverse else getattr(instance, field)
+        instance._clinic_cleared_ids = list(related.values_list('pk', flat=True))
+        return
+    if not action.startswith('post_'):
+        return
+    changed = sorted(getattr(instance, '_clinic_cleared_ids', ()) if action == 'post_clear' else (pk_set or ()))
+    employee_ids = changed if reverse else [instance.pk]
+    bump_employee_versions(employee_ids)
+    Employee.objects.touch(employee_ids)
+    if changed:
+        ids = [instance.pk] if reverse else changed
+        for employee_id in employee_ids:
+            audit_log.record(audit_action, employee=employee_id, change=action[len('post_'):], ids=ids)
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def group_permissions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear', 'pre_clear'):
+        return
+    if reverse:
+        # ``instance`` is a Permission; ``pk_set`` holds group ids.
+        if action == 'pre_clear':
+            instance._clinic_group_ids = list(instance.group_set.values_list('pk', flat=True))
+            return
+        group_ids = getattr(instance, '_clinic_group_ids', ()) if action == 'post_clear' else (pk_set or ())
+    else:
+        if action == 'pre_clear':
+            return
+        group_ids = [instance.pk]
+    for group_id in group_ids:
+        bump_group_version(group_id)
+    member_ids = _group_member_ids(group_ids)
+    bump_employee_versions(member_ids)
+    Employee.objects.touch(member_ids)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def group_changed(sender, instance, created=False, **kwargs):
+    # Group names double as role names in the compiled permission sets.
+    if created:
+        return
+    bump_group_version(instance.pk)
+    member_ids = _group_member_ids([instance.pk])
+    bump_employee_versions(member_ids)
+    Employee.objects.touch(member_ids)
+
+
+@receiver(post_save, sender=Employee)
+def index_employee(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Logins save ``last_login`` and ``password`` only; those skip the rewrite.
+    if raw or (update_fields is not None and not EMPLOYEE_INDEXED_FIELDS & update_fields):
+        return
+    get_search_backend().index([instance])
+
+
+@receiver(post_save, sender=EmployeeProfile)
+def index_employee_profile(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Location and field are indexed too, and are saved after the employee row.
+    if raw or (update_fields is not None and not PROFILE_INDEXED_FIELDS & update_fields):
+        return
+    get_search_backend().index([instance.employee])
+
+
+@receiver(post_delete, sender=Employee)
+def unindex_employee(sender, instance, **kwargs):
+    get_search_backend().remove([instance.pk])
+
+
+@receiver(employees_imported)
+def restamp_imported_employees(sender, employees, **kwargs):
+    bump_collection_version()
+
+
+@receiver(employees_imported)
+def index_imported_employees(sender, employees, **kwargs):
+    get_search_backend().index(employees)
+
+
+@receiver(pre_save, sender=Employee)
+@receiver(pre_save, sender=EmployeeProfile)
+def remember_staffing_key(sender, instance, raw=False, update_fields=None, **kwargs):
+    # A new employee has no profile yet, so it only enters the rollup with
+    # its profile; saves that leave the key columns alone are skipped.
+    key_fields = EMPLOYEE_KEY_FIELDS if sender is Employee else PROFILE_KEY_FIELDS
+    if raw or (update_fields is not None and not key_fields & set(update_fields)):
+        return
+    if not instance._state.adding:
+        instance._staffing_key = rollup_key(instance.pk)
+    elif sender is EmployeeProfile:
+        instance._staffing_key = None
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_save, sender=EmployeeProfile)
+def update_staffing_rollup(sender, instance, **kwargs):
+    if '_staffing_key' in instance.__dict__:
+        move(instance.__dict__.pop('_staffing_key'), rollup_key(instance.pk))
+
+
+@receiver(pre_delete, sender=EmployeeProfile)
+def remember_deleted_staffing_key(sender, instance, **kwargs):
+    # Runs before the cascade removes the employee row the key joins to.
+    instance._staffing_key = rollup_key(instance.pk)
+
+
+@receiver(post_delete, sender=EmployeeProfile)
+def remove_from_staffing_rollup(sender, instance, **kwargs):
+    move(instance.__dict__.pop('_staffing_key', None), None)
+
+
+@receiver(employees_imported)
+def count_imported_employees(sender, employees, **kwargs):
+    add_employees([employee.pk for employee in employees])
+
+
+@receiver(pre_save, sender=EmployeeProfile)
+def remember_licence_bucket(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'licence_bucket' not in update_fields):
+        return
+    if instance._state.adding:
+        instance._licence_bucket = None
+    else:
+        instance._licence_bucket = (
+            EmployeeProfile.objects.filter(pk=instance.pk).values_list('licence_bucket', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=EmployeeProfile)
+def update_licence_count(sender, instance, **kwargs):
+    if '_licence_bucket' in instance.__dict__:
+        move_licence_count(instance.__dict__.pop('_licence_bucket'), instance.licence_bucket)
+
+
+@receiver(post_delete, sender=EmployeeProfile)
+def remove_licence_count(sender, instance, **kwargs):
+    move_licence_count(instance.licence_bucket, None)
+
+
+@receiver(employees_imported)
+def count_imported_licence_buckets(sender, employees, **kwargs):
+    count_imported_licences([employee.pk for employee in employees])
+
+
+@receiver(request_finished)
+def flush_audit_log(sender, **kwargs):
+    # After the response has gone out, so batches are written off the
+    # request's critical path.
+    audit_log.flush_if_due()
+
+
+@receiver(connection_created)
+def time_connection_queries(sender, connection, **kwargs):
+    install_query_timer(connection)
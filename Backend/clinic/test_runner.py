@@ -0,0 +1,16 @@
+# clinic/test_runner.py
+from django.test.runner import DiscoverRunner
+
+from .audit import audit_log
+
+
+class ClinicTestRunner(DiscoverRunner):
+    """
+    Discards audit events buffered against the test databases before they
+    are destroyed, so the exit-time flush never writes a test run's events to
+    the configured database, whichever test modules produced them.
+    """
+
+    def teardown_databases(self, old_config, **kwargs):
+        audit_log.clear()
+        super().teardown_databases(old_config, **kwargs)
@@ -1,3 +1,1744 @@
-from django.test import TestCase
+import asyncio
+import csv
+import datetime
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import Group, Permission
+from django.core.exceptions import ImproperlyConfigured
+from django.core import mail
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.contrib.auth.hashers import make_password, verify_password
+from django.contrib.auth.tokens import default_token_generator
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.encoding import force_bytes
+from django.utils import timezone
+from django.utils.http import urlsafe_base64_encode
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from rest_framework.test import APIClient
+
+from clinic_Management.databases import database_profile
+
+from .benchmarks import (
+    REGIONS, boot_process, compare_to_baseline, employee_fields, latency_summary, load_scenarios, parse_importtime, run_asgi,
+    run_wsgi, seed_employees, timed,
+)
+from .access import permission_cache
+from .audit import AuditBuffer, NDJSONSink, audit_log
+from .compression import available_encodings, negotiate_encoding
+from .authentication import UserCache, user_cache
+from .hashers import ProfiledPBKDF2PasswordHasher
+from .hashing import HashingPool, HashingPoolSaturated, get_hashing_pool
+from .importers import _hashing_processes, get_import_pool
+from .licences import licence_report, notify_licence_holders, refresh_licence_buckets
+from .mail import process_mail_queue
+from .metrics import registry
+from .media import process_thumbnail_queue
+from .renderers import MessagePackRenderer, ORJSONRenderer, msgpack
+from .ratelimit import CacheCounterStore, Lockout, client_ip, MemoryCounterStore, get_counter_store, hit, parse_rate
+from .permissions import HasPermissions, HasRole
+from .models import (
+    AuditEvent, Employee, EmployeePayroll, EmployeeProfile, MediaBlob, OutboundEmail, RevokedToken, StaffingRollup,
+    UploadSession,
+)
+from .search import DatabaseSearchBackend, get_search_backend
+from .serving import ResizedImageCache, parse_range, resized_image_cache
+from .tokens import revocation_store
+from .serializers import EmployeeSerializer
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+# Audit events are flushed explicitly by AuditLogTests; elsewhere a flush
+# after some unrelated request would upset its query count.
+_audit_settings = override_settings(CLINIC_AUDIT={'BATCH_SIZE': 10_000, 'FLUSH_SECONDS': float('inf')})
+
+
+def setUpModule():
+    _audit_settings.enable()
+
+
+def tearDownModule():
+    _audit_settings.disable()
+
+
+def make_employee(n, **overrides):
+    return Employee.objects.create_user(password='secret-pass-123', **employee_fields(n, **overrides))
+
+
+class ClearRateLimitsMixin:
+    """Auth endpoints are rate limited per client address, shared by every test."""
+
+    def setUp(self):
+        super().setUp()
+        get_counter_store().clear()
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class EmployeeReadAPITests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employees = [make_employee(n) for n in range(5)]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.employees[0])
+
+    def test_list_requires_authentication(self):
+        response = APIClient().get('/api/employees/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_list_is_cursor_paginated_by_id(self):
+        response = self.client.get('/api/employees/', {'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([e['id'] for e in response.data['results']], [e.pk for e in self.employees[:2]])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([e['id'] for e in response.data['results']], [e.pk for e in self.employees[2:4]])
+
+    def test_sparse_fields(self):
+        response = self.client.get('/api/employees/', {'fields': 'id,emp_id'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'emp_id'})
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get('/api/employees/', {'fields': 'id,nope'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_summary_view_skips_heavy_columns(self):
+        response = self.client.get(f'/api/employees/{self.employees[1].pk}/', {'view': 'summary'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('body', response.data)
+        self.assertNotIn('bank_account', response.data)
+        self.assertEqual(response.data['emp_id'], self.employees[1].emp_id)
+
+    def test_payroll_fields_need_the_payroll_permission(self):
+        response = self.client.get(f'/api/employees/{self.employees[1].pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue({'salary', 'bank_name', 'bank_account'}.isdisjoint(response.data))
+        response = self.client.get('/api/employees/')
+        self.assertNotIn('salary', response.data['results'][0])
+        self.assertEqual(self.client.get('/api/employees/', {'fields': 'id,salary'}).status_code, 403)
+
+    def test_payroll_clerk_sees_payroll_fields(self):
+        self.client.get('/api/employees/')
+        clerk = self.employees[2]
+        clerk.user_permissions.add(Permission.objects.get(codename='export_payroll'))
+        permission_cache.clear()
+        self.client.force_authenticate(Employee.objects.get(pk=clerk.pk))
+        response = self.client.get('/api/employees/')
+        self.assertEqual(response.data['results'][1]['bank_account'], self.employees[1].payroll.bank_account)
+        response = self.client.get('/api/employees/', {'fields': 'id,salary'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'salary'})
+
+    def test_sparse_queryset_defers_unselected_columns(self):
+        # The collection stamp is in the cache; only the page is queried.
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/employees/', {'fields': 'id,first_name'})
+        self.assertEqual(len(response.data['results']), 5)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class UserDetailTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = make_employee(1, role='Reception')
+        cls.other = make_employee(2)
+        cls.group = Group.objects.create(name='Reception')
+        cls.group.permissions.add(Permission.objects.get(codename='view_group'))
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.employee)
+
+    def get_profile(self, email=None):
+        response = self.client.get('/api/user-detail/', {'email': email or self.employee.email})
+        self.assertEqual(response.status_code, 200)
+        return response.data[0]['fields']
+
+    def test_profile_shape_matches_frontend(self):
+        fields = self.get_profile()
+        self.assertEqual(fields['role'], 'Reception')
+        self.assertEqual(fields['name'], 'First1 Father1')
+
+    def test_cache_hit_runs_no_queries(self):
+        self.get_profile()
+        with self.assertNumQueries(0):
+            self.get_profile()
+
+    def test_group_change_invalidates_profile(self):
+        self.assertEqual(self.get_profile()['groups'], [])
+        self.employee.groups.add(self.group)
+        fields = self.get_profile()
+        self.assertEqual(fields['groups'], ['Reception'])
+        self.assertEqual(fields['permissions'], ['view_group'])
+
+    def test_group_permission_change_invalidates_members(self):
+        self.employee.groups.add(self.group)
+        self.get_profile()
+        self.group.permissions.clear()
+        self.assertEqual(self.get_profile()['permissions'], [])
+
+    def test_row_change_invalidates_profile(self):
+        self.get_profile()
+        self.employee.role = 'Admin'
+        self.employee.save()
+        self.assertEqual(self.get_profile()['role'], 'Admin')
+
+    def test_other_employees_profile_is_forbidden(self):
+        response = self.client.get('/api/user-detail/', {'email': self.other.email})
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employees = [make_employee(n) for n in range(3)]
+        cls.group = Group.objects.create(name='Nurse')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.employees[0])
+
+    def test_detail_revalidates_without_serializing(self):
+        url = f'/api/employees/{self.employees[1].pk}/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        with self.assertNumQueries(1):
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_detail_etag_follows_side_tables_and_fields(self):
+        url = f'/api/employees/{self.employees[1].pk}/'
+        etag = self.client.get(url)['ETag']
+        self.assertNotEqual(self.client.get(url, {'fields': 'id,region'})['ETag'], etag)
+        profile = EmployeeProfile.objects.get(pk=self.employees[1].pk)
+        profile.region = 'Sidama'
+        profile.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['region'], 'Sidama')
+
+    def test_unchanged_list_is_served_from_the_response_cache(self):
+        response = self.client.get('/api/employees/')
+        with self.assertNumQueries(0):
+            cached = self.client.get('/api/employees/')
+        self.assertEqual(cached.data, response.data)
+        self.assertEqual(self.client.get('/api/employees/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        self.employees[2].groups.add(self.group)
+        response = self.client.get('/api/employees/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][2]['groups'], ['Nurse'])
+
+    def test_collection_is_restamped_when_the_write_commits(self):
+        etag = self.client.get('/api/employees/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.employees[1].first_name = 'Changed'
+                self.employees[1].save()
+                during = self.client.get('/api/employees/')['ETag']
+        after = self.client.get('/api/employees/')
+        self.assertNotEqual(during, etag)
+        self.assertNotEqual(after['ETag'], during)
+        self.assertEqual(after.data['results'][1]['first_name'], 'Changed')
+
+    def test_licence_refresh_changes_the_collection_etag(self):
+        url = '/api/licences/expiring/'
+        etag = self.client.get(url, {'within': 'expired'})['ETag']
+        EmployeeProfile.objects.filter(pk=self.employees[1].pk).update(expired_date=datetime.date(2000, 1, 1))
+        refresh_licence_buckets()
+        response = self.client.get(url, {'within': 'expired'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data['results']], [self.employees[1].pk])
+
+    def test_user_detail_revalidates_from_the_profile_cache(self):
+        etag = self.client.get('/api/user-detail/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/user-detail/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.employees[0].groups.add(self.group)
+        response = self.client.get('/api/user-detail/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.data[0]['fields']['groups'], ['Nurse'])
+
+    @override_settings(CLINIC_HTTP_CACHE={'ENABLED': False})
+    def test_disabled(self):
+        response = self.client.get('/api/employees/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class SerializerQueryCountTests(TestCase):
+    """
+    Serializing any number of employees must cost one query for the rows plus
+    one per prefetched relation. Set ``CLINIC_BENCHMARK_SIZES`` (e.g.
+    ``10,1000,10000``) to change the seeded sizes; timings are logged to the
+    ``clinic.benchmarks`` logger.
+    """
+    SIZES = [int(n) for n in os.environ.get('CLINIC_BENCHMARK_SIZES', '10,1000').split(',')]
+
+    def serialize_all(self, **kwargs):
+        serializer = EmployeeSerializer(**kwargs)
+        queryset = serializer.optimize_queryset(Employee.objects.order_by('id'))
+        return EmployeeSerializer(queryset, many=True, **kwargs).data
+
+    def test_query_count_is_constant(self):
+        seeded = 0
+        for size in self.SIZES:
+            seed_employees(size - seeded, start=seeded)
+            seeded = size
+            with self.subTest(size=size), timed('serialize_employees', size=size):
+                with self.assertNumQueries(3):
+                    data = self.serialize_all()
+                self.assertEqual(len(data), size)
+                self.assertEqual(len(data[0]['groups']), 1)
+
+    def test_sparse_fields_skip_relations(self):
+        seed_employees(10)
+        with self.assertNumQueries(1):
+            self.serialize_all(fields=['id', 'emp_id'])
+
+    def test_relation_validation_is_one_query_per_relation(self):
+        seed_employees(1)
+        codenames = list(Permission.objects.values_list('codename', flat=True)[:20])
+        field = EmployeeSerializer().fields['user_permissions']
+        with self.assertNumQueries(1):
+            permissions = field.to_internal_value(codenames)
+        self.assertEqual([p.codename for p in permissions], codenames)
+
+    def test_unknown_slug_is_rejected(self):
+        serializer = EmployeeSerializer(data={**employee_fields(1), 'password': 'x', 'groups': ['Nope']})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('groups', serializer.errors)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class EmployeeSideTableTests(TestCase):
+    def test_create_user_splits_fields(self):
+        employee = make_employee(1, region='Sidama', salary='9000.00')
+        employee = Employee.objects.get(pk=employee.pk)
+        self.assertFalse(hasattr(employee, 'region'))
+        self.assertEqual(employee.profile.region, 'Sidama')
+        self.assertEqual(str(employee.payroll.salary), '9000.00')
+
+    def test_serializer_keeps_flat_fields(self):
+        serializer = EmployeeSerializer(data={**employee_fields(1), 'password': 'secret-pass-123'})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        employee = serializer.save()
+        data = EmployeeSerializer(Employee.objects.get(pk=employee.pk)).data
+        self.assertEqual((data['region'], data['salary'], data['licence_type']), ('Oromia', '12000.00', 'GP'))
+
+    def test_login_lookup_reads_only_the_employee_table(self):
+        employee = make_employee(1)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(authenticate(email=employee.email, password='secret-pass-123'), employee)
+        self.assertFalse(any('clinic_employeeprofile' in query['sql'] for query in queries))
+
+    def test_side_table_fields_are_joined(self):
+        seed_employees(5)
+        serializer = EmployeeSerializer(fields=['id', 'region', 'salary'])
+        with self.assertNumQueries(1):
+            data = EmployeeSerializer(
+                serializer.optimize_queryset(Employee.objects.order_by('id')), many=True, fields=['id', 'region', 'salary'],
+            ).data
+        self.assertEqual(data[1]['region'], employee_fields(1)['region'])
+
+    def test_bulk_create_fills_side_tables(self):
+        employees = Employee.objects.bulk_create_employees(
+            {**employee_fields(n), 'password': make_password(None)} for n in range(3)
+        )
+        self.assertEqual(EmployeeProfile.objects.filter(employee__in=employees).count(), 3)
+        self.assertEqual(EmployeePayroll.objects.filter(employee__in=employees).count(), 3)
+        self.assertEqual(employees[0].search_name, 'first0 father0 grand0')
+
+
+def employee_rows(numbers, **overrides):
+    rows = []
+    for n in numbers:
+        row = {key: str(value) for key, value in employee_fields(n, **overrides).items()}
+        row['password'] = 'import-pass-123'
+        rows.append(row)
+    return rows
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, CLINIC_IMPORT_WORKERS=1)
+class EmployeeImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_employee(0, is_superuser=True)
+        Group.objects.create(name='Doctor')
+
+    def upload_csv(self, rows, **data):
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+        upload = SimpleUploadedFile('staff.csv', buffer.getvalue().encode(), content_type='text/csv')
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        return client.post('/api/employees/import/', {'file': upload, **data}, format='multipart')
+
+    def test_csv_import_reports_bad_rows(self):
+        rows = employee_rows(range(1, 6))
+        rows[1]['salary'] = 'lots'
+        rows[3]['email'] = rows[2]['email']
+        for row in rows:
+            row['groups'] = 'Doctor'
+        response = self.upload_csv(rows, chunk_size=2)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual([e['row'] for e in response.data['errors']], [3, 5])
+        imported = Employee.objects.get(email=rows[0]['email'])
+        self.assertTrue(imported.check_password('import-pass-123'))
+        self.assertEqual([g.name for g in imported.groups.all()], ['Doctor'])
+
+    @override_settings(CLINIC_IMPORT_WORKERS=3)
+    def test_uploads_share_one_process_pool(self):
+        with mock.patch('clinic.importers._hashing_processes', wraps=_hashing_processes) as start:
+            for first in (1, 2):
+                response = self.upload_csv(employee_rows([first * 10]))
+                self.assertEqual(response.status_code, 201)
+        self.assertEqual(start.call_count, 1)
+        self.assertIs(get_import_pool(), get_import_pool())
+        self.assertTrue(Employee.objects.get(emp_id='EMP0000020').check_password('import-pass-123'))
+
+    def test_existing_employee_is_rejected(self):
+        response = self.upload_csv(employee_rows([0]))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.data['errors'][0]['errors'])
+
+    def test_import_requires_superuser(self):
+        client = APIClient()
+        client.force_authenticate(make_employee(9))
+        response = client.post('/api/employees/import/', {}, format='multipart')
+        self.assertEqual(response.status_code, 403)
+
+    def test_command_imports_ndjson_with_process_pool(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as handle:
+            for row in employee_rows(range(10, 14)):
+                handle.write(json.dumps(row) + '\n')
+            handle.write('{broken\n')
+        self.addCleanup(os.unlink, handle.name)
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_employees', handle.name, workers=2, chunk_size=3, stdout=out, stderr=err)
+        self.assertIn('Created 4 employees, 1 rows failed.', out.getvalue())
+        self.assertTrue(Employee.objects.get(emp_id='EMP0000012').check_password('import-pass-123'))
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class AsyncAuthViewTests(ClearRateLimitsMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = make_employee(1)
+
+    async def test_login(self):
+        response = await AsyncClient().post(
+            '/api/async/login/', {'email': self.employee.email, 'password': 'secret-pass-123'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.json())
+        self.assertEqual(response.json()['employee']['emp_id'], self.employee.emp_id)
+
+    async def test_login_rejects_bad_password(self):
+        response = await AsyncClient().post(
+            '/api/async/login/', {'email': self.employee.email, 'password': 'wrong'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(
+        PASSWORD_HASHERS=FAST_HASHERS + ['clinic.hashers.ProfiledPBKDF2PasswordHasher'],
+        CLINIC_PASSWORD_HASH_PROFILES={'standard': 1000},
+    )
+    async def test_outdated_hash_is_upgraded_off_the_pool(self):
+        await Employee.objects.filter(pk=self.employee.pk).aupdate(
+            password=make_password('secret-pass-123', hasher='pbkdf2_sha256'),
+        )
+        pool = get_hashing_pool()
+        hashed = []
+
+        class RecordingPool:
+            async def run(self, function, *args):
+                hashed.append(function)
+                return await pool.run(function, *args)
+
+        with mock.patch('clinic.async_views.get_hashing_pool', RecordingPool):
+            response = await AsyncClient().post(
+                '/api/async/login/', {'email': self.employee.email, 'password': 'secret-pass-123'},
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        # Only pure hashing runs on pool threads; the save happened elsewhere.
+        self.assertEqual(hashed, [verify_password, make_password])
+        employee = await Employee.objects.aget(pk=self.employee.pk)
+        self.assertTrue(employee.password.startswith('md5$'))
+
+    async def test_register(self):
+        data = {**employee_rows([2])[0], 'password': 'new-pass-123'}
+        response = await AsyncClient().post('/api/async/register/', data, content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+        employee = await Employee.objects.aget(email=data['email'])
+        self.assertTrue(employee.check_password('new-pass-123'))
+
+    async def test_password_reset_confirm(self):
+        uid = urlsafe_base64_encode(force_bytes(self.employee.pk))
+        token = default_token_generator.make_token(self.employee)
+        response = await AsyncClient().post(
+            f'/api/async/reset/{uid}/{token}/', {'new_password': 'changed-123'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        employee = await Employee.objects.aget(pk=self.employee.pk)
+        self.assertTrue(employee.check_password('changed-123'))
+
+    async def test_concurrent_logins_are_not_serialised(self):
+        # Each login waits in the hashing step until both have arrived; a
+        # sync-only middleware would run the chain one request at a time
+        # and the first would time out.
+        arrived = []
+        both = asyncio.Event()
+
+        class Rendezvous:
+            async def run(self, function, *args):
+                arrived.append(function)
+                if len(arrived) == 2:
+                    both.set()
+                await asyncio.wait_for(both.wait(), timeout=5)
+                return function(*args)
+
+        registry.clear()
+        self.addCleanup(registry.clear)
+        client = AsyncClient()
+        payload = {'email': self.employee.email, 'password': 'secret-pass-123'}
+        with mock.patch('clinic.async_views.get_hashing_pool', Rendezvous):
+            responses = await asyncio.gather(*(
+                client.post('/api/async/login/', payload, content_type='application/json') for _ in range(2)
+            ))
+        self.assertEqual([response.status_code for response in responses], [200, 200])
+        queries = registry.histogram('clinic_request_db_queries', view='AsyncLoginView', method='POST')
+        self.assertEqual(queries.count, 2)
+        self.assertGreaterEqual(queries.sum, 2)
+
+
+class HashingPoolTests(SimpleTestCase):
+    def test_rejects_work_beyond_queue_limit(self):
+        pool = HashingPool(workers=1, max_queue=0)
+        self.addCleanup(pool.shutdown)
+        release = threading.Event()
+        future = pool.submit(release.wait)
+        with self.assertRaises(HashingPoolSaturated):
+            pool.submit(make_password, 'x')
+        release.set()
+        future.result()
+        stats = pool.stats()
+        self.assertEqual((stats['completed'], stats['rejected'], stats['in_flight']), (1, 1, 0))
+
+    @override_settings(CLINIC_PASSWORD_HASH_PROFILES={'standard': None, 'tiny': 1000}, CLINIC_PASSWORD_HASH_PROFILE='tiny')
+    def test_hasher_follows_cost_profile(self):
+        hasher = ProfiledPBKDF2PasswordHasher()
+        encoded = hasher.encode('pw', hasher.salt())
+        self.assertEqual(hasher.decode(encoded)['iterations'], 1000)
+        self.assertTrue(hasher.verify('pw', encoded))
+
+    @override_settings(CLINIC_PASSWORD_HASH_PROFILES={'standard': 2000, 'tiny': 1000})
+    def test_hasher_upgrades_but_never_downgrades(self):
+        hasher = ProfiledPBKDF2PasswordHasher()
+        stronger = hasher.encode('pw', hasher.salt(), 2000)
+        with self.settings(CLINIC_PASSWORD_HASH_PROFILE='tiny'):
+            self.assertFalse(hasher.must_update(stronger))
+            weaker = hasher.encode('pw', hasher.salt())
+        self.assertTrue(hasher.must_update(weaker))
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionRefusedError('SMTP server unavailable')
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class MailQueueTests(ClearRateLimitsMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = make_employee(1)
+
+    def request_reset(self):
+        response = APIClient().post('/api/password/reset/', {'email': self.employee.email})
+        self.assertEqual(response.status_code, 200)
+
+    def test_reset_request_only_enqueues(self):
+        self.request_reset()
+        self.assertEqual(len(mail.outbox), 0)
+        queued = OutboundEmail.objects.get()
+        self.assertEqual(queued.recipients, [self.employee.email])
+        self.assertIn('/api/reset/', queued.body)
+
+    def test_worker_sends_due_mail(self):
+        self.request_reset()
+        self.request_reset()
+        call_command('run_mail_worker', once=True, stdout=io.StringIO())
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.STATUS_SENT).count(), 2)
+        self.assertIn('/api/reset/', mail.outbox[0].body)
+        # The reset link went out; the queue keeps no copy of it.
+        self.assertEqual(set(OutboundEmail.objects.values_list('body', flat=True)), {''})
+
+    @override_settings(EMAIL_BACKEND='clinic.tests.FailingEmailBackend')
+    def test_failures_back_off_then_give_up(self):
+        self.request_reset()
+        with self.assertLogs('clinic.mail', 'WARNING'):
+            self._fail_until_given_up()
+
+    def _fail_until_given_up(self):
+        self.assertEqual(process_mail_queue(max_attempts=2), {'sent': 0, 'retried': 1, 'failed': 0})
+        queued = OutboundEmail.objects.get()
+        self.assertGreater(queued.next_attempt_at, queued.created_at)
+        self.assertIn('unavailable', queued.last_error)
+        # Not due again until the backoff elapses.
+        self.assertEqual(process_mail_queue(max_attempts=2), {'sent': 0, 'retried': 0, 'failed': 0})
+        OutboundEmail.objects.update(next_attempt_at=queued.created_at)
+        self.assertEqual(process_mail_queue(max_attempts=2), {'sent': 0, 'retried': 0, 'failed': 1})
+        self.assertEqual(OutboundEmail.objects.get().status, OutboundEmail.STATUS_FAILED)
+        self.assertEqual(OutboundEmail.objects.get().body, '')
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class CachedJWTAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = make_employee(1)
+
+    def setUp(self):
+        cache.clear()
+        user_cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.employee)}')
+
+    def test_repeat_requests_skip_the_user_lookup(self):
+        self.client.get('/api/user-detail/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/user-detail/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_saving_the_employee_evicts_the_cached_user(self):
+        self.client.get('/api/user-detail/')
+        self.employee.role = 'Pharmacy'
+        self.employee.save()
+        self.assertEqual(user_cache.load(self.employee.pk).role, 'Pharmacy')
+
+    def test_deleted_employee_is_rejected(self):
+        self.client.get('/api/user-detail/')
+        self.employee.delete()
+        self.assertEqual(self.client.get('/api/user-detail/').status_code, 401)
+
+    def test_lru_evicts_oldest_entry(self):
+        other = make_employee(2)
+        users = UserCache(max_size=1)
+        users.load(self.employee.pk)
+        users.load(other.pk)
+        self.assertIsNone(users.get(self.employee.pk))
+        self.assertEqual(users.get(other.pk).pk, other.pk)
+
+    def test_sizes_follow_settings_unless_given(self):
+        self.assertEqual((user_cache.max_size, user_cache.ttl), (1024, 60))
+        with override_settings(CLINIC_AUTH_USER_CACHE={'TTL': 5}):
+            self.assertEqual((user_cache.max_size, user_cache.ttl), (1024, 5))
+            self.assertEqual(UserCache(ttl=30).ttl, 30)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class TokenRotationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = make_employee(1)
+
+    def setUp(self):
+        revocation_store.clear_local()
+        self.refresh = str(RefreshToken.for_user(self.employee))
+
+    def post_refresh(self, token):
+        return APIClient().post('/api/token/refresh/', {'refresh': token})
+
+    def test_refresh_rotates_and_revokes_the_old_token(self):
+        response = self.post_refresh(self.refresh)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.data['refresh'], self.refresh)
+        self.assertEqual(self.post_refresh(self.refresh).status_code, 401)
+        self.assertEqual(self.post_refresh(response.data['refresh']).status_code, 200)
+
+    def test_revoked_token_is_rejected_from_the_database(self):
+        APIClient().post('/api/token/revoke/', {'refresh': self.refresh})
+        revocation_store.clear_local()
+        self.assertEqual(self.post_refresh(self.refresh).status_code, 401)
+
+    def test_garbage_token_is_unauthorized(self):
+        self.assertEqual(self.post_refresh('not-a-token').status_code, 401)
+
+    def test_expired_rows_are_purged(self):
+        past = datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc)
+        RevokedToken.objects.bulk_create([RevokedToken(jti=f'old-{n}', expires_at=past) for n in range(3)])
+        self.post_refresh(self.refresh)
+        self.assertEqual(list(RevokedToken.objects.values_list('pk', flat=True)), [RefreshToken(self.refresh)['jti']])
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class EmployeeSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.abebe = make_employee(1, first_name='Abebe', father_name='Kebede', region='Amhara', role='Doctor')
+        cls.almaz = make_employee(2, first_name='Almaz', father_name='Abebe', region='Oromia', role='Lab')
+        cls.sara = make_employee(3, first_name='Sara', father_name='Tesfaye', region='Oromia', role='Pharmacy')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.sara)
+
+    def search(self, **params):
+        response = self.client.get('/api/employees/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_prefix_search_matches_any_name_part(self):
+        self.assertEqual(self.search(q='abe'), [self.abebe.pk, self.almaz.pk])
+
+    def test_search_combines_terms_and_filters(self):
+        self.assertEqual(self.search(q='abe', region='Oromia'), [self.almaz.pk])
+        self.assertEqual(self.search(q='abe oromia'), [self.almaz.pk])
+        self.assertEqual(self.search(role='Pharmacy'), [self.sara.pk])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.sara.first_name = 'Selam'
+        self.sara.save()
+        self.assertEqual(self.search(q='selam'), [self.sara.pk])
+        self.assertEqual(self.search(q='sara'), [])
+        self.abebe.delete()
+        self.assertEqual(self.search(q='kebede'), [])
+
+    def test_autocomplete(self):
+        response = self.client.get('/api/employees/autocomplete/', {'q': 'Al'})
+        self.assertEqual([row['id'] for row in response.data], [self.almaz.pk])
+
+    def test_quotes_in_query_are_escaped(self):
+        self.assertEqual(self.search(q='"abe'), [self.abebe.pk, self.almaz.pk])
+
+    @override_settings(CLINIC_SEARCH_BACKEND='clinic.search.DatabaseSearchBackend')
+    def test_database_backend(self):
+        self.assertEqual(self.search(q='abebe'), [self.abebe.pk, self.almaz.pk])
+        self.assertEqual(
+            list(DatabaseSearchBackend().autocomplete('almaz ab')), [self.almaz],
+        )
+
+    @override_settings(CLINIC_SEARCH_BACKEND='clinic.search.DatabaseSearchBackend')
+    def test_database_backend_matches_name_part_prefixes(self):
+        self.assertEqual(self.search(q='keb'), [self.abebe.pk])
+        self.assertEqual(self.search(q='grand'), [self.abebe.pk, self.almaz.pk, self.sara.pk])
+        self.assertEqual(self.search(q='ebe'), [])
+
+    def test_saves_of_unindexed_columns_skip_the_index(self):
+        backend = get_search_backend()
+        with mock.patch.object(backend, 'index') as index:
+            self.sara.save(update_fields=['last_login'])
+            self.sara.profile.save(update_fields=['licence_bucket'])
+            index.assert_not_called()
+            self.sara.save(update_fields=['father_name'])
+            self.sara.profile.save(update_fields=['region'])
+            self.assertEqual(index.call_count, 2)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class LicenceExpiryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.localdate()
+        cls.employees = [
+            make_employee(n, expired_date=today + datetime.timedelta(days=days))
+            for n, days in enumerate((-1, 3, 20, 60, 200))
+        ]
+
+    def test_buckets_are_set_on_save(self):
+        self.assertEqual(
+            [e.profile.licence_bucket for e in self.employees],
+            ['expired', '7_days', '30_days', '90_days', 'valid'],
+        )
+        self.assertEqual(
+            licence_report(),
+            {'expired': 1, 'within_7_days': 1, 'within_30_days': 2, 'within_90_days': 3, 'valid': 1},
+        )
+
+    def test_refresh_moves_only_rows_crossing_a_boundary(self):
+        later = timezone.localdate() + datetime.timedelta(days=25)
+        moved = refresh_licence_buckets(today=later)
+        self.assertEqual(moved, {'expired': 2, '7_days': 0, '30_days': 0, '90_days': 0, 'valid': 0})
+        self.assertEqual(refresh_licence_buckets(today=later), dict.fromkeys(moved, 0))
+
+    def test_refresh_only_scans_ranges_crossed_since_the_last_run(self):
+        today = timezone.localdate()
+        refresh_licence_buckets(today=today)
+        # Out of step on purpose: a raw update far from any boundary.
+        EmployeeProfile.objects.filter(pk=self.employees[4].pk).update(expired_date=today - datetime.timedelta(days=500))
+        moved = refresh_licence_buckets(today=today + datetime.timedelta(days=5))
+        self.assertEqual(moved, {'expired': 1, '7_days': 0, '30_days': 0, '90_days': 0, 'valid': 0})
+        self.assertEqual(licence_report()['within_7_days'], 0)
+        moved = refresh_licence_buckets(today=today + datetime.timedelta(days=5), full=True)
+        self.assertEqual(moved['expired'], 1)
+        self.assertEqual(licence_report()['expired'], 3)
+
+    def test_report_counts_follow_saves_deletes_and_imports(self):
+        profile = self.employees[4].profile
+        profile.expired_date = timezone.localdate()
+        profile.save()
+        self.employees[0].delete()
+        make_employee(7, expired_date=timezone.localdate() + datetime.timedelta(days=40))
+        with self.assertNumQueries(1):
+            report = licence_report()
+        self.assertEqual(
+            report, {'expired': 0, 'within_7_days': 2, 'within_30_days': 3, 'within_90_days': 5, 'valid': 0},
+        )
+
+    def test_reminders_are_queued_once_per_bucket(self):
+        self.assertEqual(notify_licence_holders(), {'30_days': 1, '7_days': 1, 'expired': 1})
+        self.assertEqual(OutboundEmail.objects.count(), 3)
+        self.assertEqual(notify_licence_holders(), {'30_days': 0, '7_days': 0, 'expired': 0})
+
+    def test_renewal_resets_reminders(self):
+        notify_licence_holders()
+        expired = self.employees[0].profile
+        expired.expired_date = timezone.localdate() + datetime.timedelta(days=400)
+        expired.save()
+        expired.refresh_from_db()
+        self.assertEqual((expired.licence_bucket, expired.licence_notified_bucket), ('valid', ''))
+
+    def test_expiring_list(self):
+        client = APIClient()
+        client.force_authenticate(self.employees[0])
+        response = client.get('/api/licences/expiring/', {'within': '30'})
+        self.assertEqual([row['id'] for row in response.data['results']], [e.pk for e in self.employees[1:3]])
+        self.assertEqual(client.get('/api/licences/expiring/', {'within': '5'}).status_code, 400)
+        self.assertEqual(client.get('/api/licences/report/').data['expired'], 1)
+
+
+def png_bytes(size=(400, 300), color='navy'):
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class TemporaryMediaMixin:
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        override = override_settings(MEDIA_ROOT=media_root.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class ChunkedUploadTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = make_employee(1)
+        cls.other = make_employee(2)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.employee)
+
+    def start(self, content, kind='image', filename='photo.png', employee=None):
+        response = self.client.post('/api/uploads/', {
+            'employee': (employee or self.employee).pk, 'kind': kind,
+            'filename': filename, 'total_size': len(content),
+        })
+        return response
+
+    def send(self, upload_id, content, start, end):
+        return self.client.put(
+            f'/api/uploads/{upload_id}/', content[start:end + 1], content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{len(content)}',
+        )
+
+    def upload(self, content, chunk=1000, **kwargs):
+        upload_id = self.start(content, **kwargs).data['id']
+        for start in range(0, len(content), chunk):
+            response = self.send(upload_id, content, start, min(start + chunk, len(content)) - 1)
+            self.assertEqual(response.status_code, 200, response.data)
+        return response
+
+    def test_chunked_upload_attaches_image(self):
+        content = png_bytes()
+        response = self.upload(content)
+        self.assertIsNotNone(response.data['completed_at'])
+        self.employee.refresh_from_db()
+        blob = MediaBlob.objects.get()
+        self.assertEqual(self.employee.profile.image.name, blob.file.name)
+        self.assertEqual(blob.size, len(content))
+        self.assertEqual(blob.thumbnail_status, MediaBlob.THUMBNAIL_PENDING)
+
+    def test_resume_after_gap_reports_offset(self):
+        content = png_bytes()
+        upload_id = self.start(content).data['id']
+        self.send(upload_id, content, 0, 499)
+        response = self.send(upload_id, content, 1000, 1499)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.client.get(f'/api/uploads/{upload_id}/').data['received'], 500)
+        # Re-sending an already received chunk is also refused, not duplicated.
+        self.assertEqual(self.send(upload_id, content, 0, 499).status_code, 409)
+
+    def test_identical_content_is_stored_once(self):
+        content = png_bytes()
+        self.upload(content)
+        self.client.force_authenticate(self.other)
+        self.upload(content, employee=self.other, filename='copy.png')
+        self.assertEqual(MediaBlob.objects.count(), 1)
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.profile.image.name, MediaBlob.objects.get().file.name)
+
+    def test_rejects_oversized_and_foreign_uploads(self):
+        with override_settings(CLINIC_UPLOADS={'MAX_BYTES': {'image': 10, 'pdf': 10}}):
+            self.assertEqual(self.start(png_bytes()).status_code, 400)
+        self.assertEqual(self.start(png_bytes(), employee=self.other).status_code, 403)
+
+    def test_rejects_content_of_the_wrong_kind(self):
+        content = b'not a pdf at all'
+        upload_id = self.start(content, kind='pdf', filename='licence.pdf').data['id']
+        response = self.send(upload_id, content, 0, len(content) - 1)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_employee_without_a_profile(self):
+        content = png_bytes()
+        EmployeeProfile.objects.filter(pk=self.other.pk).delete()
+        self.client.force_authenticate(Employee.objects.get(pk=self.other.pk))
+        response = self.start(content, employee=self.other)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('employee', response.data)
+
+        # A profile deleted mid-upload fails the last chunk cleanly instead of
+        # leaving a fully received session that can never complete.
+        self.client.force_authenticate(self.employee)
+        upload_id = self.start(content).data['id']
+        self.send(upload_id, content, 0, 499)
+        EmployeeProfile.objects.filter(pk=self.employee.pk).delete()
+        response = self.send(upload_id, content, 500, len(content) - 1)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertEqual(list(Path(settings.MEDIA_ROOT, '.uploads').glob('*.part')), [])
+
+    def test_spool_file_is_removed_after_commit(self):
+        content = png_bytes()
+        upload_id = self.start(content).data['id']
+        spool = Path(settings.MEDIA_ROOT, '.uploads', f'{upload_id}.part')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.send(upload_id, content, 0, len(content) - 1)
+            self.assertTrue(spool.exists())
+        self.assertFalse(spool.exists())
+
+    def test_thumbnail_worker(self):
+        self.upload(png_bytes(size=(1200, 900)))
+        self.assertEqual(process_thumbnail_queue(), (1, 0))
+        self.employee.refresh_from_db()
+        from PIL import Image
+        with Image.open(self.employee.profile.image_thumbnail.path) as thumbnail:
+            self.assertLessEqual(max(thumbnail.size), 160)
+        self.assertEqual(process_thumbnail_queue(), (0, 0))
+
+
+class DatabaseProfileTests(SimpleTestCase):
+    def apply_pragmas(self, config):
+        import sqlite3
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        connection = sqlite3.connect(os.path.join(directory.name, 'db.sqlite3'))
+        self.addCleanup(connection.close)
+        for pragma in config['OPTIONS']['init_command'].split(';'):
+            connection.execute(pragma)
+        return connection
+
+    def test_sqlite_profile_applies_pragmas_on_connect(self):
+        config = database_profile('sqlite', ':memory:', env={})
+        self.assertEqual(config['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        connection = self.apply_pragmas(config)
+        self.assertEqual(connection.execute('PRAGMA journal_mode').fetchone()[0], 'delete')
+        self.assertEqual(connection.execute('PRAGMA busy_timeout').fetchone()[0], 5000)
+
+    def test_sqlite_wal_is_opt_in(self):
+        connection = self.apply_pragmas(database_profile('sqlite', ':memory:', env={'CLINIC_DB_WAL': '1'}))
+        self.assertEqual(connection.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+        self.assertEqual(connection.execute('PRAGMA synchronous').fetchone()[0], 1)
+
+    def test_postgres_pool_disables_persistent_connections(self):
+        config = database_profile('postgres', None, env={'CLINIC_DB_CONN_MAX_AGE': '300'})
+        self.assertEqual(config['CONN_MAX_AGE'], 300)
+        self.assertNotIn('pool', config['OPTIONS'])
+        config = database_profile('postgres', None, env={'CLINIC_DB_POOL': '1', 'CLINIC_DB_POOL_MAX': '20'})
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertEqual(config['OPTIONS']['pool']['max_size'], 20)
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ImproperlyConfigured):
+            database_profile('oracle', None, env={})
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class EmployeeMediaServingTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.employee = make_employee(1)
+        profile = self.employee.profile
+        profile.image = SimpleUploadedFile('photo.png', png_bytes())
+        profile.pdf = SimpleUploadedFile('licence.pdf', b'%PDF-1.4 ' + bytes(range(256)) * 4)
+        profile.save()
+        self.client = APIClient()
+        self.client.force_authenticate(self.employee)
+
+    def url(self, kind):
+        return f'/api/employees/{self.employee.pk}/media/{kind}/'
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_requires_authentication(self):
+        self.assertEqual(APIClient().get(self.url('pdf')).status_code, 401)
+
+    def test_documents_are_limited_to_the_owner_and_permission_holders(self):
+        colleague = make_employee(2)
+        client = APIClient()
+        client.force_authenticate(colleague)
+        self.assertEqual(client.get(self.url('pdf')).status_code, 403)
+        self.assertEqual(client.get(self.url('image')).status_code, 403)
+        self.assertEqual(client.get(self.url('image'), {'size': 64}).status_code, 200)
+
+        colleague.user_permissions.add(Permission.objects.get(codename='view_employee_documents'))
+        permission_cache.clear()
+        client.force_authenticate(Employee.objects.get(pk=colleague.pk))
+        self.assertEqual(client.get(self.url('pdf')).status_code, 200)
+        self.assertEqual(client.get(self.url('image')).status_code, 200)
+
+    def test_revalidation_returns_not_modified(self):
+        response = self.client.get(self.url('pdf'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(self.body(response), open(self.employee.profile.pdf.path, 'rb').read())
+        response = self.client.get(self.url('pdf'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_byte_ranges(self):
+        content = open(self.employee.profile.pdf.path, 'rb').read()
+        response = self.client.get(self.url('pdf'), HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(content)}')
+        self.assertEqual(self.body(response), content[10:20])
+        response = self.client.get(self.url('pdf'), HTTP_RANGE='bytes=-5')
+        self.assertEqual(self.body(response), content[-5:])
+        response = self.client.get(self.url('pdf'), HTTP_RANGE='bytes=0-3', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.url('pdf'), HTTP_RANGE=f'bytes={len(content)}-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=0-', 10), (0, 9))
+        self.assertEqual(parse_range('bytes=5-100', 10), (5, 9))
+        self.assertIsNone(parse_range('bytes=0-1,4-5', 10))
+        self.assertIs(parse_range('bytes=-0', 10), False)
+
+    def test_resized_images_are_cached(self):
+        response = self.client.get(self.url('image'), {'size': 64})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        from PIL import Image
+        with Image.open(io.BytesIO(self.body(response))) as image:
+            self.assertLessEqual(max(image.size), 64)
+        cached = list(Path(settings.MEDIA_ROOT, '.resized').glob('64/*.jpg'))
+        self.assertEqual(len(cached), 1)
+        self.assertEqual(self.client.get(self.url('image'), {'size': 64}, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(self.url('image'), {'size': 65}).status_code, 400)
+        self.assertEqual(self.client.get(self.url('thumbnail')).status_code, 404)
+
+    def test_cache_evicts_least_recently_used(self):
+        directory = tempfile.mkdtemp(dir=settings.MEDIA_ROOT)
+        source = self.employee.profile.image.path
+        probe = ResizedImageCache(directory, max_bytes=10 ** 9)
+        entry_size = os.path.getsize(probe.get(source, '"a"', 128))
+        resized = ResizedImageCache(directory, max_bytes=entry_size * 2)
+        first = resized.get(source, '"a"', 128)
+        os.utime(first, ns=(0, 0))
+        second = resized.get(source, '"b"', 128)
+        resized.get(source, '"c"', 128)
+        self.assertFalse(first.exists())
+        self.assertTrue(second.exists())
+
+    def test_cache_walks_the_directory_only_when_over_budget(self):
+        source = self.employee.profile.image.path
+        with override_settings(CLINIC_MEDIA={'RESIZE_CACHE_DIR': tempfile.mkdtemp(dir=settings.MEDIA_ROOT)}):
+            resized = resized_image_cache()
+            self.assertIs(resized_image_cache(), resized)
+            with mock.patch.object(ResizedImageCache, '_entries', autospec=True, side_effect=lambda cache: iter(())) as walk:
+                for etag in ('"a"', '"b"', '"c"'):
+                    resized.get(source, etag, 64)
+            # Counted once on the first write, then kept as a running total.
+            self.assertEqual(walk.call_count, 1)
+            resized.max_bytes = 0
+            resized.get(source, '"d"', 64)
+            self.assertEqual(list(resized.directory.glob('*/*.jpg')), [])
+
+
+@override_settings(
+    PASSWORD_HASHERS=['clinic.hashers.ProfiledPBKDF2PasswordHasher'],
+    CLINIC_PASSWORD_HASH_PROFILES={'standard': 1000},
+)
+class PerformanceMiddlewareTests(ClearRateLimitsMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = make_employee(1)
+
+    def setUp(self):
+        super().setUp()
+        registry.clear()
+        self.addCleanup(registry.clear)
+
+    def login(self):
+        return self.client.post('/api/login/', {'email': self.employee.email, 'password': 'secret-pass-123'})
+
+    def test_records_per_view_telemetry(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", hash;dur=[\d.]+, total;dur=[\d.]+$')
+        latency = registry.histogram('clinic_request_duration_seconds', view='LoginView', method='POST')
+        self.assertEqual(latency.count, 1)
+        self.assertGreaterEqual(registry.histogram('clinic_request_db_queries', view='LoginView', method='POST').sum, 1)
+        self.assertGreater(registry.counter('clinic_request_hash_seconds_total', view='LoginView', method='POST'), 0)
+        self.assertEqual(registry.counter('clinic_responses_total', view='LoginView', method='POST', status=200), 1)
+        self.assertEqual(
+            registry.histogram('clinic_response_size_bytes', view='LoginView', method='POST').sum, len(response.content),
+        )
+
+    def test_metrics_endpoint(self):
+        self.login()
+        completed = get_hashing_pool().stats()['completed']
+        get_hashing_pool().submit(make_password, 'secret').result()
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('# TYPE clinic_request_duration_seconds histogram', body)
+        self.assertIn('clinic_request_duration_seconds_bucket{method="POST",view="LoginView",le="+Inf"} 1', body)
+        self.assertIn('clinic_responses_total{method="POST",status="200",view="LoginView"} 1', body)
+        self.assertIn('# TYPE clinic_hashing_pool_rejected_total counter', body)
+        self.assertIn(f'clinic_hashing_pool_completed_total {completed + 1}', body)
+        self.assertIn('clinic_hashing_pool_in_flight 0', body)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.1.2.3').status_code, 403)
+
+    def test_sampling_and_disabling(self):
+        with override_settings(CLINIC_METRICS={'SAMPLE_RATE': 0.0}):
+            self.assertNotIn('Server-Timing', self.client_class().post('/api/login/', {}))
+        with override_settings(CLINIC_METRICS={'ENABLED': False}):
+            self.assertNotIn('Server-Timing', self.client_class().post('/api/login/', {}))
+        self.assertIsNone(registry.histogram('clinic_request_duration_seconds', view='LoginView', method='POST'))
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class LoadSuiteTests(ClearRateLimitsMixin, TestCase):
+    def test_latency_summary(self):
+        summary = latency_summary([i / 1000 for i in range(1, 101)], seconds=2)
+        self.assertAlmostEqual(summary['p50_ms'], 50.5)
+        self.assertAlmostEqual(summary['p99_ms'], 99.01)
+        self.assertEqual(summary['requests_per_second'], 50)
+
+    def test_baseline_comparison_flags_regressions_only(self):
+        baseline = [
+            {'name': 'load', 'scenario': 'login', 'p95_ms': 10.0, 'requests_per_second': 100.0},
+            {'name': 'load', 'scenario': 'token', 'p95_ms': 10.0, 'requests_per_second': 100.0},
+        ]
+        results = [
+            {'name': 'load', 'scenario': 'login', 'p95_ms': 14.0, 'requests_per_second': 120.0, 'seconds': 1},
+            {'name': 'load', 'scenario': 'token', 'p95_ms': 8.0, 'requests_per_second': 70.0, 'seconds': 1},
+            {'name': 'load', 'scenario': 'register', 'p95_ms': 99.0, 'requests_per_second': 1.0, 'seconds': 1},
+        ]
+        regressions = compare_to_baseline(results, baseline, tolerance=0.25)
+        self.assertEqual(len(regressions), 2)
+        self.assertIn('scenario=login: p95_ms', regressions[0])
+        self.assertIn('scenario=token: requests_per_second', regressions[1])
+
+    def test_scenarios_succeed_through_both_handlers(self):
+        seed_employees(4)
+        numbers = iter(range(100, 200))
+        for runner in (run_wsgi, run_asgi):
+            employees = list(Employee.objects.order_by('pk')[:4])
+            for scenario, calls in load_scenarios(employees, 2, numbers).items():
+                latencies, failures = runner(calls, 1)
+                self.assertEqual((len(latencies), failures), (2, 0), scenario)
+
+
+@override_settings(
+    PASSWORD_HASHERS=FAST_HASHERS,
+    CLINIC_RATE_LIMITS={
+        'RATES': {'login_ip': '100/min', 'login_email': '5/min', 'password_reset_ip': '2/hour'},
+        'LOCKOUT': {'FAILURES': 3, 'BASE_SECONDS': 60},
+    },
+)
+class RateLimitTests(ClearRateLimitsMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = make_employee(1)
+
+    def login(self, password='secret-pass-123', url='/api/login/', **extra):
+        return self.client.post(url, {'email': self.employee.email, 'password': password}, **extra)
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('10/min'), (10, 60))
+        self.assertEqual(parse_rate('100/5m'), (100, 300))
+        self.assertIsNone(parse_rate(None))
+        with self.assertRaises(ValueError):
+            parse_rate('ten a minute')
+
+    def test_sliding_window_weights_previous_window(self):
+        store = MemoryCounterStore()
+        for _ in range(10):
+            self.assertTrue(hit('k', 10, 60, store=store, now=30)[0])
+        self.assertEqual(hit('k', 10, 60, store=store, now=59), (False, 1))
+        # A quarter into the next window, 3/4 of the previous 11 still count.
+        self.assertEqual(hit('k', 10, 60, store=store, now=75)[0], True)
+        allowed, retry_after = hit('k', 10, 60, store=store, now=75)
+        self.assertFalse(allowed)
+        self.assertGreater(retry_after, 1)
+
+    def test_cache_store(self):
+        store = CacheCounterStore(prefix='test-rl')
+        self.addCleanup(cache.clear)
+        self.assertEqual([store.incr('a', 60) for _ in range(3)], [1, 2, 3])
+        self.assertEqual(store.get_many(['a', 'b']), {'a': 3})
+        store.delete('a')
+        self.assertIsNone(store.get('a'))
+
+    def test_rejects_before_touching_the_database(self):
+        for _ in range(5):
+            self.assertEqual(self.login().status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+    @override_settings(CLINIC_RATE_LIMITS={'RATES': {'login_ip': '3/min'}})
+    def test_forwarded_for_cannot_dodge_the_address_limit(self):
+        statuses = [
+            self.login('wrong', HTTP_X_FORWARDED_FOR=f'10.0.0.{n}').status_code for n in range(4)
+        ]
+        self.assertEqual(statuses, [401, 401, 401, 429])
+
+    def test_client_ip_trusts_only_configured_proxies(self):
+        request = RequestFactory().get('/', REMOTE_ADDR='10.0.0.9', HTTP_X_FORWARDED_FOR='6.6.6.6, 203.0.113.7')
+        self.assertEqual(client_ip(request), '10.0.0.9')
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}):
+            self.assertEqual(client_ip(request), '203.0.113.7')
+
+    def test_lockout_after_repeated_failures(self):
+        for _ in range(3):
+            self.assertEqual(self.login('wrong', url='/api/token/').status_code, 401)
+        response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(int(response['Retry-After']), 60)
+        self.assertEqual(self.client.post('/api/async/login/', {
+            'email': self.employee.email, 'password': 'secret-pass-123',
+        }).status_code, 429)
+
+    def test_success_clears_failures(self):
+        for _ in range(2):
+            self.login('wrong')
+        self.assertEqual(self.login().status_code, 200)
+        for _ in range(2):
+            self.assertEqual(self.login('wrong').status_code, 401)
+
+    def test_lockout_doubles(self):
+        store = MemoryCounterStore()
+        request = RequestFactory().post('/api/login/')
+        lockout = Lockout(store=store)
+        durations = []
+        for _ in range(2):
+            for _ in range(3):
+                lockout.failure(request, 'someone@clinic.test')
+            durations.append(lockout.retry_after(request, 'someone@clinic.test'))
+            store.delete('lock:email:someone@clinic.test')
+        self.assertEqual(durations, [60, 120])
+
+    def test_password_reset_is_limited_per_address(self):
+        for _ in range(2):
+            self.client.post('/api/password/reset/', {'email': self.employee.email})
+        response = self.client.post('/api/password/reset/', {'email': self.employee.email})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(OutboundEmail.objects.count(), 2)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class PermissionCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = make_employee(1, role='Doctor')
+        cls.group = Group.objects.create(name='Lab')
+        cls.view_group = Permission.objects.get(codename='view_group')
+        cls.change_group = Permission.objects.get(codename='change_group')
+
+    def setUp(self):
+        permission_cache.clear()
+        self.addCleanup(permission_cache.clear)
+
+    def fresh(self):
+        return Employee.objects.get(pk=self.employee.pk)
+
+    def test_checks_are_served_from_the_compiled_set(self):
+        self.group.permissions.add(self.view_group)
+        self.employee.groups.add(self.group)
+        self.assertTrue(self.fresh().has_perm('auth.view_group'))
+        user = self.fresh()
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_perm('auth.view_group'))
+            self.assertFalse(user.has_perm('auth.change_group'))
+            self.assertTrue(user.has_module_perms('auth'))
+            self.assertEqual(user.get_all_permissions(), {'auth.view_group'})
+
+    def test_membership_and_permission_changes_invalidate(self):
+        self.employee.groups.add(self.group)
+        self.assertFalse(self.fresh().has_perm('auth.view_group'))
+        self.group.permissions.add(self.view_group)
+        self.assertTrue(self.fresh().has_perm('auth.view_group'))
+        self.view_group.group_set.clear()
+        self.assertFalse(self.fresh().has_perm('auth.view_group'))
+        self.employee.user_permissions.add(self.change_group)
+        self.assertEqual(self.fresh().get_user_permissions(), {'auth.change_group'})
+        self.group.permissions.add(self.view_group)
+        self.group.user_set.remove(self.employee)
+        self.assertFalse(self.fresh().has_perm('auth.view_group'))
+
+    def test_drf_permission_classes(self):
+        from rest_framework.response import Response
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from rest_framework.views import APIView
+
+        class DashboardView(APIView):
+            permission_classes = [HasRole, HasPermissions]
+            allowed_roles = ['lab']
+            required_permissions = ['auth.view_group']
+
+            def get(self, request):
+                return Response({})
+
+        def status_code():
+            request = APIRequestFactory().get('/')
+            force_authenticate(request, self.fresh())
+            return DashboardView.as_view()(request).status_code
+
+        self.assertEqual(status_code(), 403)
+        self.employee.groups.add(self.group)
+        self.assertEqual(status_code(), 403)
+        self.group.permissions.add(self.view_group)
+        self.assertEqual(status_code(), 200)
+        self.group.name = 'Pharmacy'
+        self.group.save()
+        self.assertEqual(status_code(), 403)
+        DashboardView.allowed_roles = ['doctor']
+        self.assertEqual(status_code(), 200)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class PayrollTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for n, (bank, salary, role) in enumerate((
+            ('CBE', '1000.50', 'Doctor'), ('Awash', '2000.00', 'Lab'), ('CBE', '3000.25', 'Doctor'),
+        )):
+            make_employee(n, bank_name=bank, salary=salary, role=role)
+        cls.clerk = make_employee(9, bank_name='Dashen', salary='500.00', role='Admin')
+        cls.clerk.user_permissions.add(
+            *Permission.objects.filter(codename__in=['export_payroll', 'view_payroll_summary']),
+        )
+
+    def setUp(self):
+        permission_cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.clerk)
+
+    def export(self, **params):
+        response = self.client.get('/api/payroll/export/', params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export_is_grouped_by_bank(self):
+        rows = list(csv.reader(io.StringIO(self.export())))
+        self.assertEqual(rows[0], ['bank_name', 'bank_account', 'emp_id', 'name', 'amount'])
+        self.assertEqual([row[0] for row in rows[1:]], ['Awash', 'CBE', 'CBE', 'Dashen'])
+        self.assertEqual(rows[2][2:], ['EMP0000000', 'First0 Father0 Grand0', '1000.50'])
+        self.assertEqual(len(self.export(bank='CBE').splitlines()), 3)
+
+    def test_fixed_width_export_has_bank_trailers(self):
+        lines = self.export(file_format='fixed', pay_date='2026-01-31').split('\r\n')[:-1]
+        self.assertEqual({len(line) for line in lines}, {88})
+        self.assertEqual(''.join(line[0] for line in lines), 'HDTHDDTHDT')
+        self.assertEqual(lines[3].rstrip(), 'H' + 'CBE'.ljust(40) + '20260131')
+        self.assertEqual(lines[4][1:33], '100000000000'.ljust(20) + 'EMP0000000'.ljust(12))
+        self.assertEqual(lines[6].rstrip(), 'T' + 'CBE'.ljust(40) + '00000002' + '+' + '400075'.rjust(17, '0'))
+
+    def test_fixed_width_amounts_are_signed_and_never_truncated(self):
+        from .payroll import PayrollFormatError, fixed_record
+        record = fixed_record('D', bank_account='1', emp_id='E1', name='N', amount=-1234)
+        self.assertEqual(record[73:88], '-' + '1234'.rjust(14, '0'))
+        with self.assertRaises(PayrollFormatError):
+            fixed_record('D', bank_account='1', emp_id='E1', name='N', amount=10 ** 14)
+        with self.assertRaises(PayrollFormatError):
+            fixed_record('D', bank_account='1' * 21, emp_id='E1', name='N', amount=0)
+
+    def test_over_wide_fixed_width_fields_are_rejected_before_streaming(self):
+        EmployeePayroll.objects.filter(employee__emp_id='EMP0000001').update(bank_account='1' * 25)
+        response = self.client.get('/api/payroll/export/', {'file_format': 'fixed'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('EMP0000001', response.data['emp_id'][0])
+        self.assertNotIn('EMP0000000', response.data['emp_id'][0])
+        self.assertEqual(self.client.get('/api/payroll/export/', {'file_format': 'fixed', 'bank': 'CBE'}).status_code, 200)
+        self.assertEqual(len(self.export().splitlines()), 5)
+
+    def test_csv_export_quotes_formula_cells(self):
+        Employee.objects.filter(emp_id='EMP0000000').update(first_name='=HYPERLINK("x")')
+        EmployeePayroll.objects.filter(employee__emp_id='EMP0000000').update(salary='-5.00')
+        rows = list(csv.reader(io.StringIO(self.export(bank='CBE'))))
+        self.assertEqual(rows[1][3:], ['\'=HYPERLINK("x") Father0 Grand0', '-5.00'])
+
+    def test_export_is_one_query_whatever_the_chunk_size(self):
+        from .payroll import export_payroll
+        with self.assertNumQueries(1):
+            self.assertEqual(len(''.join(export_payroll('csv', chunk_size=2)).splitlines()), 5)
+
+    def test_summary_is_aggregated_per_group(self):
+        response = self.client.get('/api/payroll/summary/', {'by': 'role'})
+        self.assertEqual(response.status_code, 200)
+        doctors = next(row for row in response.data['groups'] if row['role'] == 'Doctor')
+        self.assertEqual((doctors['employees'], doctors['total']), (2, Decimal('4000.75')))
+        self.assertEqual(response.data['totals']['employees'], 4)
+        self.assertEqual(self.client.get('/api/payroll/summary/', {'by': 'salary'}).status_code, 400)
+
+    def test_requires_payroll_permissions(self):
+        self.client.force_authenticate(Employee.objects.get(emp_id='EMP0000000'))
+        self.assertEqual(self.client.get('/api/payroll/export/').status_code, 403)
+        self.assertEqual(self.client.get('/api/payroll/summary/').status_code, 403)
+
+    @override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+    def test_registration_cannot_grant_permissions(self):
+        Group.objects.create(name='Payroll').permissions.add(Permission.objects.get(codename='export_payroll'))
+        client = APIClient()
+        for n, path in ((20, '/api/register/'), (21, '/api/async/register/')):
+            data = {
+                **employee_rows([n])[0], 'password': 'new-pass-123', 'is_active': False,
+                'groups': ['Payroll'], 'user_permissions': ['export_payroll', 'view_audit_log'],
+            }
+            response = client.post(path, data, format='json')
+            self.assertEqual(response.status_code, 201, response.content)
+            self.assertEqual((response.json()['employee']['groups'], response.json()['employee']['user_permissions']), ([], []))
+            employee = Employee.objects.get(email=data['email'])
+            self.assertTrue(employee.is_active)
+            self.assertFalse(employee.groups.exists() or employee.user_permissions.exists())
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access']}")
+            self.assertEqual(client.get('/api/payroll/export/').status_code, 403)
+            client.credentials()
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class StaffingRollupTests(TestCase):
+    def counts(self):
+        return {
+            (row.region, row.zone, row.role, row.gender): row.headcount
+            for row in StaffingRollup.objects.filter(headcount__gt=0)
+        }
+
+    def test_saves_and_deletes_move_counts(self):
+        place = {'region': 'Oromia', 'zone': 'Zone 1', 'woreda': 'Woreda 1', 'kebele': '01'}
+        doctor = make_employee(1, role='Doctor', gender='F', **place)
+        make_employee(2, role='Doctor', gender='F', **place)
+        self.assertEqual(self.counts(), {('Oromia', 'Zone 1', 'Doctor', 'F'): 2})
+        doctor.role = 'Lab'
+        doctor.save()
+        doctor.profile.zone = 'Zone 2'
+        doctor.profile.save()
+        self.assertEqual(self.counts(), {('Oromia', 'Zone 1', 'Doctor', 'F'): 1, ('Oromia', 'Zone 2', 'Lab', 'F'): 1})
+        with CaptureQueriesContext(connection) as queries:
+            doctor.save(update_fields=['last_login'])
+        self.assertFalse(any('gender' in query['sql'] for query in queries))
+        doctor.delete()
+        self.assertEqual(self.counts(), {('Oromia', 'Zone 1', 'Doctor', 'F'): 1})
+
+    def test_bulk_imports_and_rebuild_agree(self):
+        seed_employees(30)
+        incremental = self.counts()
+        self.assertEqual(sum(incremental.values()), 30)
+        StaffingRollup.objects.update(headcount=0)
+        call_command('rebuild_rollups', chunk_size=7, stdout=io.StringIO())
+        self.assertEqual(self.counts(), incremental)
+
+    def test_drill_down_api(self):
+        seed_employees(12)
+        viewer = make_employee(99, region='Tigray')
+        viewer.user_permissions.add(Permission.objects.get(codename='view_staffing'))
+        permission_cache.clear()
+        client = APIClient()
+        client.force_authenticate(viewer)
+        top = client.get('/api/analytics/staffing/').data
+        self.assertEqual((top['level'], top['headcount']), ('region', 13))
+        self.assertEqual([child['region'] for child in top['children']], sorted({*REGIONS[:6]}))
+        oromia = client.get('/api/analytics/staffing/', {'region': 'Oromia', 'gender': 'F'}).data
+        self.assertEqual((oromia['level'], oromia['headcount']), ('zone', 2))
+        self.assertEqual(oromia['role'], {'Doctor': 1, 'Lab': 1})
+        self.assertEqual(client.get('/api/analytics/staffing/', {'zone': 'Zone 1'}).status_code, 400)
+        client.force_authenticate(Employee.objects.get(emp_id='EMP0000001'))
+        self.assertEqual(client.get('/api/analytics/staffing/').status_code, 403)
+
+
+class StartupTests(SimpleTestCase):
+    # Admin/session apps and modules views import only when used.
+    API_EXCLUDED_MODULES = {
+        'clinic.admin', 'clinic.importers', 'clinic.mail', 'clinic.payroll', 'concurrent.futures.process',
+        'django.contrib.auth.middleware', 'django.contrib.messages.middleware', 'django.contrib.sessions.middleware',
+        'django.contrib.staticfiles', 'rest_framework.templatetags',
+    }
+
+    def test_parse_importtime(self):
+        output = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |   yaml.error\n'
+            'import time:      3000 |       3120 | yaml\n'
+            'unrelated line\n'
+        )
+        self.assertEqual(parse_importtime(output), {'yaml.error': (120, 120), 'yaml': (3000, 3120)})
+
+    def test_api_profile_import_budget(self):
+        full = boot_process('clinic_Management.settings')
+        api = boot_process('clinic_Management.settings_api', importtime=True)
+        self.assertEqual((full['status'], api['status']), (401, 401))
+        self.assertFalse(self.API_EXCLUDED_MODULES & set(api['modules']))
+        self.assertLess(len(api['modules']), len(full['modules']))
+        # Generous by default so slow CI machines pass; tighten locally.
+        self.assertLess(api['import_ms'], float(os.environ.get('CLINIC_IMPORT_BUDGET_MS', 1500)))
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class AuditLogTests(ClearRateLimitsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        audit_log.clear()
+        self.employee = make_employee(1)
+
+    def actions(self):
+        return list(AuditEvent.objects.order_by('id').values_list('action', 'employee_id', 'actor_id'))
+
+    def test_account_events_are_buffered_and_written_in_one_batch(self):
+        client = APIClient()
+        registered = client.post('/api/register/', {**employee_rows([2])[0], 'password': 'new-pass-123'}, format='json')
+        client.post('/api/login/', {'email': self.employee.email, 'password': 'secret-pass-123'})
+        client.post('/api/login/', {'email': 'nobody@clinic.test', 'password': 'wrong'})
+        uid = urlsafe_base64_encode(force_bytes(self.employee.pk))
+        token = default_token_generator.make_token(self.employee)
+        client.post(f'/api/reset/{uid}/{token}/', {'new_password': 'changed-pass-123'})
+        self.assertFalse(AuditEvent.objects.exists())
+        with self.assertNumQueries(1):
+            self.assertEqual(audit_log.flush(), 4)
+        new_pk = registered.json()['employee']['id']
+        self.assertEqual(self.actions(), [
+            ('register', new_pk, None),
+            ('login', self.employee.pk, None),
+            ('login_failed', None, None),
+            ('password_reset', self.employee.pk, None),
+        ])
+        failed = AuditEvent.objects.get(action='login_failed')
+        self.assertEqual((failed.detail, failed.ip_address), ({'email': 'nobody@clinic.test'}, '127.0.0.1'))
+
+    @override_settings(CLINIC_AUDIT={'BATCH_SIZE': 2})
+    def test_full_batch_is_flushed_after_the_response(self):
+        client = APIClient()
+        client.post('/api/login/', {'email': self.employee.email, 'password': 'secret-pass-123'})
+        self.assertFalse(AuditEvent.objects.exists())
+        client.post('/api/token/', {'email': self.employee.email, 'password': 'secret-pass-123'})
+        self.assertEqual(self.actions(), [('login', self.employee.pk, None)] * 2)
+        self.assertEqual(len(audit_log), 0)
+
+    def test_group_and_permission_changes(self):
+        group = Group.objects.create(name='Auditors')
+        permission = Permission.objects.get(codename='view_audit_log')
+        self.employee.groups.add(group)
+        group.user_set.remove(self.employee)
+        self.employee.user_permissions.add(permission)
+        self.employee.user_permissions.clear()
+        audit_log.flush()
+        events = AuditEvent.objects.order_by('id')
+        self.assertEqual(
+            [(event.action, event.employee_id, event.detail) for event in events],
+            [
+                ('groups_changed', self.employee.pk, {'change': 'add', 'ids': [group.pk]}),
+                ('groups_changed', self.employee.pk, {'change': 'remove', 'ids': [group.pk]}),
+                ('permissions_changed', self.employee.pk, {'change': 'add', 'ids': [permission.pk]}),
+                ('permissions_changed', self.employee.pk, {'change': 'clear', 'ids': [permission.pk]}),
+            ],
+        )
+
+    def test_test_runner_discards_buffered_events(self):
+        from .test_runner import ClinicTestRunner
+        audit_log.record(AuditEvent.ACTION_LOGIN, employee=self.employee)
+        ClinicTestRunner(verbosity=0).teardown_databases([])
+        self.assertEqual(len(audit_log), 0)
+
+    def test_events_are_append_only(self):
+        audit_log.record(AuditEvent.ACTION_LOGIN, employee=self.employee)
+        audit_log.flush()
+        event = AuditEvent.objects.get()
+        with self.assertRaises(ValueError):
+            event.save()
+        with self.assertRaises(ValueError):
+            event.delete()
+
+    def test_failed_batches_are_kept_and_ndjson_sink(self):
+        class FailingSink:
+            def write(self, events):
+                raise OSError('disk full')
+
+        buffer = AuditBuffer(sink=FailingSink())
+        buffer.record(AuditEvent.ACTION_LOGIN, employee=self.employee)
+        with self.assertLogs('clinic.audit', 'ERROR'):
+            self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(len(buffer), 1)
+        with tempfile.TemporaryDirectory() as directory:
+            buffer._sink = NDJSONSink(directory)
+            buffer.record(AuditEvent.ACTION_LOGIN_FAILED, email='x@clinic.test')
+            self.assertEqual(buffer.flush(), 2)
+            [path] = Path(directory).iterdir()
+            lines = [json.loads(line) for line in path.read_text().splitlines()]
+        self.assertEqual([line['action'] for line in lines], ['login', 'login_failed'])
+        self.assertEqual(lines[0]['employee_id'], self.employee.pk)
+
+    def test_addresses_are_validated_and_bad_events_dont_block_the_rest(self):
+        written = []
+
+        class PickySink:
+            def write(self, events):
+                if any(event['detail'].get('bad') for event in events):
+                    raise ValueError('rejected')
+                written.extend(events)
+
+        buffer = AuditBuffer(sink=PickySink())
+        factory = RequestFactory()
+        buffer.record(AuditEvent.ACTION_LOGIN, request=factory.get('/', REMOTE_ADDR='2001:DB8::1'), actor=None)
+        buffer.record(AuditEvent.ACTION_LOGIN, request=factory.get('/', REMOTE_ADDR='not-an-ip'), actor=None, bad=True)
+        buffer.record(AuditEvent.ACTION_LOGIN_FAILED, actor=None)
+        with self.assertLogs('clinic.audit', 'WARNING'), override_settings(CLINIC_AUDIT={'MAX_ATTEMPTS': 2}):
+            self.assertEqual(buffer.flush(), 2)
+            self.assertEqual(len(buffer), 1)
+            self.assertEqual(buffer.flush(), 0)
+        self.assertEqual((len(buffer), buffer.quarantined), (0, 1))
+        self.assertEqual([event['ip_address'] for event in written], ['2001:db8::1', None])
+
+    def test_api_filters_by_employee_and_time_range(self):
+        other = make_employee(2)
+        start = timezone.now() - datetime.timedelta(days=10)
+        AuditEvent.objects.bulk_create([
+            AuditEvent(created_at=start + datetime.timedelta(days=day), action='login', employee_id=employee.pk)
+            for day in range(10) for employee in (self.employee, other)
+        ])
+        auditor = make_employee(3)
+        client = APIClient()
+        client.force_authenticate(auditor)
+        self.assertEqual(client.get('/api/audit/').status_code, 403)
+        auditor.user_permissions.add(Permission.objects.get(codename='view_audit_log'))
+        permission_cache.clear()
+        client.force_authenticate(Employee.objects.get(pk=auditor.pk))
+        response = client.get('/api/audit/', {
+            'employee': self.employee.pk,
+            'since': (start + datetime.timedelta(days=2)).isoformat(),
+            'until': (start + datetime.timedelta(days=5)).isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(len(results), 3)
+        self.assertEqual({row['employee_id'] for row in results}, {self.employee.pk})
+        self.assertGreater(results[0]['created_at'], results[-1]['created_at'])
+        self.assertEqual(client.get('/api/audit/', {'since': 'yesterday'}).status_code, 400)
+
+
+class RendererTests(SimpleTestCase):
+    def test_orjson_output_matches_json_renderer(self):
+        data = {
+            'id': 1,
+            'name': 'Abebe Kebede',
+            'salary': Decimal('1250.50'),
+            'at': datetime.datetime(2026, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc),
+            'groups': ('Nurse',),
+            7: None,
+            'error': gettext_lazy('Not found.'),
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_indent_and_oversized_integers_use_the_stock_encoder(self):
+        data = {'n': 2 ** 70}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        context = {'indent': 2}
+        self.assertEqual(
+            ORJSONRenderer().render({'a': [1]}, 'application/json', context),
+            JSONRenderer().render({'a': [1]}, 'application/json', context),
+        )
+
+    @skipUnless(msgpack, 'msgpack is not installed')
+    def test_messagepack(self):
+        body = MessagePackRenderer().render({'salary': Decimal('10.5'), 'groups': ['Nurse']})
+        self.assertEqual(msgpack.unpackb(body), {'salary': 10.5, 'groups': ['Nurse']})
+
+    def test_accept_encoding_negotiation(self):
+        self.assertEqual(negotiate_encoding('gzip, deflate'), 'gzip')
+        self.assertEqual(negotiate_encoding('br;q=0.2, gzip;q=0.8'), 'gzip')
+        self.assertEqual(negotiate_encoding('*'), available_encodings()[0])
+        self.assertIsNone(negotiate_encoding('identity'))
+        self.assertIsNone(negotiate_encoding('gzip;q=0'))
+        self.assertIsNone(negotiate_encoding(''))
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class CompressionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employees = [make_employee(n) for n in range(5)]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.employees[0])
+
+    def test_json_is_rendered_by_orjson_and_gzipped_when_accepted(self):
+        plain = self.client.get('/api/employees/')
+        self.assertIsInstance(plain.accepted_renderer, ORJSONRenderer)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+        response = self.client.get('/api/employees/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertEqual(json.loads(gzip.decompress(response.content)), plain.json())
+        self.assertEqual(response['ETag'], 'W/' + plain['ETag'])
+        response = self.client.get('/api/employees/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(CLINIC_COMPRESSION={'MIN_BYTES': 10 ** 9})
+    def test_small_responses_are_sent_as_is(self):
+        response = self.client.get('/api/employees/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
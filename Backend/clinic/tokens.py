@@ -0,0 +1,94 @@
+# clinic/tokens.py
+"""
+Refresh-token revocation store.
+
+Only tokens revoked before their expiry are stored, keyed by ``jti``, and
+rows past ``expires_at`` are purged a few at a time on every revocation,
+so the table stays as small as the set of live revoked tokens. A bounded
+in-process set answers repeat lookups for recently revoked tokens without
+touching the database.
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from .conf import clinic_setting
+from .models import RevokedToken
+
+
+class RevocationStore:
+    def __init__(self, local_size=None, purge_batch=None):
+        # ``None`` reads CLINIC_TOKEN_REVOCATION on use.
+        self._local_size = local_size
+        self._purge_batch = purge_batch
+        self._local = OrderedDict()  # jti -> expiry timestamp
+        self._lock = threading.Lock()
+
+    @property
+    def local_size(self):
+        return self._local_size if self._local_size is not None else clinic_setting('TOKEN_REVOCATION', 'LOCAL_CACHE_SIZE')
+
+    @property
+    def purge_batch(self):
+        return self._purge_batch if self._purge_batch is not None else clinic_setting('TOKEN_REVOCATION', 'PURGE_BATCH')
+
+    def _remember(self, jti, exp):
+        with self._lock:
+            self._local[jti] = exp
+            self._local.move_to_end(jti)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def is_revoked(self, jti):
+        with self._lock:
+            if jti in self._local:
+                return True
+        expires_at = RevokedToken.objects.filter(pk=jti).values_list('expires_at', flat=True).first()
+        if expires_at is not None:
+            self._remember(jti, expires_at.timestamp())
+            return True
+        return False
+
+    def revoke(self, token):
+        """
+        Record ``token`` as revoked. Returns ``False`` if it already was, which
+        lets callers detect two requests racing to rotate the same token.
+        """
+        jti = token[api_settings.JTI_CLAIM]
+        exp = token['exp']
+        try:
+            with transaction.atomic():
+                RevokedToken.objects.create(
+                    jti=jti, expires_at=datetime.fromtimestamp(exp, tz=dt_timezone.utc),
+                )
+        except IntegrityError:
+            self._remember(jti, exp)
+            return False
+        self._remember(jti, exp)
+        self.purge_expired()
+        return True
+
+    def purge_expired(self, limit=None):
+        limit = limit or self.purge_batch
+        expired = list(
+            RevokedToken.objects.filter(expires_at__lt=timezone.now()).values_list('pk', flat=True)[:limit]
+        )
+        if expired:
+            RevokedToken.objects.filter(pk__in=expired).delete()
+        # Entries arrive roughly in expiry order, so expired ones sit at the front.
+        now = timezone.now().timestamp()
+        with self._lock:
+            while self._local and next(iter(self._local.values())) < now:
+                self._local.popitem(last=False)
+        return len(expired)
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+
+revocation_store = RevocationStore()
@@ -1,11 +1,37 @@
 # clinic/urls.py
 from django.urls import path
-from .views import EmployeeRegistrationView, LoginView, TokenRefreshView, PasswordResetRequestView, PasswordResetConfirmView
+from .async_views import AsyncEmployeeRegistrationView, AsyncLoginView, AsyncPasswordResetConfirmView
+from .views import (
+    EmployeeRegistrationView, LoginView, TokenRefreshView, TokenRevokeView, PasswordResetRequestView, PasswordResetConfirmView,
+    EmployeeListView, EmployeeDetailView, UserDetailView, EmployeeBulkImportView,
+    EmployeeSearchView, EmployeeAutocompleteView, LicenceReportView, ExpiringLicenceListView,
+    UploadSessionCreateView, UploadSessionView, EmployeeMediaView, PayrollExportView, PayrollSummaryView,
+    StaffingView, AuditEventListView,
+)
 
 urlpatterns = [
     path('register/', EmployeeRegistrationView.as_view(), name='employee-register'),
     path('login/', LoginView.as_view(), name='employee-login'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
+    path('token/revoke/', TokenRevokeView.as_view(), name='token-revoke'),
     path('password/reset/', PasswordResetRequestView.as_view(), name='password-reset-request'),
     path('reset/<uidb64>/<token>/', PasswordResetConfirmView.as_view(), name='password-reset-confirm'),
+    path('async/register/', AsyncEmployeeRegistrationView.as_view(), name='employee-register-async'),
+    path('async/login/', AsyncLoginView.as_view(), name='employee-login-async'),
+    path('async/reset/<uidb64>/<token>/', AsyncPasswordResetConfirmView.as_view(), name='password-reset-confirm-async'),
+    path('user-detail/', UserDetailView.as_view(), name='user-detail'),
+    path('employees/', EmployeeListView.as_view(), name='employee-list'),
+    path('employees/search/', EmployeeSearchView.as_view(), name='employee-search'),
+    path('employees/autocomplete/', EmployeeAutocompleteView.as_view(), name='employee-autocomplete'),
+    path('employees/import/', EmployeeBulkImportView.as_view(), name='employee-import'),
+    path('employees/<int:pk>/', EmployeeDetailView.as_view(), name='employee-detail'),
+    path('uploads/', UploadSessionCreateView.as_view(), name='upload-create'),
+    path('uploads/<uuid:pk>/', UploadSessionView.as_view(), name='upload-detail'),
+    path('employees/<int:pk>/media/<str:kind>/', EmployeeMediaView.as_view(), name='employee-media'),
+    path('licences/report/', LicenceReportView.as_view(), name='licence-report'),
+    path('licences/expiring/', ExpiringLicenceListView.as_view(), name='licence-expiring'),
+    path('payroll/export/', PayrollExportView.as_view(), name='payroll-export'),
+    path('payroll/summary/', PayrollSummaryView.as_view(), name='payroll-summary'),
+    path('analytics/staffing/', StaffingView.as_view(), name='staffing'),
+    path('audit/', AuditEventListView.as_view(), name='audit-log'),
 ]
\ No newline at end of file
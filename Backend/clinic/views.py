@@ -1,27 +1,53 @@
 # clinic/views.py
+import re
+
 from rest_framework import generics, status
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
-from .models import Employee
-from .serializers import EmployeeSerializer, LoginSerializer, TokenRefreshSerializer
-from django.contrib.auth.tokens import default_token_generator
+from rest_framework_simplejwt.views import TokenObtainPairView
+from .conf import clinic_setting
+from .audit import audit_log
+from .conditional import CachedListMixin, ConditionalGetMixin
+from .models import SIDE_TABLE_FIELDS, AuditEvent, Employee, EmployeeProfile, UploadSession
+from .metrics import registry
+from .media import UploadError, discard_upload, write_chunk
+from .serving import file_etag, resized_image_cache, serve_file, storage_path
+from .licences import buckets_within, licence_report
+from .pagination import AuditCursorPagination, EmployeeCursorPagination
+from .permissions import HasPermissions, IsSuperuser, has_permissions
+from .profiles import get_employee_profile, get_profile_entry
+from .rollups import BREAKDOWNS, LEVELS, staffing_breakdown
+from .ratelimit import EmailRateThrottle, IPRateThrottle, LockoutThrottle, lockout
+from .search import get_search_backend
+from .serializers import (
+    AuditEventSerializer, EmployeeLicenceSerializer, EmployeeRegistrationSerializer, EmployeeSerializer, EmployeeSummarySerializer, LoginSerializer, TokenRefreshSerializer, TokenRevokeSerializer,
+    UploadSessionSerializer,
+)
+from .tokens import revocation_store
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
-from django.core.mail import send_mail
-from .models import Employee
-from django.http import Http404
+from django.http import Http404, HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.shortcuts import get_object_or_404
 from rest_framework import views
+from rest_framework.exceptions import AuthenticationFailed, PermissionDenied, ValidationError
+
+# Imported where they're used: mail, reset tokens, bulk import (a process
+# pool) and payroll serve a handful of requests, so API workers don't pay for
+# them at boot. See clinic_Management/settings_api.py.
 
 class EmployeeRegistrationView(generics.CreateAPIView):
     queryset = Employee.objects.all()
-    serializer_class = EmployeeSerializer
+    serializer_class = EmployeeRegistrationSerializer
     permission_classes = [AllowAny]
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         employee = serializer.save()
+        audit_log.record(AuditEvent.ACTION_REGISTER, employee=employee, request=request)
         
         refresh = RefreshToken.for_user(employee)
         
@@ -34,6 +60,8 @@ class EmployeeRegistrationView(generics.CreateAPIView):
 class LoginView(generics.GenericAPIView):
     serializer_class = LoginSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [LockoutThrottle, IPRateThrottle, EmailRateThrottle]
+    throttle_scope = 'login'
 
     def post(self, request):
         serializer = self.get_serializer(data=request.data)
@@ -42,18 +70,44 @@ class LoginView(generics.GenericAPIView):
         email = serializer.validated_data['email']
         password = serializer.validated_data['password']
         
+        employee = None
         try:
             employee = Employee.objects.get(email=email)
             if employee.check_password(password):
+                lockout.success(request, email)
+                audit_log.record(AuditEvent.ACTION_LOGIN, employee=employee, request=request)
                 refresh = RefreshToken.for_user(employee)
                 return Response({
                     'refresh': str(refresh),
                     'access': str(refresh.access_token),
                     'employee': EmployeeSerializer(employee).data
                 })
-            return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
         except Employee.DoesNotExist:
-            return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
+            pass
+        lockout.failure(request, email)
+        audit_log.record(AuditEvent.ACTION_LOGIN_FAILED, employee=employee, request=request, email=email)
+        return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
+
+class TokenObtainView(TokenObtainPairView):
+    throttle_classes = [LockoutThrottle, IPRateThrottle, EmailRateThrottle]
+    throttle_scope = 'login'
+
+    def get_serializer(self, *args, **kwargs):
+        # Kept so post() can audit the authenticated employee.
+        self.serializer = super().get_serializer(*args, **kwargs)
+        return self.serializer
+
+    def post(self, request, *args, **kwargs):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        try:
+            response = super().post(request, *args, **kwargs)
+        except AuthenticationFailed:
+            lockout.failure(request, email)
+            audit_log.record(AuditEvent.ACTION_LOGIN_FAILED, request=request, email=email)
+            raise
+        lockout.success(request, email)
+        audit_log.record(AuditEvent.ACTION_LOGIN, employee=self.serializer.user, request=request)
+        return response
 
 class TokenRefreshView(generics.GenericAPIView):
     serializer_class = TokenRefreshSerializer
@@ -63,26 +117,41 @@ class TokenRefreshView(generics.GenericAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         return Response(serializer.validated_data, status=status.HTTP_200_OK)
+
+class TokenRevokeView(generics.GenericAPIView):
+    serializer_class = TokenRevokeSerializer
+    permission_classes = [AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        revocation_store.revoke(serializer.validated_data['token'])
+        return Response({'message': 'Token revoked'}, status=status.HTTP_200_OK)
     
 
 class PasswordResetRequestView(views.APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [IPRateThrottle, EmailRateThrottle]
+    throttle_scope = 'password_reset'
 
     def post(self, request):
+        from django.contrib.auth.tokens import default_token_generator
+
+        from .mail import enqueue_mail
+
         email = request.data.get('email')
         try:
             employee = Employee.objects.get(email=email)
             uid = urlsafe_base64_encode(force_bytes(employee.pk))
             token = default_token_generator.make_token(employee)
             
-            # Send reset email (customize the URL and email settings)
+            # Queued for `manage.py run_mail_worker` so the request doesn't wait on SMTP
             reset_link = f"http://127.0.0.1:8000/api/reset/{uid}/{token}/"
-            send_mail(
+            enqueue_mail(
                 'Password Reset Request',
                 f'Click the link to reset your password: {reset_link}',
-                'from@example.com',  # Replace with your email
                 [email],
-                fail_silently=True,
+                from_email='from@example.com',  # Replace with your email
             )
             return Response({'message': 'Password reset link sent to your email'}, status=status.HTTP_200_OK)
         except Employee.DoesNotExist:
@@ -92,6 +161,8 @@ class PasswordResetConfirmView(views.APIView):
     permission_classes = [AllowAny]
 
     def post(self, request, uidb64, token):
+        from django.contrib.auth.tokens import default_token_generator
+
         try:
             uid = force_str(urlsafe_base64_decode(uidb64))
             employee = Employee.objects.get(pk=uid)
@@ -102,10 +173,397 @@ class PasswordResetConfirmView(views.APIView):
                     return Response({'error': 'New password is required'}, status=status.HTTP_400_BAD_REQUEST)
                 employee.set_password(new_password)
                 employee.save()
+                audit_log.record(AuditEvent.ACTION_PASSWORD_RESET, employee=employee, request=request)
                 return Response({'message': 'Password reset successful'}, status=status.HTTP_200_OK)
             return Response({'error': 'Invalid or expired token'}, status=status.HTTP_400_BAD_REQUEST)
         except (TypeError, ValueError, OverflowError, Employee.DoesNotExist):
-            return Response({'error': 'Invalid reset link'}, status=status.HTTP_400_BAD_REQUEST)    
-        
+            return Response({'error': 'Invalid reset link'}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class EmployeeReadMixin:
+    """
+    Shared read-side behaviour for the employee endpoints.
+
+    ``?view=summary`` switches to the compact serializer and ``?fields=a,b``
+    narrows the output further; the queryset only loads the columns and
+    relations the chosen fields actually need. The payroll columns (salary
+    and bank details) are left out unless the user holds
+    ``payroll_permissions``; asking for them by name without it is a 403.
+    """
+    permission_classes = [IsAuthenticated]
+    payroll_permissions = ['clinic.export_payroll']
+
+    def get_serializer_class(self):
+        if self.request.query_params.get('view') == 'summary':
+            return EmployeeSummarySerializer
+        return EmployeeSerializer
+
+    def can_view_payroll(self):
+        return has_permissions(self.request.user, self.payroll_permissions)
+
+    def get_requested_fields(self):
+        fields = self.request.query_params.get('fields')
+        if fields:
+            fields = [name.strip() for name in fields.split(',') if name.strip()]
+        if self.can_view_payroll():
+            return fields or None
+        if not fields:
+            return [name for name in self.get_serializer_class().Meta.fields if SIDE_TABLE_FIELDS.get(name) != 'payroll']
+        if any(SIDE_TABLE_FIELDS.get(name) == 'payroll' for name in fields):
+            raise PermissionDenied('You do not have permission to view payroll fields.')
+        return fields
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        return self.get_serializer().optimize_queryset(Employee.objects.all()).order_by('id')
+
+    def validator_digest(self, *parts):
+        # Pages with and without the payroll columns must not share an ETag or cache entry.
+        return super().validator_digest(self.can_view_payroll(), *parts)
+
+class EmployeeListView(EmployeeReadMixin, CachedListMixin, generics.ListAPIView):
+    pagination_class = EmployeeCursorPagination
+
+class EmployeeDetailView(EmployeeReadMixin, ConditionalGetMixin, generics.RetrieveAPIView):
+    def get_validators(self):
+        updated_at = Employee.objects.filter(pk=self.kwargs['pk']).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            return None
+        return self.validator_digest(self.kwargs['pk'], updated_at.isoformat()), updated_at
+
+
+class EmployeeSearchView(EmployeeListView):
+    """
+    ``?q=`` full-text search over names, location and role, combined with
+    exact ``region``/``zone``/``woreda``/``kebele``/``role``/``field``
+    filters that are served by the composite indexes.
+    """
+    FILTERS = ('region', 'zone', 'woreda', 'kebele', 'role', 'field')
+
+    def get_serializer_class(self):
+        if self.request.query_params.get('view') == 'full':
+            return EmployeeSerializer
+        return EmployeeSummarySerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        filters = {
+            name: self.request.query_params[name]
+            for name in self.FILTERS if self.request.query_params.get(name)
+        }
+        queryset = queryset.filter(**{
+            f'{SIDE_TABLE_FIELDS[name]}__{name}' if name in SIDE_TABLE_FIELDS else name: value
+            for name, value in filters.items()
+        })
+        query = self.request.query_params.get('q', '').strip()
+        if query:
+            queryset = get_search_backend().filter_queryset(queryset, query)
+        return queryset
+
+class EmployeeAutocompleteView(views.APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), 50)
+        except ValueError:
+            limit = 10
+        matches = get_search_backend().autocomplete(request.query_params.get('q', ''), limit=limit)
+        return Response([
+            {
+                'id': employee.pk,
+                'emp_id': employee.emp_id,
+                'name': f'{employee.first_name} {employee.father_name} {employee.grandfather_name}',
+                'role': employee.role,
+            }
+            for employee in matches.only('id', 'emp_id', 'first_name', 'father_name', 'grandfather_name', 'role')
+        ])
+
+class LicenceReportView(views.APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(licence_report())
+
+class ExpiringLicenceListView(EmployeeListView):
+    """Employees whose licence has expired (``?within=expired``) or expires within 7, 30 or 90 days."""
+
+    def get_serializer_class(self):
+        return EmployeeLicenceSerializer
+
+    def get_queryset(self):
+        within = self.request.query_params.get('within', '30')
+        if within == 'expired':
+            buckets = [EmployeeProfile.LICENCE_EXPIRED]
+        elif within in ('7', '30', '90'):
+            buckets = buckets_within(int(within))
+        else:
+            raise ValidationError({'within': ['Must be one of 7, 30, 90 or expired.']})
+        return super().get_queryset().filter(profile__licence_bucket__in=buckets)
+
+class PayrollExportView(views.APIView):
+    """
+    Streamed bank transfer file: ``?file_format=csv`` (default) or ``fixed``
+    width, optionally for one ``?bank=``, with ``?pay_date=YYYY-MM-DD`` in
+    the fixed-width headers.
+    """
+    permission_classes = [HasPermissions]
+    required_permissions = ['clinic.export_payroll']
+
+    def get(self, request):
+        from .payroll import CONTENT_TYPES, FORMATS, export_payroll, fixed_width_overflows
+
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in FORMATS:
+            raise ValidationError({'file_format': [f"Must be one of {', '.join(FORMATS)}."]})
+        pay_date = request.query_params.get('pay_date')
+        if pay_date is not None:
+            pay_date = parse_date(pay_date)
+            if pay_date is None:
+                raise ValidationError({'pay_date': ['Must be a date in YYYY-MM-DD format.']})
+        bank = request.query_params.get('bank')
+        if file_format == 'fixed':
+            # Checked up front: a record that doesn't fit can't fail the
+            # stream after the 200 and the earlier records have been sent.
+            overflows = fixed_width_overflows(bank)
+            if overflows:
+                raise ValidationError({'emp_id': [
+                    f"Account number or emp_id too wide for the fixed-width file: {', '.join(overflows)}."
+                ]})
+        chunks = export_payroll(file_format, bank=bank, pay_date=pay_date)
+        response = StreamingHttpResponse(chunks, content_type=CONTENT_TYPES[file_format])
+        extension = 'csv' if file_format == 'csv' else 'txt'
+        response['Content-Disposition'] = f'attachment; filename="payroll.{extension}"'
+        return response
+
+class PayrollSummaryView(views.APIView):
+    """Salary totals per ``?by=role`` (default), ``region`` or ``institution``."""
+    permission_classes = [HasPermissions]
+    required_permissions = ['clinic.view_payroll_summary']
+
+    def get(self, request):
+        from .payroll import SUMMARY_GROUPS, payroll_summary
+
+        group_by = request.query_params.get('by', 'role')
+        if group_by not in SUMMARY_GROUPS:
+            raise ValidationError({'by': [f"Must be one of {', '.join(SUMMARY_GROUPS)}."]})
+        return Response(payroll_summary(group_by))
+
+class StaffingView(views.APIView):
+    """
+    Head count drill-down from the staffing rollup: ``?region=`` (then
+    ``zone``, ``woreda``, ``kebele``) narrows the location and the response
+    splits it by the next level, role and gender. ``role``/``gender`` filter.
+    """
+    permission_classes = [HasPermissions]
+    required_permissions = ['clinic.view_staffing']
+
+    def get(self, request):
+        filters = {
+            name: request.query_params[name]
+            for name in LEVELS + BREAKDOWNS if request.query_params.get(name)
+        }
+        levels = [name in filters for name in LEVELS]
+        if levels != sorted(levels, reverse=True):
+            raise ValidationError({'non_field_errors': [f"Location filters must be given in order: {', '.join(LEVELS)}."]})
+        return Response(staffing_breakdown(**filters))
+
+class AuditEventListView(generics.ListAPIView):
+    """
+    The account audit trail, newest first, filtered by ``?employee=``,
+    ``?actor=``, ``?action=`` and an ISO 8601 ``?since=``/``?until=`` range.
+    """
+    serializer_class = AuditEventSerializer
+    pagination_class = AuditCursorPagination
+    permission_classes = [HasPermissions]
+    required_permissions = ['clinic.view_audit_log']
+
+    def get_queryset(self):
+        params = self.request.query_params
+        filters = {}
+        for name in ('employee', 'actor'):
+            if params.get(name):
+                if not params[name].isdigit():
+                    raise ValidationError({name: ['Must be an employee id.']})
+                filters[f'{name}_id'] = int(params[name])
+        if params.get('action'):
+            filters['action'] = params['action']
+        for name, lookup in (('since', 'created_at__gte'), ('until', 'created_at__lt')):
+            if params.get(name):
+                value = parse_datetime(params[name])
+                if value is None:
+                    raise ValidationError({name: ['Must be an ISO 8601 date and time.']})
+                filters[lookup] = timezone.make_aware(value) if timezone.is_naive(value) else value
+        return AuditEvent.objects.filter(**filters)
+
+class UserDetailView(ConditionalGetMixin, views.APIView):
+    """
+    Login profile used by the dashboards (``?email=`` defaults to the caller).
+
+    Served from the per-employee profile cache; see ``clinic.profiles``.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get_email(self):
+        """The requested email, or ``None`` if the caller may not read it."""
+        email = self.request.query_params.get('email') or self.request.user.email
+        if email.lower() != self.request.user.email.lower() and not self.request.user.is_superuser:
+            return None
+        return email
+
+    def get_validators(self):
+        # From the profile cache entry, so a cache hit still runs no queries.
+        email = self.get_email()
+        if email is None:
+            return None
+        try:
+            pk, version, updated_at, _ = get_profile_entry(email)
+        except Employee.DoesNotExist:
+            return None
+        return self.validator_digest(pk, version, updated_at.isoformat()), updated_at
+
+    def get(self, request):
+        return self.conditional_response(request, self.profile_response)
+
+    def profile_response(self):
+        email = self.get_email()
+        if email is None:
+            return Response({'error': 'Not allowed'}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            profile = get_employee_profile(email)
+        except Employee.DoesNotExist:
+            return Response({'error': 'Email not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response([profile])
+
+
+class EmployeeBulkImportView(views.APIView):
+    """
+    Multipart upload of a CSV or NDJSON ``file``; ``file_format`` overrides
+    detection from the filename. Large uploads are spooled to disk by Django
+    and read back row by row.
+    """
+    permission_classes = [IsSuperuser]
+
+    def post(self, request):
+        from .importers import EmployeeImporter, detect_format, get_import_pool, iter_rows
+
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'A file upload is required'}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.data.get('file_format') or detect_format(upload.name, upload.content_type or '')
+        if file_format not in ('csv', 'ndjson'):
+            return Response({'error': 'Unsupported file format'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            chunk_size = int(request.data.get('chunk_size', 0)) or None
+        except ValueError:
+            return Response({'error': 'chunk_size must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        report = EmployeeImporter(chunk_size=chunk_size, pool=get_import_pool()).run(iter_rows(upload, file_format))
+        audit_log.record(AuditEvent.ACTION_IMPORT, request=request, file=upload.name, created=report['created'])
+        code = status.HTTP_201_CREATED if report['created'] else status.HTTP_400_BAD_REQUEST
+        return Response(report, status=code)
+
+
+class UploadSessionCreateView(generics.CreateAPIView):
+    """
+    Start a resumable upload of an employee ``image`` or ``pdf``. Employees
+    may upload their own files; superusers may upload for anyone.
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def perform_create(self, serializer):
+        employee = serializer.validated_data['employee']
+        if employee.pk != self.request.user.pk and not self.request.user.is_superuser:
+            raise PermissionDenied()
+        serializer.save()
+
+class UploadSessionView(generics.RetrieveDestroyAPIView):
+    """
+    ``GET`` reports the next offset to send; ``PUT`` appends one chunk given
+    as the raw body with a ``Content-Range: bytes start-end/total`` header;
+    ``DELETE`` abandons the upload.
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = UploadSession.objects.select_related('employee')
+        if not self.request.user.is_superuser:
+            queryset = queryset.filter(employee=self.request.user)
+        return queryset
+
+    def put(self, request, pk):
+        session = self.get_object()
+        match = re.fullmatch(r'bytes (\d+)-(\d+)/(\d+)', request.headers.get('Content-Range', ''))
+        if not match:
+            return Response({'error': 'Content-Range header is required'}, status=status.HTTP_400_BAD_REQUEST)
+        start, end, total = (int(value) for value in match.groups())
+        if total != session.total_size or end < start:
+            return Response({'error': 'Content-Range does not match the upload'}, status=status.HTTP_400_BAD_REQUEST)
+        if start != session.received:
+            return Response(
+                {'error': f'Expected offset {session.received}', 'received': session.received},
+                status=status.HTTP_409_CONFLICT,
+            )
+        try:
+            write_chunk(session, start, request, end - start + 1)
+        except UploadError as exc:
+            return Response({'error': str(exc), 'received': session.received}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(session).data)
+
+    def perform_destroy(self, instance):
+        discard_upload(instance)
+
+
+class EmployeeMediaView(views.APIView):
+    """
+    Authenticated download of an employee's ``image``, ``thumbnail`` or
+    ``pdf`` with ETag revalidation and byte ranges. ``?size=`` returns a
+    cached square-bounded JPEG of the image at one of the configured sizes.
+    Thumbnails and resized photos are open to any employee; the ``pdf`` and
+    the original photo only to their owner and holders of
+    ``document_permissions``.
+    """
+    permission_classes = [IsAuthenticated]
+    document_permissions = ['clinic.view_employee_documents']
+    FIELDS = {'image': 'image', 'thumbnail': 'image_thumbnail', 'pdf': 'pdf'}
+
+    def get(self, request, pk, kind):
+        field = self.FIELDS.get(kind)
+        if field is None:
+            raise Http404
+        private = kind == 'pdf' or (kind == 'image' and 'size' not in request.query_params)
+        if private and request.user.pk != pk and not has_permissions(request.user, self.document_permissions):
+            raise PermissionDenied()
+        profile = get_object_or_404(EmployeeProfile.objects.only('employee_id', field), pk=pk)
+        name = getattr(profile, field).name
+        if not name:
+            raise Http404
+        path = storage_path(name)
+        try:
+            etag = file_etag(name, path)
+        except FileNotFoundError:
+            raise Http404
+
+        size = request.query_params.get('size')
+        if size is None or kind == 'pdf':
+            return serve_file(request, path, etag)
+        if not size.isdigit() or int(size) not in clinic_setting('MEDIA', 'RESIZE_SIZES'):
+            raise ValidationError({'size': [f"Must be one of {', '.join(map(str, clinic_setting('MEDIA', 'RESIZE_SIZES')))}."]})
+        size = int(size)
+        resized_etag = '"%s-%d"' % (etag.strip('"'), size)
+        return serve_file(
+            request, lambda: resized_image_cache().get(path, etag, size), resized_etag, content_type='image/jpeg',
+        )
+
 
-        
\ No newline at end of file
+def metrics_view(request):
+    """Prometheus scrape endpoint, limited to ``CLINIC_METRICS['ALLOWED_IPS']``."""
+    allowed = clinic_setting('METRICS', 'ALLOWED_IPS')
+    if allowed is not None and request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -5,6 +5,13 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
+
+Run it under an ASGI server (e.g. ``uvicorn clinic_Management.asgi:application``)
+so the async auth views in ``clinic.async_views`` can hand password hashing to
+the worker pool without tying up a server worker per request.
+
+API-only workers can set DJANGO_SETTINGS_MODULE=clinic_Management.settings_api
+to boot without the admin, session and template machinery.
 """
 
 import os
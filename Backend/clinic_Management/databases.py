@@ -0,0 +1,92 @@
+# clinic_Management/databases.py
+"""
+Named database profiles, selected with the ``CLINIC_DB_PROFILE`` environment
+variable and expanded into ``DATABASES['default']`` by settings.py.
+
+``sqlite``
+    The default. A memory-mapped read path and a busy timeout, applied on
+    every new connection. Transactions start ``IMMEDIATE`` so a writer
+    queues on the busy timeout up front instead of failing with "database
+    is locked" when a read lock can't be upgraded. ``CLINIC_DB_WAL=1`` adds
+    the WAL journal, so readers never block the writer, with
+    ``synchronous=NORMAL`` (durable at checkpoints, safe under WAL). It is
+    opt-in because WAL mode is stored in the database file itself and keeps
+    ``-wal``/``-shm`` files beside it, which a checked-in development
+    database shouldn't pick up.
+``sqlite-basic``
+    Django's stock SQLite settings, kept for load-test comparisons.
+``postgres``
+    PostgreSQL via psycopg 3. Persistent connections with health checks by
+    default; ``CLINIC_DB_POOL=1`` switches to psycopg's connection pool
+    (``pip install "psycopg[pool]"``), which Django requires to be used
+    without ``CONN_MAX_AGE``.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+SQLITE_PRAGMAS = (
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA mmap_size=134217728',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-16000',
+)
+SQLITE_WAL_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+)
+PROFILES = ('sqlite', 'sqlite-basic', 'postgres')
+
+
+def database_profile(profile, name, env=os.environ):
+    """
+    ``DATABASES['default']`` for ``profile``. ``name`` is the SQLite file;
+    PostgreSQL reads its connection details from ``CLINIC_DB_*`` variables.
+    """
+    conn_max_age = int(env.get('CLINIC_DB_CONN_MAX_AGE', 60))
+    if profile == 'sqlite-basic':
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': name,
+        }
+    if profile == 'sqlite':
+        pragmas = SQLITE_PRAGMAS
+        if env.get('CLINIC_DB_WAL', '') not in ('', '0'):
+            pragmas = SQLITE_WAL_PRAGMAS + pragmas
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': name,
+            'CONN_MAX_AGE': conn_max_age,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'init_command': ';'.join(pragmas),
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 5,
+            },
+        }
+    if profile == 'postgres':
+        config = {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': env.get('CLINIC_DB_NAME', 'clinic'),
+            'USER': env.get('CLINIC_DB_USER', 'clinic'),
+            'PASSWORD': env.get('CLINIC_DB_PASSWORD', ''),
+            'HOST': env.get('CLINIC_DB_HOST', 'localhost'),
+            'PORT': env.get('CLINIC_DB_PORT', '5432'),
+            'CONN_MAX_AGE': conn_max_age,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': 5,
+                'application_name': 'clinic',
+            },
+        }
+        if env.get('CLINIC_DB_POOL', '') not in ('', '0'):
+            config['CONN_MAX_AGE'] = 0
+            config['OPTIONS']['pool'] = {
+                'min_size': int(env.get('CLINIC_DB_POOL_MIN', 2)),
+                'max_size': int(env.get('CLINIC_DB_POOL_MAX', 10)),
+                'timeout': 10,
+            }
+        return config
+    raise ImproperlyConfigured(
+        f"CLINIC_DB_PROFILE must be one of {', '.join(PROFILES)}, not {profile!r}."
+    )
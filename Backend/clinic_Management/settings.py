@@ -10,9 +10,13 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
+from importlib.util import find_spec
 from pathlib import Path
 from datetime import timedelta
 
+from .databases import database_profile
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -46,6 +50,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'clinic.middleware.PerformanceMiddleware',
+    'clinic.middleware.CompressionMiddleware',
+    'clinic.middleware.AuditContextMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -73,6 +80,15 @@ CORS_ALLOW_METHODS = [
 ]
 CORS_ALLOW_CREDENTIALS = True
 
+# The CLINIC_* settings default to clinic/conf.py, which describes each of
+# them; set only the keys that differ. CLINIC_METRICS=0 turns request
+# telemetry off and CLINIC_METRICS_SAMPLE_RATE sets the fraction measured.
+CLINIC_METRICS = {}
+if 'CLINIC_METRICS' in os.environ:
+    CLINIC_METRICS['ENABLED'] = os.environ['CLINIC_METRICS'] != '0'
+if 'CLINIC_METRICS_SAMPLE_RATE' in os.environ:
+    CLINIC_METRICS['SAMPLE_RATE'] = float(os.environ['CLINIC_METRICS_SAMPLE_RATE'])
+
 
 ROOT_URLCONF = 'clinic_Management.urls'
 
@@ -97,17 +113,35 @@ WSGI_APPLICATION = 'clinic_Management.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
+# Profiles are defined in clinic_Management/databases.py; compare them with
+# `python manage.py benchmark database`.
+
+CLINIC_DB_PROFILE = os.environ.get('CLINIC_DB_PROFILE', 'sqlite')
 
 DATABASES = {
+    'default': database_profile(CLINIC_DB_PROFILE, BASE_DIR / 'db.sqlite3'),
+}
+
+# Per-process cache; profile versions are bumped by signals in the process that
+# made the change, so multi-worker deployments should point this at a shared
+# backend (e.g. Redis) to keep every worker's profiles fresh.
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'clinic',
+        # One version stamp per employee; the default 300 entries would cull
+        # them constantly and turn every cached lookup into a miss.
+        'OPTIONS': {'MAX_ENTRIES': 100_000},
     }
 }
 
 # project/settings.py
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'  # For testing, prints to console
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# e.g. CLINIC_EMAIL_BACKEND=django.core.mail.backends.filebased.EmailBackend to
+# write queued mail to EMAIL_FILE_PATH instead of Gmail during local testing.
+EMAIL_BACKEND = os.environ.get('CLINIC_EMAIL_BACKEND', EMAIL_BACKEND)
+EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
@@ -133,11 +167,39 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+PASSWORD_HASHERS = [
+    'clinic.hashers.ProfiledPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# PBKDF2 cost profile, one of CLINIC_PASSWORD_HASH_PROFILES (clinic/conf.py).
+if 'CLINIC_PASSWORD_HASH_PROFILE' in os.environ:
+    CLINIC_PASSWORD_HASH_PROFILE = os.environ['CLINIC_PASSWORD_HASH_PROFILE']
+
+# JSON is rendered with orjson when it is installed (clinic.renderers);
+# clients may ask for MessagePack with `Accept: application/msgpack` when
+# the msgpack package is installed.
+CLINIC_RENDERER_CLASSES = (
+    'clinic.renderers.ORJSONRenderer',
+    *(('clinic.renderers.MessagePackRenderer',) if find_spec('msgpack') else ()),
+)
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+        'clinic.authentication.CachedJWTAuthentication',
+    ),
+    # Reverse proxies in front of the app whose X-Forwarded-For entries are
+    # trusted for rate limits, lockout and the audit log (0 = REMOTE_ADDR).
+    'NUM_PROXIES': int(os.environ.get('CLINIC_NUM_PROXIES', 0)),
+    'DEFAULT_RENDERER_CLASSES': (
+        *CLINIC_RENDERER_CLASSES,
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 STATIC_URL = '/static/'
@@ -151,7 +213,15 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Rotation/revocation is handled by clinic.tokens rather than simplejwt's
+# token_blacklist app: only revoked, unexpired refresh tokens are stored.
+
 AUTH_USER_MODEL = 'clinic.Employee'
+
+# Permission checks read per-employee compiled permission sets (clinic.access),
+# invalidated through the employee/group version stamps.
+AUTHENTICATION_BACKENDS = ['clinic.access.CachedPermissionBackend']
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
@@ -173,3 +243,6 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Clears the in-process audit buffer when the test databases are torn down.
+TEST_RUNNER = 'clinic.test_runner.ClinicTestRunner'
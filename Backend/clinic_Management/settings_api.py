@@ -0,0 +1,44 @@
+"""
+Slim settings for API-only worker processes.
+
+Run JSON API workers with ``DJANGO_SETTINGS_MODULE=clinic_Management.settings_api``
+and keep ``clinic_Management.settings`` for the admin and management
+commands. Authentication is by JWT only, so the admin, sessions, messages,
+static files and template apps are left out, along with the session, CSRF,
+auth and message middleware and DRF's browsable API; workers import and
+boot less. Compare both profiles with `python manage.py benchmark startup`.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'rest_framework',
+    'rest_framework_simplejwt',
+    'clinic.apps.ClinicConfig',
+    'corsheaders',
+]
+
+MIDDLEWARE = [
+    'clinic.middleware.PerformanceMiddleware',
+    'clinic.middleware.CompressionMiddleware',
+    'clinic.middleware.AuditContextMiddleware',
+    'corsheaders.middleware.CorsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+ROOT_URLCONF = 'clinic_Management.urls_api'
+
+TEMPLATES = []
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,  # noqa: F405
+    'DEFAULT_RENDERER_CLASSES': CLINIC_RENDERER_CLASSES,  # noqa: F405
+    'DEFAULT_PARSER_CLASSES': (
+        'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+}
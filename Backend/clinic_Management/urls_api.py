@@ -0,0 +1,12 @@
+"""
+URL configuration for the API-only profile (clinic_Management.settings_api):
+the project URLs without the admin.
+"""
+from django.urls import path, include
+from clinic.views import TokenObtainView, metrics_view
+
+urlpatterns = [
+    path('api/token/', TokenObtainView.as_view(), name='token_obtain_pair'),
+    path('api/', include('clinic.urls')),
+    path('metrics', metrics_view, name='metrics'),
+]
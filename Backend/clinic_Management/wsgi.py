@@ -5,6 +5,9 @@ It exposes the WSGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/wsgi/
+
+API-only workers can set DJANGO_SETTINGS_MODULE=clinic_Management.settings_api
+to boot without the admin, session and template machinery.
 """
 
 import os
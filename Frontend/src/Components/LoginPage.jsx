@@ -31,7 +31,7 @@ console.log(email,password)
         localStorage.setItem('accessToken', access);
         localStorage.setItem('refreshToken', refresh);
 
-        await userDetail(email);
+        await userDetail(email, access);
     } catch (err) {
         setError('Invalid email or password');
     } finally {
@@ -39,9 +39,11 @@ console.log(email,password)
     }
   };
 
-  const userDetail = async (email) => {
+  const userDetail = async (email, access) => {
     try {
-      const response = await axiosInstance.get(`/api/user-detail/?email=${email}`);
+      const response = await axiosInstance.get(`/api/user-detail/?email=${email}`, {
+        headers: { Authorization: `Bearer ${access}` },
+      });
 
       let data;
       if (typeof response.data === 'string') {